@@ -0,0 +1,209 @@
+"""
+Exportação analítica do histórico de transações (Arrow / Parquet)
+
+Transações com os nomes de produto, categoria e cliente, em colunas tipadas,
+prontas para pandas/polars/DuckDB sem remontar JSON:
+
+- GET /api/transacoes/export?formato=arrow: Arrow IPC stream
+  (pyarrow.ipc.open_stream(...).read_pandas())
+- Tarefa "parquet" (POST /api/tarefas): Parquet particionado por mês
+  (mes=AAAA-MM/parte-0.parquet), num zip
+- python export_parquet.py --user 3 --saida pasta/: o mesmo conjunto,
+  gravado direto numa pasta do servidor
+
+As linhas são lidas em lotes de ANALITICO_LOTE com yield_per (cursor no
+servidor no PostgreSQL), na ordem do índice (user_id, created_at): a memória
+fica limitada a um lote e, no Parquet, cada mês é escrito e fechado antes do
+próximo. Requer pyarrow (pip install pyarrow).
+"""
+import io
+import itertools
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+# Linhas por lote (record batch e row group do Parquet)
+ANALITICO_LOTE = int(os.environ.get("ANALITICO_LOTE", "10000"))
+
+MEDIA_TYPE_ARROW = "application/vnd.apache.arrow.stream"
+
+COMPRESSOES = ("zstd", "snappy", "gzip", "none")
+
+# Partição das transações antigas sem data
+SEM_DATA = "sem-data"
+
+# Colunas do conjunto exportado, na ordem do select
+COLUNAS = (
+    "id", "created_at", "tipo",
+    "produto_id", "produto", "categoria_id", "categoria",
+    "cliente_id", "cliente",
+    "quantidade", "valor_unitario", "valor_total",
+    "numero_pedido", "observacoes",
+)
+
+
+def exigir_pyarrow():
+    """HTTP 501 quando o servidor não tem pyarrow (antes de começar a resposta)"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Exportação Arrow/Parquet requer o pacote pyarrow no servidor")
+
+
+def esquema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("created_at", pa.timestamp("us")),
+        ("tipo", pa.string()),
+        ("produto_id", pa.int64()),
+        ("produto", pa.string()),
+        ("categoria_id", pa.int64()),
+        ("categoria", pa.string()),
+        ("cliente_id", pa.int64()),
+        ("cliente", pa.string()),
+        ("quantidade", pa.int64()),
+        ("valor_unitario", pa.float64()),
+        ("valor_total", pa.float64()),
+        ("numero_pedido", pa.string()),
+        ("observacoes", pa.string()),
+    ])
+
+
+def periodo(data_inicio: Optional[date], data_fim: Optional[date]) -> list:
+    """Filtros de created_at das transações (datas inclusivas, UTC)"""
+    T = models.Transacao
+    filtros = []
+    if data_inicio is not None:
+        filtros.append(T.created_at >= datetime.combine(data_inicio, time.min))
+    if data_fim is not None:
+        filtros.append(T.created_at < datetime.combine(data_fim + timedelta(days=1), time.min))
+    return filtros
+
+
+def _filtros(user_id: int, data_inicio: Optional[date], data_fim: Optional[date]) -> list:
+    return [models.Transacao.user_id == user_id, *periodo(data_inicio, data_fim)]
+
+
+def contar(db: Session, user_id: int, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> int:
+    return db.execute(select(func.count(models.Transacao.id)).where(*_filtros(user_id, data_inicio, data_fim))).scalar()
+
+
+def _linhas(db: Session, user_id: int, data_inicio: Optional[date], data_fim: Optional[date]) -> Iterator[List[tuple]]:
+    """Lotes de linhas (tuplas em COLUNAS), em ordem de created_at"""
+    T, P, K, C = models.Transacao, models.Produto, models.Categoria, models.Cliente
+    stmt = (
+        select(
+            T.id, T.created_at, T.tipo,
+            T.produto_id, P.nome, P.categoria_id, K.nome,
+            T.cliente_id, C.nome,
+            T.quantidade, T.valor_unitario, T.valor_total,
+            T.numero_pedido, T.observacoes,
+        )
+        # Nomes atuais; produto/cliente excluídos ficam com nome nulo
+        .outerjoin(P, P.id == T.produto_id)
+        .outerjoin(K, K.id == P.categoria_id)
+        .outerjoin(C, C.id == T.cliente_id)
+        .where(*_filtros(user_id, data_inicio, data_fim))
+        .order_by(T.created_at)
+        .execution_options(yield_per=ANALITICO_LOTE)
+    )
+    for partition in db.execute(stmt).partitions():
+        yield partition
+
+
+def _lote(linhas: List[tuple], schema):
+    """Linhas -> RecordBatch (uma lista por coluna)"""
+    import pyarrow as pa
+
+    colunas = list(zip(*linhas)) if linhas else [()] * len(COLUNAS)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, schema)],
+        schema=schema,
+    )
+
+
+def fluxo_arrow(user_id: int, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> Iterator[bytes]:
+    """
+    Corpo do Arrow IPC stream, um record batch por lote.
+
+    Sessão própria, como em bulk.export_rows: a do request já foi fechada
+    quando a resposta começa a ser enviada.
+    """
+    import pyarrow as pa
+
+    schema = esquema()
+    buffer = io.BytesIO()
+    db = SessionLocal()
+    try:
+        with pa.ipc.new_stream(buffer, schema) as writer:
+            for linhas in _linhas(db, user_id, data_inicio, data_fim):
+                writer.write_batch(_lote(linhas, schema))
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        # Marca de fim do stream
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+def _mes(linha: tuple) -> str:
+    created_at = linha[1]
+    return created_at.strftime("%Y-%m") if created_at is not None else SEM_DATA
+
+
+def escrever_parquet(
+    db: Session,
+    user_id: int,
+    pasta: str,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    compressao: str = "zstd",
+    progresso: Optional[Callable[[int], None]] = None,
+) -> Dict:
+    """
+    Grava as transações em pasta/mes=AAAA-MM/parte-0.parquet (particionamento
+    hive: pyarrow.dataset, pandas.read_parquet e DuckDB leem `mes` como coluna).
+
+    As linhas chegam ordenadas por data, então só um arquivo fica aberto por
+    vez. progresso(linhas) é chamado após cada lote.
+    """
+    import pyarrow.parquet as pq
+
+    schema = esquema()
+    writer = None
+    mes_aberto = None
+    meses: Dict[str, int] = {}
+    total = 0
+    try:
+        for linhas in _linhas(db, user_id, data_inicio, data_fim):
+            for mes, grupo in itertools.groupby(linhas, key=_mes):
+                grupo = list(grupo)
+                if mes != mes_aberto:
+                    if writer is not None:
+                        writer.close()
+                    particao = os.path.join(pasta, f"mes={mes}")
+                    os.makedirs(particao, exist_ok=True)
+                    writer = pq.ParquetWriter(
+                        os.path.join(particao, "parte-0.parquet"), schema,
+                        compression=None if compressao == "none" else compressao,
+                    )
+                    mes_aberto = mes
+                writer.write_batch(_lote(grupo, schema))
+                meses[mes] = meses.get(mes, 0) + len(grupo)
+            total += len(linhas)
+            if progresso is not None:
+                progresso(total)
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"linhas": total, "meses": meses}
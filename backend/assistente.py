@@ -0,0 +1,247 @@
+"""
+Assistente do chat: POST /api/assistant/query
+
+A mensagem é classificada numa intenção (as mesmas regras de palavras que o
+chat usava no navegador) e respondida só com os dados daquela intenção; o
+texto é montado pelo frontend. Nenhuma consulta percorre o histórico de
+transações:
+
+- Rankings, totais de vendas e gastos de um cliente vêm dos resumos
+  acumulados (resumo_produtos, resumo_clientes), mantidos a cada transação
+- "Hoje" usa o índice (user_id, created_at) só no intervalo do dia
+- Produtos e clientes citados pelo nome são achados pela busca textual
+  indexada (busca.py)
+- Listas de estoque baixo/zerado trazem no máximo LIMITE_LISTA produtos,
+  com o total em `total`
+"""
+import re
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import busca
+import models
+import stats
+
+# Tamanho máximo da mensagem (caracteres)
+MAX_MENSAGEM = 500
+# Itens dos rankings e das listas de estoque
+TOP = 5
+LIMITE_LISTA = 20
+
+_COMPARACAO = re.compile(r"comparar\s+(.+?)\s+(?:vs|com|e)\s+(.+)", re.IGNORECASE)
+_SAUDACAO = re.compile(r"^(oi|olá|ola|hey|opa|e ai|eai|bom dia|boa tarde|boa noite)")
+
+# ==================== INTENÇÕES ====================
+
+def _tem(msg: str, *palavras: str) -> bool:
+    return any(p in msg for p in palavras)
+
+
+def intencao(msg: str) -> str:
+    """Intenção da mensagem (já em minúsculas), na ordem de prioridade do chat"""
+    if _SAUDACAO.match(msg):
+        return "saudacao"
+    if _tem(msg, "ajuda", "help", "o que você", "o que voce") or msg == "?":
+        return "ajuda"
+    if _tem(msg, "análise", "analise", "resumo", "overview", "dashboard"):
+        return "analise"
+    if _tem(msg, "mais vendido", "best seller") or ("top" in msg and "produto" in msg):
+        return "mais_vendidos"
+    if _tem(msg, "melhor", "top") and "cliente" in msg:
+        return "melhores_clientes"
+    if _tem(msg, "baixo estoque", "pouco estoque", "acabando"):
+        return "baixo_estoque"
+    if _tem(msg, "sem estoque", "zerado", "esgotado"):
+        return "sem_estoque"
+    procura = _tem(msg, "buscar", "procurar", "encontrar", "info")
+    if procura and "produto" in msg:
+        return "produto"
+    if procura and "cliente" in msg:
+        return "cliente"
+    if _tem(msg, "quanto", "valor") and _tem(msg, "gastou", "comprou", "gasto"):
+        return "gastos_cliente"
+    # Antes de "estoque", que também casaria com "valor do estoque"
+    if "valor" in msg and "estoque" in msg:
+        return "valor_estoque"
+    if "estoque" in msg or ("quantidade" in msg and "valor" not in msg):
+        return "estoque"
+    if _tem(msg, "total", "quanto") and _tem(msg, "vendas", "faturamento", "receita"):
+        return "total_vendas"
+    if _tem(msg, "hoje", "hj") and _tem(msg, "venda", "vendeu"):
+        return "vendas_hoje"
+    if _tem(msg, "quantos", "total") and "cliente" in msg:
+        return "total_clientes"
+    if _tem(msg, "comparar", "diferença", "vs"):
+        return "comparacao"
+    return "desconhecida"
+
+
+def _depois_de(msg: str, prefixo: str, ate: tuple = ()) -> str:
+    """Palavras depois da primeira que começa com `prefixo` (até uma das palavras de `ate`)"""
+    palavras = msg.split()
+    for i, palavra in enumerate(palavras):
+        if palavra.startswith(prefixo):
+            resto = []
+            for seguinte in palavras[i + 1:]:
+                if seguinte.strip("?!.,") in ate:
+                    break
+                resto.append(seguinte)
+            return " ".join(resto).strip("?!., ")
+    return ""
+
+# ==================== DADOS ====================
+
+def _vendas(db: Session, user_id: int) -> Dict:
+    R = models.ResumoProduto
+    transacoes, quantidade, valor = db.query(
+        func.coalesce(func.sum(R.transacoes_saida), 0),
+        func.coalesce(func.sum(R.quantidade_saida), 0),
+        func.coalesce(func.sum(R.valor_saida), 0.0),
+    ).filter(R.user_id == user_id).one()
+    return {"transacoes": transacoes, "quantidade": quantidade, "valor_total": valor}
+
+
+def _hoje(db: Session, user_id: int, tz_offset: int) -> Dict:
+    totais = stats.totais_por_tipo(db, user_id, data_inicio=stats.inicio_do_dia(tz_offset))
+    saida = next((t for t in totais if t["tipo"] == "saida"), None)
+    if saida is None:
+        return {"transacoes": 0, "quantidade": 0, "valor_total": 0.0}
+    return {"transacoes": saida["transacoes"], "quantidade": saida["quantidade"], "valor_total": saida["valor_total"]}
+
+
+def _total_clientes(db: Session, user_id: int) -> int:
+    return db.query(func.count(models.Cliente.id)).filter(models.Cliente.user_id == user_id).scalar()
+
+
+def _top_produtos(db: Session, user_id: int):
+    R, P = models.ResumoProduto, models.Produto
+    # Percorre ix_resumo_produtos_user_valor do maior valor para o menor e para em TOP
+    query = (
+        db.query(R.produto_id, P.nome, R.quantidade_saida, R.valor_saida)
+        .join(P, P.id == R.produto_id)
+        .filter(R.user_id == user_id, R.transacoes_saida > 0)
+        .order_by(R.valor_saida.desc())
+        .limit(TOP)
+    )
+    return [
+        {"produto_id": produto_id, "nome": nome, "quantidade": quantidade, "valor_total": valor}
+        for produto_id, nome, quantidade, valor in query
+    ]
+
+
+def _top_clientes(db: Session, user_id: int):
+    R, C = models.ResumoCliente, models.Cliente
+    query = (
+        db.query(R.cliente_id, C.nome, R.transacoes_saida, R.valor_saida)
+        .join(C, C.id == R.cliente_id)
+        .filter(R.user_id == user_id, R.transacoes_saida > 0)
+        .order_by(R.valor_saida.desc())
+        .limit(TOP)
+    )
+    return [
+        {"cliente_id": cliente_id, "nome": nome, "compras": compras, "valor_total": valor}
+        for cliente_id, nome, compras, valor in query
+    ]
+
+
+def _lista_estoque(db: Session, user_id: int, filtro, ordem) -> Dict:
+    P = models.Produto
+    base = db.query(P).filter(P.user_id == user_id, filtro)
+    total = base.with_entities(func.count(P.id)).scalar()
+    rows = base.with_entities(P.id, P.nome, P.valor, P.quantidade).order_by(*ordem).limit(LIMITE_LISTA)
+    return {
+        "total": total,
+        "produtos": [
+            {"id": id_, "nome": nome, "valor": valor, "quantidade": quantidade}
+            for id_, nome, valor, quantidade in rows
+        ],
+    }
+
+
+def _produto(db: Session, user_id: int, termo: str) -> Optional[Dict]:
+    produto = busca.mais_relevante(db, "produtos", user_id, termo) if termo else None
+    if produto is None:
+        return None
+    resumo = db.get(models.ResumoProduto, (user_id, produto.id))
+    return {
+        "id": produto.id,
+        "nome": produto.nome,
+        "descricao": produto.descricao,
+        "valor": produto.valor,
+        "quantidade": produto.quantidade,
+        "vendas": resumo.transacoes_saida if resumo else 0,
+        "quantidade_vendida": resumo.quantidade_saida if resumo else 0,
+        "faturamento": resumo.valor_saida if resumo else 0.0,
+    }
+
+
+def _cliente(db: Session, user_id: int, termo: str) -> Optional[Dict]:
+    cliente = busca.mais_relevante(db, "clientes", user_id, termo) if termo else None
+    if cliente is None:
+        return None
+    resumo = db.get(models.ResumoCliente, (user_id, cliente.id))
+    return {
+        "id": cliente.id,
+        "nome": cliente.nome,
+        "email": cliente.email,
+        "telefone": cliente.telefone,
+        "endereco": cliente.endereco,
+        "compras": resumo.transacoes_saida if resumo else 0,
+        "valor_total": resumo.valor_saida if resumo else 0.0,
+    }
+
+# ==================== RESPOSTA ====================
+
+def responder(db: Session, user_id: int, mensagem: str, tz_offset: int = 0) -> Dict:
+    """Intenção da mensagem e os dados para respondê-la (schemas.AssistenteResposta)"""
+    if len(mensagem) > MAX_MENSAGEM:
+        raise HTTPException(status_code=400, detail=f"Mensagem muito longa (máximo {MAX_MENSAGEM} caracteres)")
+
+    msg = mensagem.lower().strip()
+    tipo = intencao(msg)
+    resposta: Dict = {"intencao": tipo}
+    P = models.Produto
+
+    if tipo == "analise":
+        resposta.update(
+            estoque=stats.estoque(db, user_id),
+            total_clientes=_total_clientes(db, user_id),
+            vendas=_vendas(db, user_id),
+            hoje=_hoje(db, user_id, tz_offset),
+        )
+    elif tipo == "mais_vendidos":
+        resposta["top_produtos"] = _top_produtos(db, user_id)
+    elif tipo == "melhores_clientes":
+        resposta["top_clientes"] = _top_clientes(db, user_id)
+    elif tipo == "baixo_estoque":
+        filtro = (P.quantidade > 0) & (P.quantidade <= stats.LIMITE_ESTOQUE_BAIXO)
+        resposta.update(_lista_estoque(db, user_id, filtro, (P.quantidade, P.id)))
+    elif tipo == "sem_estoque":
+        resposta.update(_lista_estoque(db, user_id, P.quantidade <= 0, (P.nome, P.id)))
+    elif tipo == "produto":
+        resposta["termo"] = _depois_de(msg, "produto")
+        resposta["produto"] = _produto(db, user_id, resposta["termo"])
+    elif tipo in ("cliente", "gastos_cliente"):
+        resposta["termo"] = _depois_de(msg, "cliente", ate=("gastou", "comprou", "gasto"))
+        resposta["cliente"] = _cliente(db, user_id, resposta["termo"])
+    elif tipo in ("estoque", "valor_estoque"):
+        resposta["estoque"] = stats.estoque(db, user_id)
+    elif tipo == "total_vendas":
+        resposta["vendas"] = _vendas(db, user_id)
+    elif tipo == "vendas_hoje":
+        resposta["hoje"] = _hoje(db, user_id, tz_offset)
+    elif tipo == "total_clientes":
+        resposta["total_clientes"] = _total_clientes(db, user_id)
+    elif tipo == "comparacao":
+        match = _COMPARACAO.search(msg)
+        if match:
+            resposta["termo"] = f"{match.group(1)} vs {match.group(2)}"
+            resposta["produto"] = _produto(db, user_id, match.group(1))
+            resposta["comparado"] = _produto(db, user_id, match.group(2))
+    elif tipo == "desconhecida":
+        # Sugestões: estoque baixo/zerado e vendas de hoje
+        resposta.update(estoque=stats.estoque(db, user_id), hoje=_hoje(db, user_id, tz_offset))
+    return resposta
@@ -0,0 +1,321 @@
+"""
+Endpoints de CRUD com AsyncSession (aiosqlite / asyncpg)
+
+Usados no lugar dos endpoints síncronos de main.py quando DB_ASYNC=true.
+Mantêm os mesmos caminhos, parâmetros, permissões e respostas.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import auth
+import catalogo
+import estoque
+import models
+import queries
+import rollup
+import schemas
+import serializacao
+import versoes
+from database import get_async_db
+from pagination import paginate_columns_async, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/api")
+
+
+async def _get_owned(db: AsyncSession, model, item_id: int, user_id: int, detail: str):
+    result = await db.execute(select(model).filter(model.id == item_id, model.user_id == user_id))
+    item = result.scalars().first()
+    if not item:
+        raise HTTPException(status_code=404, detail=detail)
+    return item
+
+
+async def _ajustar_estoque(db: AsyncSession, produto_id: int, user_id: int, delta: int) -> bool:
+    return await db.run_sync(lambda session: estoque.aplicar(session, produto_id, user_id, delta))
+
+
+async def _registrar_movimentos(db: AsyncSession, movimentos: list):
+    await db.run_sync(lambda session: estoque.registrar(session, movimentos))
+
+
+async def _save(db: AsyncSession, item):
+    await db.commit()
+    await db.refresh(item)
+    return item
+
+# ==================== CATEGORIAS ====================
+
+@router.get("/categorias", response_model=List[schemas.Categoria], dependencies=[Depends(versoes.condicional_async)])
+async def get_categorias(
+    request: Request,
+    response: Response,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Listar todas as categorias do usuário"""
+    guardada = await catalogo.buscar_async(db, request, response, current_user.id, "categorias")
+    if guardada is not None:
+        return guardada
+    result = await db.execute(
+        select(*serializacao.colunas(models.Categoria, schemas.Categoria))
+        .filter(models.Categoria.user_id == current_user.id)
+    )
+    resposta = serializacao.resposta(serializacao.linhas(result.all(), schemas.Categoria), response)
+    return await catalogo.guardar_async(request, current_user.id, "categorias", resposta)
+
+@router.post("/categorias", response_model=schemas.Categoria)
+async def create_categoria(
+    categoria: schemas.CategoriaCreate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Criar nova categoria"""
+    auth.check_permission(current_user, "gerente")
+
+    db_categoria = models.Categoria(**categoria.dict(), user_id=current_user.id)
+    db.add(db_categoria)
+    return await _save(db, db_categoria)
+
+@router.put("/categorias/{categoria_id}", response_model=schemas.Categoria)
+async def update_categoria(
+    categoria_id: int,
+    categoria: schemas.CategoriaCreate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Atualizar categoria"""
+    auth.check_permission(current_user, "gerente")
+
+    db_categoria = await _get_owned(db, models.Categoria, categoria_id, current_user.id, "Categoria não encontrada")
+    for key, value in categoria.dict().items():
+        setattr(db_categoria, key, value)
+    return await _save(db, db_categoria)
+
+@router.delete("/categorias/{categoria_id}")
+async def delete_categoria(
+    categoria_id: int,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Deletar categoria"""
+    auth.check_permission(current_user, "gerente")
+
+    db_categoria = await _get_owned(db, models.Categoria, categoria_id, current_user.id, "Categoria não encontrada")
+    await db.delete(db_categoria)
+    await db.commit()
+    return {"message": "Categoria deletada com sucesso"}
+
+# ==================== PRODUTOS ====================
+
+@router.get("/produtos", response_model=List[schemas.Produto], dependencies=[Depends(versoes.condicional_async)])
+async def get_produtos(
+    request: Request,
+    response: Response,
+    categoria_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Listar produtos do usuário (paginado por cursor)"""
+    guardada = await catalogo.buscar_async(db, request, response, current_user.id, "produtos")
+    if guardada is not None:
+        return guardada
+    stmt = select(models.Produto).filter(models.Produto.user_id == current_user.id)
+    if categoria_id is not None:
+        stmt = stmt.filter(models.Produto.categoria_id == categoria_id)
+    colunas = serializacao.colunas(models.Produto, schemas.Produto)
+    rows = await paginate_columns_async(db, stmt, models.Produto, colunas, response, cursor, limit)
+    resposta = serializacao.resposta(serializacao.linhas(rows, schemas.Produto), response)
+    return await catalogo.guardar_async(request, current_user.id, "produtos", resposta)
+
+@router.post("/produtos", response_model=schemas.Produto)
+async def create_produto(
+    produto: schemas.ProdutoCreate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Criar novo produto"""
+    auth.check_permission(current_user, "gerente")
+
+    db_produto = models.Produto(**produto.dict(), user_id=current_user.id)
+    db.add(db_produto)
+    await db.flush()
+    await _registrar_movimentos(db, [estoque.de_produto(db_produto)])
+    return await _save(db, db_produto)
+
+@router.put("/produtos/{produto_id}", response_model=schemas.Produto)
+async def update_produto(
+    produto_id: int,
+    produto: schemas.ProdutoUpdate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Atualizar produto"""
+    auth.check_permission(current_user, "gerente")
+
+    db_produto = await _get_owned(db, models.Produto, produto_id, current_user.id, "Produto não encontrado")
+    dados = produto.dict(exclude_unset=True)
+    quantidade = dados.pop("quantidade", None)
+    for key, value in dados.items():
+        setattr(db_produto, key, value)
+
+    if quantidade is not None and quantidade != db_produto.quantidade:
+        # Ajuste pela diferença, sem sobrescrever vendas feitas enquanto isso
+        if quantidade < 0:
+            raise HTTPException(status_code=400, detail="Quantidade inválida")
+        delta = quantidade - db_produto.quantidade
+        if not await _ajustar_estoque(db, produto_id, current_user.id, delta):
+            raise HTTPException(status_code=409, detail="Estoque alterado por outra operação, tente novamente")
+        await _registrar_movimentos(db, [estoque.movimento(current_user.id, produto_id, delta, "ajuste")])
+    return await _save(db, db_produto)
+
+@router.delete("/produtos/{produto_id}")
+async def delete_produto(
+    produto_id: int,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Deletar produto"""
+    auth.check_permission(current_user, "gerente")
+
+    db_produto = await _get_owned(db, models.Produto, produto_id, current_user.id, "Produto não encontrado")
+    await db.delete(db_produto)
+    await db.commit()
+    return {"message": "Produto deletado com sucesso"}
+
+# ==================== CLIENTES ====================
+
+@router.get("/clientes", response_model=List[schemas.Cliente], dependencies=[Depends(versoes.condicional_async)])
+async def get_clientes(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Listar clientes do usuário (paginado por cursor)"""
+    stmt = select(models.Cliente).filter(models.Cliente.user_id == current_user.id)
+    colunas = serializacao.colunas(models.Cliente, schemas.Cliente)
+    rows = await paginate_columns_async(db, stmt, models.Cliente, colunas, response, cursor, limit)
+    return serializacao.resposta(serializacao.linhas(rows, schemas.Cliente), response)
+
+@router.post("/clientes", response_model=schemas.Cliente)
+async def create_cliente(
+    cliente: schemas.ClienteCreate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Criar novo cliente"""
+    auth.check_permission(current_user, "gerente")
+
+    db_cliente = models.Cliente(**cliente.dict(), user_id=current_user.id)
+    db.add(db_cliente)
+    return await _save(db, db_cliente)
+
+@router.put("/clientes/{cliente_id}", response_model=schemas.Cliente)
+async def update_cliente(
+    cliente_id: int,
+    cliente: schemas.ClienteUpdate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Atualizar cliente"""
+    auth.check_permission(current_user, "gerente")
+
+    db_cliente = await _get_owned(db, models.Cliente, cliente_id, current_user.id, "Cliente não encontrado")
+    for key, value in cliente.dict(exclude_unset=True).items():
+        setattr(db_cliente, key, value)
+    return await _save(db, db_cliente)
+
+@router.delete("/clientes/{cliente_id}")
+async def delete_cliente(
+    cliente_id: int,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Deletar cliente"""
+    auth.check_permission(current_user, "gerente")
+
+    db_cliente = await _get_owned(db, models.Cliente, cliente_id, current_user.id, "Cliente não encontrado")
+    await db.delete(db_cliente)
+    await db.commit()
+    return {"message": "Cliente deletado com sucesso"}
+
+# ==================== TRANSAÇÕES ====================
+
+@router.get("/transacoes", response_model=List[schemas.Transacao], dependencies=[Depends(versoes.condicional_async)])
+async def get_transacoes(
+    response: Response,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    tipo: Optional[str] = None,
+    produto_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    numero_pedido: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Listar transações do usuário (paginado por cursor, com filtros)"""
+    stmt = select(models.Transacao).filter(models.Transacao.user_id == current_user.id)
+    stmt = queries.filtrar_transacoes(stmt, data_inicio, data_fim, tipo, produto_id, cliente_id, numero_pedido)
+    colunas = serializacao.colunas(models.Transacao, schemas.Transacao)
+    rows = await paginate_columns_async(db, stmt, models.Transacao, colunas, response, cursor, limit)
+    return serializacao.resposta(serializacao.linhas(rows, schemas.Transacao), response)
+
+@router.post("/transacoes", response_model=schemas.Transacao)
+async def create_transacao(
+    transacao: schemas.TransacaoCreate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Criar nova transação"""
+    # Todos podem criar vendas (saída), mas só gerente+ pode criar entradas
+    if transacao.tipo == "entrada":
+        auth.check_permission(current_user, "gerente")
+
+    # UPDATE condicional, seguro sob concorrência
+    delta = transacao.quantidade if transacao.tipo == "entrada" else -transacao.quantidade
+    if not await _ajustar_estoque(db, transacao.produto_id, current_user.id, delta):
+        result = await db.execute(estoque.consulta_produto(transacao.produto_id, current_user.id))
+        raise estoque.erro(result.scalars().first())
+
+    db_transacao = models.Transacao(**transacao.dict(), user_id=current_user.id, created_at=datetime.utcnow())
+    db.add(db_transacao)
+    await db.run_sync(lambda session: rollup.registrar(session, [db_transacao]))
+    await db.flush()
+    await _registrar_movimentos(db, [estoque.de_transacao(db_transacao)])
+    return await _save(db, db_transacao)
+
+@router.delete("/transacoes/{transacao_id}")
+async def delete_transacao(
+    transacao_id: int,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Desfazer transação"""
+    auth.check_permission(current_user, "gerente")
+
+    db_transacao = await _get_owned(db, models.Transacao, transacao_id, current_user.id, "Transação não encontrada")
+
+    # Reverter estoque (o produto pode já ter sido excluído)
+    if db_transacao.produto_id is not None:
+        delta = -db_transacao.quantidade if db_transacao.tipo == "entrada" else db_transacao.quantidade
+        if not await _ajustar_estoque(db, db_transacao.produto_id, current_user.id, delta):
+            result = await db.execute(estoque.consulta_produto(db_transacao.produto_id, current_user.id))
+            produto = result.scalars().first()
+            if produto:
+                raise estoque.erro(produto, "Estoque insuficiente para desfazer a entrada")
+        else:
+            await _registrar_movimentos(db, [estoque.de_transacao(db_transacao, estorno=True)])
+
+    await db.run_sync(lambda session: rollup.registrar(session, [db_transacao], sinal=-1))
+    await db.delete(db_transacao)
+    await db.commit()
+    return {"message": "Transação desfeita com sucesso"}
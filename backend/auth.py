@@ -1,13 +1,25 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
+import metricas
 import models
 import schemas
-from database import get_db
+from database import get_db, get_async_db
 
 # Configurações
 SECRET_KEY = "sua-chave-secreta-super-segura-mude-em-producao"
@@ -16,16 +28,228 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Cache do usuário autenticado (evita um SELECT em users a cada requisição)
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Dados do usuário autenticado guardados no cache (sem o hash da senha)"""
+    id: int
+    username: str
+    email: Optional[str]
+    role: str
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, user: models.User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            created_at=user.created_at,
+        )
+
+class UserCache:
+    """Cache LRU com expiração (TTL), indexado pelo username (sub do JWT)"""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._data.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[username]
+                self.misses += 1
+                return None
+            self._data.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user: CurrentUser):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[user.username] = (time.monotonic() + self.ttl, user)
+            self._data.move_to_end(user.username)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._data.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+class Invalidacoes:
+    """
+    Aplica ao cache deste processo as invalidações gravadas na tabela
+    invalidacoes_usuarios (por qualquer processo), lidas no máximo a cada
+    USER_CACHE_SYNC segundos.
+
+    Lê todas as invalidações dos últimos 2 x TTL segundos, e não só os ids
+    novos: no PostgreSQL um id menor pode ficar visível depois de um maior.
+    Mais antigas não importam, a entrada do cache já expirou. Os ids já
+    aplicados não apagam a entrada de novo.
+    """
+
+    def __init__(self, cache: UserCache, intervalo: float):
+        self.cache = cache
+        self.intervalo = intervalo
+        self._proxima = 0.0
+        self._aplicadas = {}  # id -> created_at
+        self._lock = threading.Lock()
+
+    def _janela(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=2 * self.cache.ttl)
+
+    def consulta(self):
+        """SELECT das invalidações recentes, ou None se a última leitura ainda vale"""
+        agora = time.monotonic()
+        with self._lock:
+            if self.cache.maxsize <= 0 or agora < self._proxima:
+                return None
+            self._proxima = agora + self.intervalo
+        I = models.InvalidacaoUsuario
+        return select(I.id, I.username, I.created_at).where(I.created_at >= self._janela())
+
+    def aplicar(self, linhas):
+        with self._lock:
+            for id, username, created_at in linhas:
+                if id not in self._aplicadas:
+                    self._aplicadas[id] = created_at
+                    self.cache.invalidate(username)
+            janela = self._janela()
+            for id in [i for i, created_at in self._aplicadas.items() if created_at < janela]:
+                del self._aplicadas[id]
+
+user_cache = UserCache()
+
+# Atraso máximo para uma invalidação feita em outro processo valer neste (segundos)
+USER_CACHE_SYNC = float(os.environ.get("USER_CACHE_SYNC", "1"))
+# Invalidações mais antigas são apagadas da tabela
+USER_CACHE_RETENCAO = timedelta(days=1)
+
+invalidacoes = Invalidacoes(user_cache, USER_CACHE_SYNC)
+
+def invalidate_user(db: Session, username: str):
+    """
+    Remove o usuário do cache de todos os processos da API (exclusão, troca
+    de role). Grava na transação de `db`, sem commit: os demais processos
+    aplicam em até USER_CACHE_SYNC segundos depois do commit.
+    """
+    I = models.InvalidacaoUsuario
+    db.execute(delete(I).where(I.created_at < datetime.utcnow() - USER_CACHE_RETENCAO))
+    db.add(I(username=username))
+    user_cache.invalidate(username)
+
+# Hash de senha: custo do bcrypt e pool dedicado (não disputa o threadpool da API)
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Limites de logins/cadastros simultâneos (acima disso responde 429)
+LOGIN_MAX_CONCURRENT = int(os.environ.get("LOGIN_MAX_CONCURRENT", "64"))
+LOGIN_MAX_PER_IP = int(os.environ.get("LOGIN_MAX_PER_IP", "4"))
+LOGIN_MAX_PER_USER = int(os.environ.get("LOGIN_MAX_PER_USER", "2"))
+
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha está correta"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    inicio = time.perf_counter()
+    correta = bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    metricas.registrar_bcrypt("verificar", time.perf_counter() - inicio)
+    return correta
 
 def get_password_hash(password: str) -> str:
     """Gera hash da senha"""
-    salt = bcrypt.gensalt()
+    inicio = time.perf_counter()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    metricas.registrar_bcrypt("gerar", time.perf_counter() - inicio)
     return hashed.decode('utf-8')
 
+async def _no_pool_de_hash(funcao, *args):
+    # Com o contexto da requisição, para o tempo do bcrypt entrar no Server-Timing
+    loop = asyncio.get_running_loop()
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(password_executor, contexto.run, funcao, *args)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password executado no pool de hash"""
+    return await _no_pool_de_hash(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash executado no pool de hash"""
+    return await _no_pool_de_hash(get_password_hash, password)
+
+class LoginLimiter:
+    """Limita operações de senha simultâneas no total, por IP e por usuário"""
+
+    def __init__(self, max_total: int, max_per_ip: int, max_per_user: int):
+        self.max_total = max_total
+        self.max_per_ip = max_per_ip
+        self.max_per_user = max_per_user
+        self.total = 0
+        self.rejected = 0
+        self._por_ip = {}
+        self._por_usuario = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, ip: str, username: str):
+        with self._lock:
+            if (
+                self.total >= self.max_total
+                or self._por_ip.get(ip, 0) >= self.max_per_ip
+                or self._por_usuario.get(username, 0) >= self.max_per_user
+            ):
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Muitas tentativas simultâneas, tente novamente",
+                    headers={"Retry-After": "1"},
+                )
+            self.total += 1
+            self._por_ip[ip] = self._por_ip.get(ip, 0) + 1
+            self._por_usuario[username] = self._por_usuario.get(username, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.total -= 1
+                for contagem, chave in ((self._por_ip, ip), (self._por_usuario, username)):
+                    contagem[chave] -= 1
+                    if contagem[chave] <= 0:
+                        del contagem[chave]
+
+login_limiter = LoginLimiter(LOGIN_MAX_CONCURRENT, LOGIN_MAX_PER_IP, LOGIN_MAX_PER_USER)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -44,26 +268,79 @@ def authenticate_user(db: Session, username: str, password: str):
         return False
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+async def authenticate_user_async(db: Session, username: str, password: str):
+    """authenticate_user sem bloquear o event loop (banco no threadpool, bcrypt no pool de hash)"""
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.username == username).first()
+    )
+    if not user:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _username_from_token(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return username
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    # Sessão síncrona: as consultas vão para o threadpool, nunca no event loop
+    # (esperar uma conexão do pool ali trava o worker inteiro)
+    username = _username_from_token(token)
     
-    user = db.query(models.User).filter(models.User.username == username).first()
+    consulta = invalidacoes.consulta()
+    if consulta is not None:
+        invalidacoes.aplicar(await run_in_threadpool(lambda: db.execute(consulta).all()))
+    
+    cached = user_cache.get(username)
+    if cached is not None:
+        return cached
+    
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.username == username).first()
+    )
     if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    
+    cached = CurrentUser.from_model(user)
+    user_cache.set(cached)
+    return cached
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db=Depends(get_async_db)):
+    """get_current_user para os endpoints com AsyncSession (DB_ASYNC=true)"""
+    username = _username_from_token(token)
+    
+    consulta = invalidacoes.consulta()
+    if consulta is not None:
+        invalidacoes.aplicar((await db.execute(consulta)).all())
+    
+    cached = user_cache.get(username)
+    if cached is not None:
+        return cached
+    
+    result = await db.execute(select(models.User).filter(models.User.username == username))
+    user = result.scalars().first()
+    if user is None:
+        raise _credentials_exception()
+    
+    cached = CurrentUser.from_model(user)
+    user_cache.set(cached)
+    return cached
 
-def check_permission(user: models.User, required_role: str):
+def check_permission(user: CurrentUser, required_role: str):
     """Verifica se o usuário tem a permissão necessária"""
     role_hierarchy = {"admin": 3, "gerente": 2, "usuario": 1}
     user_level = role_hierarchy.get(user.role, 0)
@@ -0,0 +1,173 @@
+"""
+Benchmark: histórico de transações para análise (JSON paginado x Arrow x Parquet)
+
+Cria um banco SQLite temporário com N transações e compara os caminhos que
+um analista usa para levar o histórico a uma tabela em colunas:
+
+  - JSON: GET /api/transacoes paginado pelo cursor, json.loads de cada
+    página e montagem das colunas (o que era feito antes do pandas)
+  - Arrow: GET /api/transacoes/export?formato=arrow, lido com
+    pyarrow.ipc.open_stream (já em colunas, com nomes de produto/cliente)
+  - Parquet: conjunto particionado por mês (analitico.escrever_parquet),
+    lido com pyarrow.dataset; mede a gravação e a leitura
+
+Mostra tempo, bytes transferidos/gravados/lidos e pico de memória Python
+(tracemalloc). No Arrow e no Parquet o pico depende de ANALITICO_LOTE, não
+do tamanho do histórico.
+
+Uso:
+    python bench_analitico.py --transacoes 200000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# O banco do benchmark fica num diretório temporário, nunca no banco real
+_PASTA = tempfile.mkdtemp(prefix="nexus-analitico-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_PASTA, "bench.db")
+os.environ["TAREFAS_NA_API"] = "false"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import analitico
+import main
+import models
+from database import SessionLocal
+
+USERNAME = "bench"
+
+
+def popular(total: int, lote: int = 50_000) -> int:
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == USERNAME).one()
+        categoria = models.Categoria(nome="Categoria", user_id=user.id)
+        db.add(categoria)
+        db.flush()
+        produtos = [models.Produto(nome=f"Produto {i}", valor=10.0, quantidade=0, categoria_id=categoria.id, user_id=user.id) for i in range(50)]
+        clientes = [models.Cliente(nome=f"Cliente {i}", user_id=user.id) for i in range(200)]
+        db.add_all(produtos + clientes)
+        db.commit()
+
+        # Três anos de histórico
+        inicio = datetime.utcnow() - timedelta(days=3 * 365)
+        passo = 3 * 365 * 86400 / total
+        for primeiro in range(0, total, lote):
+            db.execute(insert(models.Transacao), [
+                {
+                    "tipo": "saida" if i % 3 else "entrada",
+                    "produto_id": produtos[i % len(produtos)].id,
+                    "cliente_id": clientes[i % len(clientes)].id if i % 3 else None,
+                    "quantidade": 1 + i % 5,
+                    "valor_unitario": 10.0,
+                    "valor_total": 10.0 * (1 + i % 5),
+                    "numero_pedido": f"PED-{i}",
+                    "observacoes": "entrega expressa" if i % 7 == 0 else None,
+                    "user_id": user.id,
+                    "created_at": inicio + timedelta(seconds=i * passo),
+                    "versao": 1,
+                }
+                for i in range(primeiro, min(primeiro + lote, total))
+            ])
+            db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def medir(nome: str, funcao):
+    """Executa `funcao` duas vezes: uma para o tempo, outra para os picos de memória (tracemalloc atrasa)"""
+    inicio = time.perf_counter()
+    linhas, tamanho = funcao()
+    duracao = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nome:18} | {linhas:8} linhas | {duracao * 1000:9.1f} ms | {tamanho / 1e6:7.1f} MB | "
+          f"pico de memória {pico / 1e6:7.1f} MB")
+    return linhas
+
+
+def via_json(client: TestClient):
+    colunas = {}
+    transferidos = 0
+    cursor = None
+    while True:
+        params = {"limit": 1000, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/transacoes", params=params)
+        response.raise_for_status()
+        transferidos += len(response.content)
+        for linha in json.loads(response.content):
+            for campo, valor in linha.items():
+                colunas.setdefault(campo, []).append(valor)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    return len(colunas.get("id", [])), transferidos
+
+
+def via_arrow(client: TestClient):
+    response = client.get("/api/transacoes/export", params={"formato": "arrow"})
+    response.raise_for_status()
+    tabela = pa.ipc.open_stream(response.content).read_all()
+    return tabela.num_rows, len(response.content)
+
+
+def gravar_parquet(user_id: int, pasta: str):
+    db = SessionLocal()
+    try:
+        linhas = analitico.escrever_parquet(db, user_id, pasta)["linhas"]
+    finally:
+        db.close()
+    tamanho = sum(os.path.getsize(os.path.join(raiz, a)) for raiz, _, arquivos in os.walk(pasta) for a in arquivos)
+    return linhas, tamanho
+
+
+def ler_parquet(pasta: str):
+    tabela = ds.dataset(pasta, partitioning="hive").to_table()
+    return tabela.num_rows, tabela.nbytes
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Histórico de transações para análise: JSON x Arrow x Parquet")
+    parser.add_argument("--transacoes", type=int, default=200_000, help="Transações criadas")
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        client.post("/api/register", json={"username": USERNAME, "password": USERNAME})
+        token = client.post("/api/login", data={"username": USERNAME, "password": USERNAME}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        user_id = popular(args.transacoes)
+        pasta = os.path.join(_PASTA, "parquet")
+        os.makedirs(pasta)
+        try:
+            resultados = [
+                medir("JSON paginado", lambda: via_json(client)),
+                medir("Arrow (stream)", lambda: via_arrow(client)),
+                medir("Parquet (gravar)", lambda: gravar_parquet(user_id, tempfile.mkdtemp(dir=pasta))),
+                medir("Parquet (ler)", lambda: ler_parquet(os.path.join(pasta, os.listdir(pasta)[0]))),
+            ]
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+        if len(set(resultados)) != 1:
+            print(f"ERRO: quantidades de linhas diferentes: {resultados}")
+            sys.exit(1)
+        print("Mesmas linhas nos três caminhos")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,359 @@
+"""
+Teste de carga reproduzível da API (pontos quentes)
+
+Popula um banco (SQLite temporário ou o PostgreSQL de --database-url, que
+deve estar vazio) com usuários, produtos, clientes e transações pelos
+models, sobe um servidor uvicorn nesse banco e dispara requisições
+concorrentes contra os endpoints reais, um cenário por vez:
+
+  - login                POST /api/login (bcrypt)
+  - listar_produtos      GET /api/produtos
+  - listar_transacoes    GET /api/transacoes
+  - criar_transacao      POST /api/transacoes
+  - excluir_transacao    DELETE /api/transacoes/{id} (as criadas no cenário anterior)
+
+Para cada cenário mostra throughput e latências p50/p95/p99 e grava tudo em
+JSON (--output), junto com os parâmetros, o commit e o banco usados. Com
+--baseline, compara com um resultado anterior e termina com código 1 se o
+p95 ou o throughput de algum cenário piorar mais que --tolerancia.
+
+Todos os clientes vêm do mesmo IP, por isso os limites de login
+simultâneo do servidor são elevados para a concorrência do teste.
+
+Requer httpx e uvicorn.
+
+Uso:
+    python bench_api.py --usuarios 10 --transacoes 20000 --requests 2000 --concurrency 50 --output atual.json
+    python bench_api.py --baseline anterior.json --output atual.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+USERNAME = "bench{}"
+PASSWORD = "bench-senha"
+
+
+# ==================== DADOS ====================
+
+def popular(args) -> list:
+    """Cria os dados pelos models (inserções em lote) e devolve os ids dos produtos por usuário"""
+    from sqlalchemy import insert, select
+
+    import auth
+    import estoque
+    import migrate
+    import models
+    import rollup
+    import versoes
+    from database import SessionLocal, engine
+
+    migrate.migrate(engine)
+    hashed = auth.get_password_hash(PASSWORD)
+    inicio = datetime.utcnow() - timedelta(days=365)
+    produtos_por_usuario = []
+
+    db = SessionLocal()
+    try:
+        for u in range(args.usuarios):
+            user = models.User(username=USERNAME.format(u), hashed_password=hashed, role="gerente")
+            db.add(user)
+            db.flush()
+            tabelas = (models.Produto.__table__, models.Cliente.__table__, models.Transacao.__table__)
+            versao = versoes.versao_sessao(db, user.id, *tabelas)
+
+            db.execute(insert(models.Produto), [
+                {"nome": f"Produto {i}", "valor": 1.0 + i % 100, "quantidade": 10 ** 9,
+                 "descricao": f"Descrição do produto {i}", "user_id": user.id,
+                 "created_at": inicio, "versao": versao}
+                for i in range(args.produtos)
+            ])
+            db.execute(insert(models.Cliente), [
+                {"nome": f"Cliente {i}", "email": f"cliente{i}@exemplo.com", "telefone": f"1199{i:07d}",
+                 "user_id": user.id, "created_at": inicio, "versao": versao}
+                for i in range(args.clientes)
+            ])
+            produto_ids = db.execute(
+                select(models.Produto.id).where(models.Produto.user_id == user.id)
+            ).scalars().all()
+            cliente_ids = db.execute(
+                select(models.Cliente.id).where(models.Cliente.user_id == user.id)
+            ).scalars().all()
+
+            for primeiro in range(0, args.transacoes, args.lote):
+                db.execute(insert(models.Transacao), [
+                    {
+                        "tipo": "saida" if i % 4 else "entrada",
+                        "produto_id": produto_ids[i % len(produto_ids)],
+                        "cliente_id": cliente_ids[i % len(cliente_ids)] if cliente_ids and i % 4 else None,
+                        "quantidade": 1 + i % 5,
+                        "valor_unitario": 10.0,
+                        "valor_total": 10.0 * (1 + i % 5),
+                        "numero_pedido": f"PED-{u}-{i}",
+                        "user_id": user.id,
+                        "created_at": inicio + timedelta(seconds=i * 365 * 86400 // max(args.transacoes, 1)),
+                        "versao": versao,
+                    }
+                    for i in range(primeiro, min(primeiro + args.lote, args.transacoes))
+                ])
+            db.commit()
+            produtos_por_usuario.append(produto_ids)
+
+        # Tabelas derivadas, como se as transações tivessem passado pela API
+        rollup.rebuild(db)
+        estoque.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    engine.dispose()
+    return produtos_por_usuario
+
+
+# ==================== SERVIDOR ====================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(args, port: int, workdir: str) -> subprocess.Popen:
+    limite = str(max(args.concurrency, 1))
+    env = dict(
+        os.environ,
+        DB_ASYNC="true" if args.db_async else "false",
+        LOGIN_MAX_CONCURRENT=limite,
+        LOGIN_MAX_PER_IP=limite,
+        LOGIN_MAX_PER_USER=limite,
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("Servidor não respondeu a tempo")
+
+
+# ==================== CARGA ====================
+
+def _resumo(latencias: list, erros: int, duracao: float) -> dict:
+    latencias.sort()
+    total = len(latencias)
+    quantis = statistics.quantiles(latencias, n=100) if total > 1 else latencias * 99
+    return {
+        "requisicoes": total,
+        "erros": erros,
+        "duracao_s": round(duracao, 3),
+        "req_por_s": round(total / duracao, 1) if duracao else 0.0,
+        "p50_ms": round(quantis[49], 2) if total else None,
+        "p95_ms": round(quantis[94], 2) if total else None,
+        "p99_ms": round(quantis[98], 2) if total else None,
+    }
+
+
+async def _executar(total: int, concurrency: int, requisicao) -> dict:
+    """Chama requisicao(i) para i em 0..total-1 com `concurrency` clientes; status != 200 é erro"""
+    latencias = []
+    erros = 0
+    proximo = iter(range(total))
+
+    async def worker():
+        nonlocal erros
+        for i in proximo:
+            inicio = time.perf_counter()
+            r = await requisicao(i)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if r.status_code != 200:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return _resumo(latencias, erros, time.perf_counter() - inicio)
+
+
+async def carga(args, base_url: str, produtos_por_usuario: list) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await _wait_ready(client)
+
+        tokens = []
+        for u in range(args.usuarios):
+            r = await client.post("/api/login", data={"username": USERNAME.format(u), "password": PASSWORD})
+            r.raise_for_status()
+            tokens.append({"Authorization": f"Bearer {r.json()['access_token']}"})
+
+        def usuario(i: int) -> int:
+            return i % args.usuarios
+
+        def login(i):
+            dados = {"username": USERNAME.format(usuario(i)), "password": PASSWORD}
+            return client.post("/api/login", data=dados)
+
+        def listar_produtos(i):
+            return client.get("/api/produtos", params={"limit": args.limit}, headers=tokens[usuario(i)])
+
+        def listar_transacoes(i):
+            return client.get("/api/transacoes", params={"limit": args.limit}, headers=tokens[usuario(i)])
+
+        criadas = []
+
+        async def criar_transacao(i):
+            produtos = produtos_por_usuario[usuario(i)]
+            r = await client.post("/api/transacoes", headers=tokens[usuario(i)], json={
+                "tipo": "saida", "produto_id": produtos[i % len(produtos)],
+                "quantidade": 1, "valor_unitario": 10.0, "valor_total": 10.0,
+            })
+            if r.status_code == 200:
+                criadas.append((usuario(i), r.json()["id"]))
+            return r
+
+        def excluir_transacao(i):
+            u, transacao_id = criadas[i]
+            return client.delete(f"/api/transacoes/{transacao_id}", headers=tokens[u])
+
+        # Aquecimento (conexões, caches, páginas do banco)
+        await _executar(min(200, args.requests), args.concurrency, listar_transacoes)
+
+        resultados = {}
+        for nome, requisicao, total in (
+            ("login", login, min(args.requests, args.logins)),
+            ("listar_produtos", listar_produtos, args.requests),
+            ("listar_transacoes", listar_transacoes, args.requests),
+            ("criar_transacao", criar_transacao, args.requests),
+            ("excluir_transacao", excluir_transacao, None),
+        ):
+            if total is None:
+                total = len(criadas)
+            resultados[nome] = await _executar(total, args.concurrency, requisicao)
+            r = resultados[nome]
+            print(f"{nome:18} | {r['requisicoes']:6} req | {r['req_por_s']:8} req/s | p50 {r['p50_ms']:8} ms | "
+                  f"p95 {r['p95_ms']:8} ms | p99 {r['p99_ms']:8} ms | erros {r['erros']}")
+        return resultados
+
+
+# ==================== COMPARAÇÃO ====================
+
+def comparar(atual: dict, anterior: dict, tolerancia: float) -> list:
+    """Cenários em que o p95 subiu ou o throughput caiu mais que a tolerância"""
+    regressoes = []
+    for nome, r in atual.items():
+        base = anterior.get(nome)
+        if not base or not base.get("p95_ms") or not r.get("p95_ms"):
+            continue
+        if r["p95_ms"] > base["p95_ms"] * (1 + tolerancia):
+            regressoes.append(f"{nome}: p95 {base['p95_ms']} -> {r['p95_ms']} ms")
+        if r["req_por_s"] < base["req_por_s"] * (1 - tolerancia):
+            regressoes.append(f"{nome}: {base['req_por_s']} -> {r['req_por_s']} req/s")
+    return regressoes
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos endpoints mais usados")
+    parser.add_argument("--database-url", help="Banco vazio para o teste (padrão: SQLite temporário)")
+    parser.add_argument("--usuarios", type=int, default=5, help="Usuários criados")
+    parser.add_argument("--produtos", type=int, default=500, help="Produtos por usuário")
+    parser.add_argument("--clientes", type=int, default=500, help="Clientes por usuário")
+    parser.add_argument("--transacoes", type=int, default=20_000, help="Transações por usuário")
+    parser.add_argument("--lote", type=int, default=10_000, help="Linhas por INSERT ao popular")
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições por cenário")
+    parser.add_argument("--logins", type=int, default=200, help="Requisições do cenário de login (bcrypt)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Clientes simultâneos")
+    parser.add_argument("--limit", type=int, default=100, help="Itens por página nas listagens")
+    parser.add_argument("--bcrypt-rounds", type=int, help="Custo do bcrypt (padrão: o do ambiente)")
+    parser.add_argument("--db-async", action="store_true", help="Servidor com DB_ASYNC=true")
+    parser.add_argument("--output", help="Grava o resultado em JSON neste arquivo")
+    parser.add_argument("--baseline", help="Resultado anterior (JSON) para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceita em relação ao baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+    if args.usuarios < 1 or args.produtos < 1:
+        parser.error("--usuarios e --produtos devem ser pelo menos 1")
+
+    # O banco do teste nunca é o banco real: o servidor herda estas variáveis
+    workdir = tempfile.mkdtemp(prefix="nexus-carga-")
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(workdir, "bench.db")
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    sys.path.insert(0, BACKEND_DIR)
+
+    inicio = time.perf_counter()
+    produtos_por_usuario = popular(args)
+    print(f"Banco populado em {time.perf_counter() - inicio:.1f} s")
+
+    port = _free_port()
+    server = _start_server(args, port, workdir)
+    try:
+        cenarios = asyncio.run(carga(args, f"http://127.0.0.1:{port}", produtos_por_usuario))
+    finally:
+        server.terminate()
+        server.wait()
+
+    import auth
+    from database import engine
+
+    resultado = {
+        "meta": {
+            "data": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "banco": engine.dialect.name,
+            "modo": "async" if args.db_async else "sync",
+            "bcrypt_rounds": auth.BCRYPT_ROUNDS,
+            "parametros": {
+                chave: valor for chave, valor in vars(args).items()
+                if chave not in ("database_url", "output", "baseline")
+            },
+        },
+        "cenarios": cenarios,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            anterior = json.load(f)
+        regressoes = comparar(cenarios, anterior.get("cenarios", {}), args.tolerancia)
+        if regressoes:
+            print("REGRESSÃO em relação a", args.baseline)
+            for linha in regressoes:
+                print("  " + linha)
+            sys.exit(1)
+        print(f"Sem regressões em relação a {args.baseline} (tolerância {args.tolerancia:.0%})")
+
+
+if __name__ == "__main__":
+    main()
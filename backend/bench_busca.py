@@ -0,0 +1,121 @@
+"""
+Benchmark: busca textual (/api/<recurso>/busca) com muitos produtos
+
+Cria um banco SQLite temporário com N produtos (divididos entre alguns
+usuários), indexa e mede a latência de buscas típicas: prefixo curto,
+palavra inteira, vários termos e termo raro.
+
+Os nomes misturam palavras comuns de catálogo com um vocabulário longo
+de frequência decrescente (distribuição de Zipf), como num catálogo real.
+--pior-caso usa só as palavras comuns: cada uma aparece em ~1/3 dos
+produtos e toda busca casa com centenas de milhares de linhas.
+
+Uso:
+    python bench_busca.py --produtos 1000000 [--pior-caso]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# O banco do benchmark fica num diretório temporário, nunca no banco real
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="nexus-busca-"), "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+from fastapi import Response
+from sqlalchemy import insert
+
+import busca
+import migrate
+import models
+from database import SessionLocal, engine
+
+PALAVRAS = [
+    "camiseta", "calça", "bermuda", "tênis", "boné", "jaqueta", "meia", "cinto",
+    "azul", "preto", "branco", "vermelho", "verde", "algodão", "couro", "linho",
+    "infantil", "masculino", "feminino", "esportivo", "social", "básico", "premium",
+]
+
+# Vocabulário longo (sílabas combinadas): "bakelo", "dimura", ...
+SILABAS = ["ba", "ke", "lo", "di", "mu", "ra", "to", "si", "ne", "po", "fa", "gu", "ve", "ri", "ca", "ze"]
+VOCABULARIO = [a + b + c for a in SILABAS for b in SILABAS for c in SILABAS]
+
+# Prefixo curto, palavra comum, palavra + prefixo, palavras raras e termo inexistente
+CONSULTAS = ["ca", "bake", "camiseta", "camiseta ba", f"{VOCABULARIO[0]} {VOCABULARIO[1]}", VOCABULARIO[-1], "zzz"]
+CONSULTAS_PIOR_CASO = ["ca", "cam", "camiseta", "camiseta azul", "tênis esport", "algodão premium infantil", "zzz"]
+
+USUARIOS = 4
+
+
+def popular(total: int, pior_caso: bool = False, lote: int = 50_000):
+    db = SessionLocal()
+    try:
+        for user_id in range(1, USUARIOS + 1):
+            db.add(models.User(id=user_id, username=f"bench{user_id}", hashed_password="x"))
+        db.commit()
+
+        rng = random.Random(42)
+        agora = datetime.utcnow()
+        acumulados = list(itertools.accumulate(1 / posicao for posicao in range(1, len(VOCABULARIO) + 1)))
+
+        def texto(comuns: int, raras: int) -> str:
+            if pior_caso:
+                return " ".join(rng.sample(PALAVRAS, comuns + raras))
+            return " ".join([rng.choice(PALAVRAS)] * (comuns > 0) + rng.choices(VOCABULARIO, cum_weights=acumulados, k=raras))
+
+        for inicio in range(0, total, lote):
+            linhas = [
+                {
+                    "nome": texto(1, 2) + f" {i}",
+                    "descricao": texto(0, 5),
+                    "valor": 10.0,
+                    "quantidade": 1,
+                    "user_id": i % USUARIOS + 1,
+                    "created_at": agora,
+                }
+                for i in range(inicio, min(inicio + lote, total))
+            ]
+            db.execute(insert(models.Produto), linhas)
+            db.commit()
+    finally:
+        db.close()
+
+
+def medir(consultas: list, repeticoes: int, limit: int):
+    db = SessionLocal()
+    try:
+        for q in consultas:
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                resultado = busca.buscar(db, "produtos", 1, q, Response(), None, limit)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            tempos.sort()
+            print(f"{q!r:28} | {len(resultado):3} resultados | p50 {statistics.median(tempos):8.2f} ms | "
+                  f"máx {tempos[-1]:8.2f} ms")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência da busca textual")
+    parser.add_argument("--produtos", type=int, default=1_000_000, help="Produtos criados")
+    parser.add_argument("--repeticoes", type=int, default=20, help="Execuções de cada consulta")
+    parser.add_argument("--limit", type=int, default=50, help="Tamanho da página")
+    parser.add_argument("--pior-caso", action="store_true", help="Só palavras comuns (buscas casam com ~1/3 das linhas)")
+    args = parser.parse_args()
+
+    migrate.migrate(engine)
+    inicio = time.perf_counter()
+    popular(args.produtos, args.pior_caso)
+    print(f"{args.produtos} produtos criados e indexados em {time.perf_counter() - inicio:.1f}s")
+    medir(CONSULTAS_PIOR_CASO if args.pior_caso else CONSULTAS, args.repeticoes, args.limit)
+
+
+if __name__ == "__main__":
+    main()
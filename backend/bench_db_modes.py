@@ -0,0 +1,161 @@
+"""
+Benchmark: endpoints de CRUD síncronos x assíncronos (DB_ASYNC)
+
+Sobe um servidor uvicorn (um worker) para cada modo num banco SQLite
+temporário, cria dados de teste e dispara requisições concorrentes de
+listagem e criação de transações. Mostra throughput e latências.
+
+Requer httpx e uvicorn.
+
+Uso:
+    python bench_db_modes.py --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(modo_async: bool, port: int, workdir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL="sqlite:///" + os.path.join(workdir, "bench.db"),
+        DB_ASYNC="true" if modo_async else "false",
+        BCRYPT_ROUNDS="4",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+    )
+
+
+def _stop_server(server: subprocess.Popen, timeout: float = 10.0):
+    """Encerra o servidor; se ele não sair a tempo (requisições presas), mata"""
+    if server.poll() is None:
+        server.terminate()
+        try:
+            server.wait(timeout)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 20.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("Servidor não respondeu a tempo")
+
+
+async def _seed(client: httpx.AsyncClient, produtos: int) -> list:
+    await client.post("/api/register", json={"username": "bench", "password": "bench", "role": "admin"})
+    token = (await client.post("/api/login", data={"username": "bench", "password": "bench"})).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    csv = "nome,valor,quantidade\n" + "".join(f"Produto {i},{i + 1},1000000\n" for i in range(produtos))
+    await client.post("/api/produtos/import", files={"arquivo": ("produtos.csv", csv, "text/csv")})
+    return [p["id"] for p in (await client.get("/api/produtos", params={"limit": 1000})).json()]
+
+
+async def _run_load(client: httpx.AsyncClient, produto_ids: list, total: int, concurrency: int) -> dict:
+    latencias = []
+    erros = 0
+    fila = asyncio.Queue()
+    for i in range(total):
+        fila.put_nowait(i)
+
+    async def worker():
+        nonlocal erros
+        while True:
+            try:
+                i = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            inicio = time.perf_counter()
+            if i % 2:
+                r = await client.get("/api/produtos", params={"limit": 50})
+            else:
+                r = await client.post("/api/transacoes", json={
+                    "tipo": "saida", "produto_id": produto_ids[i % len(produto_ids)],
+                    "quantidade": 1, "valor_unitario": 1, "valor_total": 1,
+                })
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if r.status_code != 200:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        "requisicoes": total,
+        "erros": erros,
+        "duracao_s": round(duracao, 3),
+        "req_por_s": round(total / duracao, 1),
+        "p50_ms": round(quantis[49], 2),
+        "p95_ms": round(quantis[94], 2),
+        "p99_ms": round(quantis[98], 2),
+    }
+
+
+async def bench_mode(modo_async: bool, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="nexus-bench-")
+    port = _free_port()
+    server = _start_server(modo_async, port, workdir)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await _wait_ready(client)
+            produto_ids = await _seed(client, args.produtos)
+            await _run_load(client, produto_ids, min(200, args.requests), args.concurrency)  # aquecimento
+            return await _run_load(client, produto_ids, args.requests, args.concurrency)
+    finally:
+        _stop_server(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os modos síncrono e assíncrono do banco")
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições por modo")
+    parser.add_argument("--concurrency", type=int, default=100, help="Clientes simultâneos")
+    parser.add_argument("--produtos", type=int, default=200, help="Produtos criados antes do teste")
+    parser.add_argument("--output", help="Grava o resultado em JSON neste arquivo")
+    args = parser.parse_args()
+
+    resultados = {}
+    for nome, modo_async in (("sync", False), ("async", True)):
+        resultados[nome] = asyncio.run(bench_mode(modo_async, args))
+        r = resultados[nome]
+        print(f"{nome:6} | {r['req_por_s']:8} req/s | p50 {r['p50_ms']:7} ms | "
+              f"p95 {r['p95_ms']:7} ms | p99 {r['p99_ms']:7} ms | erros {r['erros']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
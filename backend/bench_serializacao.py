@@ -0,0 +1,173 @@
+"""
+Benchmark: custo por linha das listagens (ORM + Pydantic x colunas + orjson)
+
+Cria um banco SQLite temporário com N transações e mede, para a mesma
+consulta, os dois caminhos de resposta:
+
+  - antes: objetos ORM (identity map) validados com from_attributes e
+    convertidos para JSON como o FastAPI faz com response_model
+  - depois: só as colunas do schema (tuplas) codificadas com orjson
+    (serializacao.py, usado pelas listagens)
+
+Mostra o tempo total e por linha, separando consulta e serialização, o
+tempo de GET /api/transacoes?limit=1000 pela API e o pico de memória da
+sincronização completa (/api/sync, em streaming), que não deve crescer com
+o número de transações.
+
+Uso:
+    python bench_serializacao.py --transacoes 20000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+# O banco do benchmark fica num diretório temporário, nunca no banco real
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="nexus-serial-"), "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+from fastapi import Response
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+import main
+import models
+import schemas
+import serializacao
+import versoes
+from database import SessionLocal
+
+USERNAME = "bench"
+
+
+def popular(total: int, lote: int = 50_000):
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == USERNAME).one()
+        produto = models.Produto(nome="Produto", valor=10.0, quantidade=0, user_id=user.id)
+        db.add(produto)
+        db.commit()
+
+        inicio = datetime.utcnow() - timedelta(days=365)
+        for primeiro in range(0, total, lote):
+            db.execute(insert(models.Transacao), [
+                {
+                    "tipo": "saida" if i % 3 else "entrada",
+                    "produto_id": produto.id,
+                    "quantidade": 1 + i % 5,
+                    "valor_unitario": 10.0,
+                    "valor_total": 10.0 * (1 + i % 5),
+                    "numero_pedido": f"PED-{i}",
+                    "observacoes": "entrega expressa" if i % 7 == 0 else None,
+                    "user_id": user.id,
+                    "created_at": inicio + timedelta(seconds=i),
+                    "versao": 1,
+                }
+                for i in range(primeiro, min(primeiro + lote, total))
+            ])
+            db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def _consulta(db, user_id: int, *entidades):
+    return db.query(*entidades).filter(models.Transacao.user_id == user_id).order_by(
+        models.Transacao.created_at.desc(), models.Transacao.id.desc()
+    )
+
+
+def antes(user_id: int):
+    """ORM + validação Pydantic + JSON, como response_model=List[schemas.Transacao]"""
+    adapter = TypeAdapter(List[schemas.Transacao])
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        rows = _consulta(db, user_id, models.Transacao).all()
+        consulta = time.perf_counter()
+        # FastAPI: valida o retorno, gera os valores JSON e codifica (json.dumps)
+        validados = adapter.validate_python(rows, from_attributes=True)
+        conteudo = adapter.dump_python(validados, mode="json")
+        corpo = json.dumps(conteudo, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        fim = time.perf_counter()
+        return len(rows), consulta - inicio, fim - consulta, corpo
+    finally:
+        db.close()
+
+
+def depois(user_id: int):
+    """Só as colunas do schema, codificadas com orjson"""
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        rows = _consulta(db, user_id, *serializacao.colunas(models.Transacao, schemas.Transacao)).all()
+        consulta = time.perf_counter()
+        corpo = serializacao.resposta(serializacao.linhas(rows, schemas.Transacao), Response()).body
+        fim = time.perf_counter()
+        return len(rows), consulta - inicio, fim - consulta, corpo
+    finally:
+        db.close()
+
+
+def medir(nome: str, funcao, user_id: int, repeticoes: int):
+    melhores = None
+    for _ in range(repeticoes):
+        total, consulta, serializacao_, corpo = funcao(user_id)
+        if melhores is None or consulta + serializacao_ < melhores[1] + melhores[2]:
+            melhores = (total, consulta, serializacao_, corpo)
+    total, consulta, serializacao_, corpo = melhores
+    por_linha = (consulta + serializacao_) / total * 1e6
+    print(f"{nome:8} | {total} linhas | consulta {consulta * 1000:8.1f} ms | serialização "
+          f"{serializacao_ * 1000:8.1f} ms | {por_linha:6.2f} µs/linha")
+    return corpo
+
+
+def medir_api(client: TestClient, repeticoes: int):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        response = client.get("/api/transacoes", params={"limit": 1000})
+        response.raise_for_status()
+        tempos.append(time.perf_counter() - inicio)
+    print(f"GET /api/transacoes?limit=1000: melhor de {repeticoes} {min(tempos) * 1000:.1f} ms")
+
+
+def medir_sync(user_id: int):
+    """Pico de memória alocada enquanto o JSON da sincronização completa é gerado"""
+    tracemalloc.start()
+    enviados = sum(len(parte) for parte in versoes.sincronizar(user_id, 0))
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"GET /api/sync (completo): {enviados / 1e6:.1f} MB gerados, pico de memória {pico / 1e6:.1f} MB")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Custo por linha das listagens")
+    parser.add_argument("--transacoes", type=int, default=20_000, help="Transações criadas")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Execuções de cada caminho (vale a melhor)")
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        client.post("/api/register", json={"username": USERNAME, "password": USERNAME})
+        token = client.post("/api/login", data={"username": USERNAME, "password": USERNAME}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        user_id = popular(args.transacoes)
+        corpo_antes = medir("antes", antes, user_id, args.repeticoes)
+        corpo_depois = medir("depois", depois, user_id, args.repeticoes)
+        if json.loads(corpo_antes) != json.loads(corpo_depois):
+            print("ERRO: as duas respostas são diferentes")
+            sys.exit(1)
+        print("Respostas idênticas")
+        medir_api(client, args.repeticoes)
+        medir_sync(user_id)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,243 @@
+"""Importação e exportação em lote (CSV / NDJSON)"""
+import codecs
+import csv
+import io
+import json
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, UploadFile
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+import catalogo
+import eventos
+import schemas
+import versoes
+from database import SessionLocal
+
+# Linhas validadas e inseridas por lote (um executemany + um commit por lote)
+CHUNK_SIZE = 500
+
+# Linhas lidas do banco por vez na exportação
+EXPORT_BATCH_SIZE = 1000
+
+# Máximo de erros detalhados na resposta (o total continua sendo contado)
+MAX_ERROS = 1000
+
+# Bytes lidos por vez na checagem de encoding
+BLOCO_ENCODING = 64 * 1024
+
+FORMATOS = ("csv", "ndjson")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+PRODUTO_EXPORT_COLUMNS = ["id"] + list(schemas.ProdutoCreate.model_fields) + ["created_at"]
+CLIENTE_EXPORT_COLUMNS = ["id"] + list(schemas.ClienteCreate.model_fields) + ["created_at"]
+TRANSACAO_EXPORT_COLUMNS = ["id"] + list(schemas.TransacaoCreate.model_fields) + ["created_at"]
+
+
+def detect_format(upload: UploadFile, formato: Optional[str]) -> str:
+    """Formato explícito ou deduzido pelo nome/content-type do arquivo"""
+    if formato:
+        if formato not in FORMATOS:
+            raise HTTPException(status_code=400, detail="Formato inválido (use csv ou ndjson)")
+        return formato
+
+    filename = (upload.filename or "").lower()
+    content_type = (upload.content_type or "").lower()
+    if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+def _erro_encoding(arquivo: BinaryIO) -> Optional[Dict]:
+    """
+    Confere se o arquivo inteiro é UTF-8 antes de qualquer lote ser gravado.
+
+    Devolve o erro (com a linha do primeiro byte inválido) ou None; o arquivo
+    volta ao início nos dois casos.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    linha = 1
+    try:
+        while True:
+            bloco = arquivo.read(BLOCO_ENCODING)
+            # Bytes de um caractere cortado no fim do bloco anterior
+            pendente = len(decoder.getstate()[0])
+            try:
+                decoder.decode(bloco, final=not bloco)
+            except UnicodeDecodeError as e:
+                # e.start conta a partir dos bytes pendentes
+                linha += bloco[:max(e.start - pendente, 0)].count(b"\n")
+                return {"linha": linha, "erro": f"Arquivo não está em UTF-8 ({e.reason})"}
+            if not bloco:
+                return None
+            linha += bloco.count(b"\n")
+    finally:
+        arquivo.seek(0)
+
+
+def _read_rows(arquivo: BinaryIO, formato: str) -> Iterator[Tuple[int, object]]:
+    """Lê o arquivo linha a linha, devolvendo (número da linha, dados brutos)"""
+    stream = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+
+    try:
+        if formato == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                # Campos vazios ficam de fora para valerem os padrões do schema
+                yield reader.line_num, {k: v for k, v in row.items() if k and v not in ("", None)}
+        else:
+            for linha, line in enumerate(stream, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield linha, json.loads(line)
+                except ValueError as e:
+                    yield linha, e
+    finally:
+        # O arquivo é de quem chamou: o wrapper não deve fechá-lo ao ser descartado
+        stream.detach()
+
+
+def _format_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in error.errors()
+        )
+    return str(error)
+
+
+def import_rows(
+    db: Session,
+    arquivo: BinaryIO,
+    formato: str,
+    schema: Type[BaseModel],
+    model,
+    user_id: int,
+    ao_inserir: Optional[Callable[[Session, List], None]] = None,
+    progresso: Optional[Callable[[int, int], None]] = None,
+) -> Dict:
+    """
+    Valida as linhas com o schema Pydantic e insere em lotes.
+
+    Linhas inválidas são reportadas em "erros" sem interromper a importação.
+    Um arquivo que não é UTF-8 é recusado antes do primeiro lote, com um erro
+    só (na linha do primeiro byte inválido).
+    ao_inserir(db, objetos) recebe os objetos de cada lote (com id), antes do
+    commit do lote. progresso(inseridos, rejeitados) é chamado após cada lote.
+    """
+    erro = _erro_encoding(arquivo)
+    if erro is not None:
+        # Nada é gravado: o arquivo é recusado inteiro
+        return {"inseridos": 0, "rejeitados": 1, "erros": [erro]}
+
+    inseridos = 0
+    rejeitados = 0
+    erros: List[Dict] = []
+    lote: List[Dict] = []
+
+    def flush():
+        nonlocal inseridos
+        if lote:
+            if versoes.versionado(model):
+                versao = versoes.versao_sessao(db, user_id, model.__table__)
+                for row in lote:
+                    row["versao"] = versao
+                eventos.sincronizar(db, user_id)
+                catalogo.alterado(db, versoes.recurso(model), user_id)
+            if ao_inserir is None:
+                db.execute(insert(model), lote)
+            else:
+                stmt = insert(model).returning(model, sort_by_parameter_order=True)
+                ao_inserir(db, db.scalars(stmt, lote).all())
+            db.commit()
+            inseridos += len(lote)
+            lote.clear()
+            if progresso is not None:
+                progresso(inseridos, rejeitados)
+
+    for linha, raw in _read_rows(arquivo, formato):
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            if not isinstance(raw, dict):
+                raise ValueError("Linha deve ser um objeto JSON")
+            row = schema.model_validate(raw)
+        except (ValidationError, ValueError) as e:
+            rejeitados += 1
+            if len(erros) < MAX_ERROS:
+                erros.append({"linha": linha, "erro": _format_error(e)})
+            continue
+
+        lote.append({**row.model_dump(), "user_id": user_id, "created_at": datetime.utcnow()})
+        if len(lote) >= CHUNK_SIZE:
+            flush()
+
+    flush()
+    return {"inseridos": inseridos, "rejeitados": rejeitados, "erros": erros}
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(
+    model,
+    columns: List[str],
+    user_id: int,
+    formato: str,
+    progresso: Optional[Callable[[int], None]] = None,
+    filtros: Sequence = (),
+) -> Iterable[str]:
+    """
+    Gera o arquivo de exportação em pedaços.
+
+    Usa uma sessão própria (a do request já foi fechada quando a resposta
+    começa a ser enviada) e lê as linhas do banco em lotes via yield_per.
+    progresso(linhas) é chamado após cada lote; `filtros` restringem as linhas
+    além do usuário.
+    """
+    db = SessionLocal()
+    try:
+        stmt = (
+            select(*[getattr(model, c) for c in columns])
+            .where(model.user_id == user_id, *filtros)
+            .order_by(model.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        result = db.execute(stmt)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if formato == "csv" else None
+        if writer:
+            writer.writerow(columns)
+
+        exportadas = 0
+        for partition in result.partitions():
+            for row in partition:
+                if writer:
+                    writer.writerow([_serialize(v) for v in row])
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, map(_serialize, row))), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            exportadas += len(partition)
+            if progresso is not None:
+                progresso(exportadas)
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
@@ -0,0 +1,179 @@
+"""
+Busca textual ranqueada em produtos, clientes e transações
+
+- SQLite: tabelas FTS5 de conteúdo externo (produtos_fts, clientes_fts,
+  transacoes_fts), mantidas por triggers e criadas pela migração 0001
+- PostgreSQL: índices GIN sobre to_tsvector('simple', ...), criados pela
+  migração 0001 com a mesma expressão de _vetor
+- Outros bancos: ILIKE (sem índice)
+
+Todos os termos precisam aparecer; o último (o que ainda está sendo
+digitado) é buscado por prefixo: "camiseta az" encontra "Camiseta Azul".
+
+O próprio índice ranqueia e limita: bm25 do FTS5 (SQLite) ou ts_rank
+(PostgreSQL), com termos no campo principal (nome, número do pedido)
+pesando mais. Todas as ocorrências do usuário são consideradas, então um
+resultado exato antigo aparece antes de um parcial recente. Paginação por
+cursor (X-Next-Cursor) sobre (relevância, id), como nas listagens.
+"""
+import base64
+import math
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, case, column, func, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+import models
+from pagination import NEXT_CURSOR_HEADER
+
+# Colunas pesquisáveis de cada recurso (a primeira é a principal)
+CAMPOS = {
+    "produtos": (models.Produto, ("nome", "descricao")),
+    "clientes": (models.Cliente, ("nome", "email", "telefone")),
+    "transacoes": (models.Transacao, ("numero_pedido", "observacoes")),
+}
+
+# Termos considerados por busca (o resto é ignorado)
+MAX_TERMOS = 8
+
+# Peso de um termo encontrado no campo principal (nos demais, 1)
+PESO_PRINCIPAL = 10
+
+# Letras e dígitos, como o tokenizador unicode61 do FTS5
+_TERMO = re.compile(r"[^\W_]+")
+
+_CONFIG = literal_column("'simple'")
+
+
+def termos(q: str) -> List[str]:
+    """Palavras da busca, em minúsculas (sem aspas nem operadores do FTS5/tsquery)"""
+    return _TERMO.findall(q.lower())[:MAX_TERMOS]
+
+
+# Separadores que o parser do PostgreSQL mantém dentro de um token (emails,
+# "PED-123", telefones); trocados por espaço, como no tokenizador do FTS5
+_SEPARADORES = "@.-_/+"
+
+
+def _vetor(colunas):
+    """Expressão tsvector do PostgreSQL (a mesma do índice GIN)"""
+    # coalesce e || (não concat_ws) porque o índice exige funções IMMUTABLE
+    textos = [func.coalesce(c, literal_column("''")) for c in colunas]
+    texto = textos[0]
+    for outro in textos[1:]:
+        texto = texto.op("||")(literal_column("' '")).op("||")(outro)
+    espacos = literal_column("'" + " " * len(_SEPARADORES) + "'")
+    return func.to_tsvector(_CONFIG, func.translate(texto, literal_column(f"'{_SEPARADORES}'"), espacos))
+
+# ==================== CONSULTA ====================
+
+def _ranqueadas(dialect: str, recurso: str, user_id: int, palavras: List[str]):
+    """(id, relevancia) das linhas do usuário que casam com a busca; maior relevância primeiro"""
+    model, campos = CAMPOS[recurso]
+
+    if dialect == "sqlite":
+        fts = table(f"{model.__tablename__}_fts", column("rowid"))
+        frase = " ".join(f'"{p}"' for p in palavras) + "*"
+        expressao = f"user_id: {int(user_id)} AND {{{' '.join(campos)}}}: ({frase})"
+        # Peso por coluna do FTS; user_id (última) não pontua. bm25: menor é melhor
+        pesos = [PESO_PRINCIPAL] + [1] * (len(campos) - 1) + [0]
+        relevancia = -func.bm25(literal_column(fts.name), *pesos)
+        return (
+            select(fts.c.rowid.label("id"), relevancia.label("relevancia"))
+            .where(literal_column(fts.name).op("MATCH")(expressao))
+        )
+
+    colunas = [getattr(model, c) for c in campos]
+    if dialect == "postgresql":
+        consulta = func.to_tsquery(_CONFIG, " & ".join(palavras) + ":*")
+        filtro = _vetor(colunas).op("@@")(consulta)
+        # Campo principal com peso A, os demais com D (pesos padrão do ts_rank: A = 10 x D).
+        # Calculado só nas linhas que o índice GIN encontrou
+        pesado = func.setweight(_vetor(colunas[:1]), literal_column("'A'"))
+        if len(colunas) > 1:
+            pesado = pesado.op("||")(func.setweight(_vetor(colunas[1:]), literal_column("'D'")))
+        relevancia = func.ts_rank(pesado, consulta)
+    else:
+        filtro = and_(*[or_(*[c.ilike(f"%{p}%") for c in colunas]) for p in palavras])
+        relevancia = sum(
+            case((c.ilike(f"%{p}%"), PESO_PRINCIPAL if posicao == 0 else 1), else_=0)
+            for p in palavras for posicao, c in enumerate(colunas)
+        )
+    return select(model.id.label("id"), relevancia.label("relevancia")).where(model.user_id == user_id, filtro)
+
+
+def encode_cursor(relevancia: float, row_id: int) -> str:
+    """Cursor opaco a partir da última linha da página (relevância exata com repr)"""
+    raw = f"{float(relevancia)!r}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii")
+        relevancia, row_id = raw.split("|", 1)
+        relevancia = float(relevancia)
+        if not math.isfinite(relevancia):
+            raise ValueError(relevancia)
+        return relevancia, int(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _pagina(db: Session, recurso: str, user_id: int, q: str, cursor: Optional[str], limit: int) -> list:
+    """
+    Até `limit` linhas (id, relevancia) depois do cursor, da mais relevante à
+    menos; empate: mais recentes primeiro (keyset sobre relevância e id)
+    """
+    palavras = termos(q)
+    if not palavras:
+        return []
+
+    ranqueadas = _ranqueadas(db.get_bind().dialect.name, recurso, user_id, palavras).cte("ranqueadas")
+    stmt = select(ranqueadas.c.id, ranqueadas.c.relevancia).order_by(
+        ranqueadas.c.relevancia.desc(), ranqueadas.c.id.desc()
+    )
+    if cursor:
+        relevancia, row_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            ranqueadas.c.relevancia < relevancia,
+            and_(ranqueadas.c.relevancia == relevancia, ranqueadas.c.id < row_id),
+        ))
+    return db.execute(stmt.limit(limit)).all()
+
+
+def _linhas(db: Session, recurso: str, pagina: list) -> list:
+    """Objetos das linhas da página, na ordem da página"""
+    if not pagina:
+        return []
+    model, _ = CAMPOS[recurso]
+    # Ids antes das linhas: com IN (subconsulta) o SQLite varreria as linhas do
+    # usuário; a consulta ranqueada já filtra por user_id
+    por_id = {row.id: row for row in db.query(model).filter(model.id.in_([p.id for p in pagina]))}
+    return [por_id[p.id] for p in pagina if p.id in por_id]
+
+
+def mais_relevante(db: Session, recurso: str, user_id: int, q: str):
+    """Melhor resultado da busca `q` (ou None), ex.: o produto citado numa pergunta"""
+    rows = _linhas(db, recurso, _pagina(db, recurso, user_id, q, None, 1))
+    return rows[0] if rows else None
+
+
+def buscar(
+    db: Session,
+    recurso: str,
+    user_id: int,
+    q: str,
+    response: Response,
+    cursor: Optional[str],
+    limit: int,
+) -> list:
+    """Página de resultados do recurso para a busca `q`, do mais relevante ao menos"""
+    pagina = _pagina(db, recurso, user_id, q, cursor, limit + 1)
+    if len(pagina) > limit:
+        pagina = pagina[:limit]
+        ultima = pagina[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(ultima.relevancia, ultima.id)
+    return _linhas(db, recurso, pagina)
@@ -0,0 +1,372 @@
+"""
+Cache das listagens do catálogo (GET /api/categorias e GET /api/produtos)
+
+Read-through: a resposta já serializada (JSON + X-Next-Cursor) fica
+guardada por usuário, recurso e URL (filtros, cursor, limit). Na próxima
+leitura, nem a consulta nem a serialização rodam.
+
+Invalidação:
+- No commit que altera categorias ou produtos de um usuário (CRUD e
+  importação pelo ORM, ajustes de estoque de estoque.aplicar, usados nas
+  vendas), as entradas daquele usuário e recurso são apagadas.
+- Cada entrada guarda a versão do usuário (versoes.py) em que foi gerada.
+  Se a versão atual é outra (o usuário alterou clientes ou transações, ou a
+  alteração foi feita em outro worker, que não alcança este cache em
+  memória), uma consulta indexada confere se alguma linha do recurso mudou
+  ou foi excluída depois da versão da entrada. Se não, a entrada continua
+  valendo. Assim o cache nunca devolve dados antigos, mesmo com vários
+  workers e entradas gravadas durante uma alteração concorrente.
+
+Backends (CATALOGO_CACHE):
+- memoria (padrão): LRU por processo, com CATALOGO_CACHE_SIZE entradas
+- redis: servidor Redis (ou compatível) em CATALOGO_CACHE_REDIS_URL,
+  compartilhado entre os workers. Falhas do Redis viram cache miss
+- desligado: sem cache
+
+CATALOGO_CACHE_TTL limita quanto tempo uma entrada fica guardada (memória
+ocupada); a validade dos dados não depende dele.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+import orjson
+from fastapi import Request, Response
+from sqlalchemy import event, exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import metricas
+import models
+from pagination import NEXT_CURSOR_HEADER
+
+logger = logging.getLogger(__name__)
+
+CATALOGO_CACHE = os.environ.get("CATALOGO_CACHE", "memoria").strip().lower()
+CATALOGO_CACHE_SIZE = int(os.environ.get("CATALOGO_CACHE_SIZE", "2048"))
+CATALOGO_CACHE_TTL = float(os.environ.get("CATALOGO_CACHE_TTL", "300"))
+CATALOGO_CACHE_REDIS_URL = os.environ.get("CATALOGO_CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Espera máxima por uma resposta do Redis (segundos) antes de seguir sem cache
+CATALOGO_CACHE_REDIS_TIMEOUT = float(os.environ.get("CATALOGO_CACHE_REDIS_TIMEOUT", "0.05"))
+
+RECURSOS = {
+    "categorias": models.Categoria,
+    "produtos": models.Produto,
+}
+
+_RECURSO_POR_MODELO = {model: recurso for recurso, model in RECURSOS.items()}
+
+
+class Entrada(NamedTuple):
+    versao: int
+    corpo: bytes
+    cursor: Optional[str]
+
+# ==================== BACKENDS ====================
+
+class _Estatisticas:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.revalidacoes = 0
+        self.invalidacoes = 0
+        self._lock = threading.Lock()
+
+    def contar(self, recurso: str, resultado: str):
+        metricas.registrar_cache_catalogo(recurso, resultado)
+        with self._lock:
+            if resultado == "miss":
+                self.misses += 1
+            else:
+                self.hits += 1
+                if resultado == "revalidado":
+                    self.revalidacoes += 1
+
+    def invalidou(self):
+        with self._lock:
+            self.invalidacoes += 1
+
+    def dados(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidacoes": self.revalidacoes,
+                "invalidacoes": self.invalidacoes,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class CacheMemoria:
+    """LRU com expiração (TTL) dentro do processo"""
+
+    # Chamadas rápidas: podem rodar direto no event loop
+    bloqueante = False
+
+    def __init__(self, maxsize: int = CATALOGO_CACHE_SIZE, ttl: float = CATALOGO_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._data: "OrderedDict[Tuple[int, str, str], tuple]" = OrderedDict()
+        # (user_id, recurso) -> URLs guardadas, para invalidar todas de uma vez
+        self._grupos: Dict[Tuple[int, str], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _remover(self, chave: Tuple[int, str, str]):
+        del self._data[chave]
+        grupo = self._grupos.get(chave[:2])
+        if grupo is not None:
+            grupo.discard(chave[2])
+            if not grupo:
+                del self._grupos[chave[:2]]
+
+    def ler(self, user_id: int, recurso: str, url: str) -> Optional[Entrada]:
+        chave = (user_id, recurso, url)
+        with self._lock:
+            item = self._data.get(chave)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                self._remover(chave)
+                return None
+            self._data.move_to_end(chave)
+            return item[1]
+
+    def gravar(self, user_id: int, recurso: str, url: str, entrada: Entrada):
+        if self.maxsize <= 0:
+            return
+        chave = (user_id, recurso, url)
+        with self._lock:
+            self._data[chave] = (time.monotonic() + self.ttl, entrada)
+            self._data.move_to_end(chave)
+            self._grupos.setdefault(chave[:2], set()).add(url)
+            while len(self._data) > self.maxsize:
+                self._remover(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidar(self, user_id: int, recurso: str):
+        with self._lock:
+            for url in self._grupos.pop((user_id, recurso), ()):
+                self._data.pop((user_id, recurso, url), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memoria",
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "evictions": self.evictions,
+            }
+
+
+class CacheRedis:
+    """
+    Um hash por usuário e recurso (campo = URL), apagado inteiro na
+    invalidação. O TTL vale para o hash, contado da última gravação; o
+    limite de memória é o do servidor (maxmemory + política de remoção).
+    """
+
+    # Chamadas de rede: nos endpoints assíncronos, vão para o threadpool
+    bloqueante = True
+
+    def __init__(self, url: str = CATALOGO_CACHE_REDIS_URL, ttl: float = CATALOGO_CACHE_TTL):
+        import redis
+
+        self.url = url
+        self.ttl = ttl
+        self._erro = redis.RedisError
+        self._redis = redis.Redis.from_url(
+            url,
+            socket_timeout=CATALOGO_CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=CATALOGO_CACHE_REDIS_TIMEOUT,
+        )
+
+    @staticmethod
+    def _chave(user_id: int, recurso: str) -> str:
+        return f"nexus:catalogo:{user_id}:{recurso}"
+
+    def ler(self, user_id: int, recurso: str, url: str) -> Optional[Entrada]:
+        try:
+            valor = self._redis.hget(self._chave(user_id, recurso), url)
+        except self._erro as e:
+            logger.warning("Redis indisponível, lendo sem cache: %s", e)
+            return None
+        if valor is None:
+            return None
+        # Cabeçalho JSON (versão e cursor) + "\n" + corpo
+        cabecalho, _, corpo = valor.partition(b"\n")
+        versao, cursor = orjson.loads(cabecalho)
+        return Entrada(versao, corpo, cursor)
+
+    def gravar(self, user_id: int, recurso: str, url: str, entrada: Entrada):
+        chave = self._chave(user_id, recurso)
+        valor = orjson.dumps([entrada.versao, entrada.cursor]) + b"\n" + entrada.corpo
+        try:
+            with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hset(chave, url, valor)
+                pipe.expire(chave, max(1, int(self.ttl)))
+                pipe.execute()
+        except self._erro as e:
+            logger.warning("Redis indisponível, resposta não guardada: %s", e)
+
+    def invalidar(self, user_id: int, recurso: str):
+        try:
+            self._redis.delete(self._chave(user_id, recurso))
+        except self._erro as e:
+            # A versão da entrada ainda impede que ela seja usada com dados antigos
+            logger.warning("Redis indisponível, invalidação não aplicada: %s", e)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "ttl": self.ttl}
+
+
+def _criar_cache():
+    if CATALOGO_CACHE == "memoria":
+        return CacheMemoria()
+    if CATALOGO_CACHE == "redis":
+        return CacheRedis()
+    if CATALOGO_CACHE in ("", "desligado", "off", "false", "0"):
+        return None
+    raise ValueError(f"CATALOGO_CACHE inválido: {CATALOGO_CACHE} (use memoria, redis ou desligado)")
+
+
+cache = _criar_cache()
+estatisticas = _Estatisticas()
+
+
+def stats() -> dict:
+    """Estatísticas do cache neste processo (apenas admin)"""
+    if cache is None:
+        return {"backend": "desligado"}
+    return {**cache.stats(), **estatisticas.dados()}
+
+# ==================== LEITURA ====================
+
+def _alterado(recurso: str, user_id: int, desde: int):
+    """Alguma linha do recurso alterada ou excluída depois da versão `desde`? (índices *_user_versao)"""
+    model = RECURSOS[recurso]
+    return select(or_(
+        exists().where(model.user_id == user_id, model.versao > desde),
+        exists().where(
+            models.Exclusao.user_id == user_id,
+            models.Exclusao.versao > desde,
+            models.Exclusao.recurso == recurso,
+        ),
+    ))
+
+
+def _url(request: Request) -> str:
+    return request.url.query
+
+
+def _resposta(entrada: Entrada, response: Response) -> Response:
+    headers = dict(response.headers)
+    if entrada.cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = entrada.cursor
+    return Response(content=entrada.corpo, media_type="application/json", headers=headers)
+
+
+def _candidata(request: Request, user_id: int, recurso: str):
+    """Entrada guardada para a URL e versão atual do usuário (lida por versoes.condicional)"""
+    versao = getattr(request.state, "versao", None)
+    if cache is None or versao is None:
+        return None, None
+    return versao, cache.ler(user_id, recurso, _url(request))
+
+
+def _usar(
+    request: Request, response: Response, user_id: int, recurso: str,
+    versao: int, entrada: Optional[Entrada], alterado: Optional[bool],
+) -> Optional[Response]:
+    if entrada is None or alterado:
+        estatisticas.contar(recurso, "miss")
+        return None
+    if alterado is None:
+        estatisticas.contar(recurso, "hit")
+    else:
+        estatisticas.contar(recurso, "revalidado")
+        # Vale também para a versão atual: a próxima leitura não consulta
+        cache.gravar(user_id, recurso, _url(request), entrada._replace(versao=versao))
+    return _resposta(entrada, response)
+
+
+def buscar(db: Session, request: Request, response: Response, user_id: int, recurso: str) -> Optional[Response]:
+    """Resposta guardada, ainda válida, para esta listagem (None = consultar e chamar guardar)"""
+    versao, entrada = _candidata(request, user_id, recurso)
+    if versao is None:
+        return None
+    alterado = None
+    if entrada is not None and entrada.versao != versao:
+        alterado = bool(db.execute(_alterado(recurso, user_id, entrada.versao)).scalar())
+    return _usar(request, response, user_id, recurso, versao, entrada, alterado)
+
+
+async def buscar_async(
+    db: AsyncSession, request: Request, response: Response, user_id: int, recurso: str
+) -> Optional[Response]:
+    """Mesmo que buscar, para os endpoints com AsyncSession"""
+    if cache is not None and cache.bloqueante:
+        versao, entrada = await run_in_threadpool(_candidata, request, user_id, recurso)
+    else:
+        versao, entrada = _candidata(request, user_id, recurso)
+    if versao is None:
+        return None
+    alterado = None
+    if entrada is not None and entrada.versao != versao:
+        alterado = bool((await db.execute(_alterado(recurso, user_id, entrada.versao))).scalar())
+    if cache.bloqueante:
+        return await run_in_threadpool(_usar, request, response, user_id, recurso, versao, entrada, alterado)
+    return _usar(request, response, user_id, recurso, versao, entrada, alterado)
+
+
+def guardar(request: Request, user_id: int, recurso: str, resposta: Response) -> Response:
+    """Guarda a resposta recém-gerada, com a versão lida antes da consulta"""
+    versao = getattr(request.state, "versao", None)
+    if cache is not None and versao is not None:
+        entrada = Entrada(versao, resposta.body, resposta.headers.get(NEXT_CURSOR_HEADER))
+        cache.gravar(user_id, recurso, _url(request), entrada)
+    return resposta
+
+
+async def guardar_async(request: Request, user_id: int, recurso: str, resposta: Response) -> Response:
+    if cache is not None and cache.bloqueante:
+        return await run_in_threadpool(guardar, request, user_id, recurso, resposta)
+    return guardar(request, user_id, recurso, resposta)
+
+# ==================== INVALIDAÇÃO ====================
+
+def alterado(db: Session, recurso: str, user_id: int):
+    """Recurso alterado por SQL direto (fora do ORM): invalida no commit"""
+    if cache is not None and recurso in RECURSOS:
+        db.info.setdefault("catalogo", set()).add((user_id, recurso))
+
+
+def _apos_flush(db: Session, flush_context):
+    if cache is None:
+        return
+    for colecao in (db.new, db.dirty, db.deleted):
+        for obj in colecao:
+            recurso = _RECURSO_POR_MODELO.get(type(obj))
+            if recurso is not None and obj.user_id is not None:
+                alterado(db, recurso, obj.user_id)
+
+
+def _apos_commit(db: Session):
+    for user_id, recurso in db.info.pop("catalogo", ()):
+        cache.invalidar(user_id, recurso)
+        estatisticas.invalidou()
+
+
+def _apos_rollback(db: Session):
+    db.info.pop("catalogo", None)
+
+
+event.listen(Session, "after_flush", _apos_flush)
+event.listen(Session, "after_commit", _apos_commit)
+event.listen(Session, "after_rollback", _apos_rollback)
@@ -0,0 +1,215 @@
+"""
+Script para auditar os planos de consulta dos endpoints (SQLite)
+
+Sobe a API num banco temporário, chama cada endpoint, captura o SQL gerado
+e roda EXPLAIN QUERY PLAN em cada consulta. Termina com código 1 se alguma
+consulta fizer varredura completa (SCAN) de uma tabela ou se algum endpoint
+não responder 2xx (as consultas dele ficariam fora da auditoria).
+
+Requer httpx (usado pelo TestClient do FastAPI).
+"""
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# O banco da auditoria fica num diretório temporário, nunca no banco real
+_PASTA = tempfile.mkdtemp(prefix="nexus-plans-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_PASTA, "auditoria.db")
+os.environ["TAREFAS_DIR"] = os.path.join(_PASTA, "tarefas")
+# As tarefas são executadas pela auditoria, não por uma thread em paralelo
+os.environ["TAREFAS_NA_API"] = "false"
+# A migração roda antes da captura: só as consultas dos endpoints são auditadas
+os.environ["AUTO_MIGRATE"] = "false"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+import migrate
+import tarefas
+from database import SessionLocal, engine
+
+migrate.migrate(engine)
+
+# Consultas que varrem a tabela inteira por definição
+SCAN_PERMITIDO = {
+    "users",  # GET /api/users lista todos os usuários (admin)
+}
+
+capturadas = []
+
+# Respostas fora de 2xx (e dos status aceitos no momento)
+erros_http = []
+_aceitos = set()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def capturar(conn, cursor, statement, parameters, context, executemany):
+    sql = statement.lstrip().upper()
+    if executemany or not sql.startswith(("SELECT", "UPDATE", "DELETE")):
+        return
+    capturadas.append((statement, parameters))
+
+
+def verificar_resposta(resposta):
+    if resposta.is_success or resposta.status_code in _aceitos:
+        return
+    resposta.read()
+    erros_http.append(f"{resposta.request.method} {resposta.request.url} -> {resposta.status_code} {resposta.text[:200]}")
+
+
+@contextmanager
+def aceitar(*status: int):
+    """Aceita também estes status nas chamadas do bloco"""
+    _aceitos.update(status)
+    try:
+        yield
+    finally:
+        _aceitos.difference_update(status)
+
+
+def exercitar_endpoints(client: TestClient):
+    """Chama cada endpoint da API ao menos uma vez"""
+    client.post("/api/register", json={"username": "auditoria", "password": "x", "role": "admin"})
+    client.post("/api/register", json={"username": "outro", "password": "x"})
+    token = client.post("/api/login", data={"username": "auditoria", "password": "x"}).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    categoria = client.post("/api/categorias", json={"nome": "Cat"}).json()
+    produto = client.post("/api/produtos", json={"nome": "Prod", "valor": 10, "quantidade": 100, "categoria_id": categoria["id"]}).json()
+    cliente = client.post("/api/clientes", json={"nome": "Cli"}).json()
+
+    for i in range(3):
+        client.post("/api/transacoes", json={
+            "tipo": "saida", "produto_id": produto["id"], "cliente_id": cliente["id"],
+            "quantidade": 1, "valor_unitario": 10, "valor_total": 10, "numero_pedido": f"PED-{i}",
+        })
+    client.post("/api/vendas", json={"cliente_id": cliente["id"], "numero_pedido": "V-1", "itens": [
+        {"produto_id": produto["id"], "quantidade": 2, "valor_unitario": 10, "valor_total": 20},
+    ]})
+
+    client.get("/api/me")
+    client.get("/api/users")
+    client.get("/api/categorias")
+    client.put(f"/api/categorias/{categoria['id']}", json={"nome": "Cat 2"})
+
+    cursor = client.get("/api/produtos", params={"limit": 1}).headers.get("x-next-cursor")
+    client.get("/api/produtos", params={"limit": 1, "cursor": cursor, "categoria_id": categoria["id"]})
+    client.put(f"/api/produtos/{produto['id']}", json={"valor": 11})
+    client.get("/api/produtos/export").content
+
+    cursor = client.get("/api/clientes", params={"limit": 1}).headers.get("x-next-cursor")
+    client.get("/api/clientes", params={"limit": 1, "cursor": cursor})
+    client.put(f"/api/clientes/{cliente['id']}", json={"nome": "Cli 2"})
+    client.get("/api/clientes/export").content
+
+    cursor = client.get("/api/transacoes", params={"limit": 1}).headers.get("x-next-cursor")
+    client.get("/api/transacoes", params={"limit": 1, "cursor": cursor})
+    client.get("/api/transacoes", params={"produto_id": produto["id"]})
+    client.get("/api/transacoes", params={"cliente_id": cliente["id"]})
+    client.get("/api/transacoes", params={"tipo": "saida", "data_inicio": "2000-01-01T00:00:00"})
+    client.get("/api/transacoes", params={"numero_pedido": "PED"})
+    client.get("/api/transacoes/export", params={"data_inicio": "2000-01-01", "data_fim": date.today().isoformat()}).content
+    with aceitar(501):  # sem pyarrow
+        client.get("/api/transacoes/export", params={"formato": "arrow"}).content
+
+    client.get("/api/stats")
+    client.get("/api/stats/totais")
+    client.get("/api/stats/estoque")
+    client.get("/api/stats/produtos")
+    client.get("/api/stats/clientes")
+    hoje = date.today().isoformat()
+    for agrupar in ("dia", "mes", "produto"):
+        client.get("/api/relatorios/vendas", params={"data_inicio": hoje, "data_fim": hoje, "agrupar": agrupar})
+
+    client.put(f"/api/produtos/{produto['id']}", json={"quantidade": 200})
+    client.get("/api/estoque/historico", params={"data": "2000-01-01T00:00:00"})
+    client.get("/api/estoque/historico", params={"data": f"{hoje}T23:59:59", "produto_id": produto["id"]})
+    cursor = client.get("/api/estoque/movimentos", params={"limit": 1}).headers.get("x-next-cursor")
+    client.get("/api/estoque/movimentos", params={"limit": 1, "cursor": cursor, "produto_id": produto["id"]})
+
+    client.get("/api/produtos/busca", params={"q": "pro"})
+    client.get("/api/clientes/busca", params={"q": "cli", "limit": 1})
+    client.get("/api/transacoes/busca", params={"q": "ped 1"})
+
+    for mensagem in (
+        "análise geral", "produtos mais vendidos", "melhores clientes", "baixo estoque", "sem estoque",
+        "buscar produto prod", "quanto o cliente cli gastou?", "comparar prod vs extra", "vendas hoje",
+    ):
+        client.post("/api/assistant/query", json={"mensagem": mensagem})
+
+    tarefa = client.post("/api/tarefas", json={"tipo": "exportacao", "parametros": {"recurso": "produtos"}}).json()
+    with SessionLocal() as db:
+        tarefas.executar(tarefas.reservar(db, "auditoria"), "auditoria", threading.Event())
+        tarefas.recuperar(db)
+        tarefas.limpar(db)
+    client.get("/api/tarefas")
+    client.get(f"/api/tarefas/{tarefa['id']}")
+    client.get(f"/api/tarefas/{tarefa['id']}/resultado")
+    with aceitar(501):  # sem pyarrow
+        parquet = client.post("/api/tarefas", json={"tipo": "parquet"})
+    if parquet.status_code == 202:
+        with SessionLocal() as db:
+            tarefas.executar(tarefas.reservar(db, "auditoria"), "auditoria", threading.Event())
+    pendente = client.post("/api/tarefas", json={"tipo": "resumos"}).json()
+    client.post(f"/api/tarefas/{pendente['id']}/cancelar")
+
+    client.get("/api/sync")
+    client.get("/api/sync", params={"since": 1})
+    client.get("/api/sync", params={"janela": 1})
+
+    transacoes = client.get("/api/transacoes").json()
+    client.delete(f"/api/transacoes/{transacoes[0]['id']}")
+
+    extra = client.post("/api/produtos", json={"nome": "Extra", "valor": 1}).json()
+    client.delete(f"/api/produtos/{extra['id']}")
+    client.delete(f"/api/produtos/{produto['id']}")
+    client.delete(f"/api/clientes/{cliente['id']}")
+
+    outro = client.get("/api/users").json()[-1]
+    client.delete(f"/api/users/{outro['id']}")
+    client.delete(f"/api/categorias/{categoria['id']}")
+
+
+def auditar() -> int:
+    with TestClient(main.app) as client:
+        client.event_hooks["response"].append(verificar_resposta)
+        exercitar_endpoints(client)
+
+    falhas = 0
+    vistas = set()
+    with engine.connect() as conn:
+        for statement, parameters in capturadas:
+            if statement in vistas:
+                continue
+            vistas.add(statement)
+
+            plano = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            scans = [
+                row[-1] for row in plano
+                if row[-1].startswith("SCAN ")
+                and row[-1].split()[1] not in SCAN_PERMITIDO
+                and not row[-1].startswith("SCAN CONSTANT ROW")
+                and "VIRTUAL TABLE INDEX" not in row[-1]  # consulta ao índice FTS5
+            ]
+            if scans:
+                falhas += 1
+                print("❌ Varredura completa:")
+                print(f"   {' '.join(statement.split())}")
+                for scan in scans:
+                    print(f"   -> {scan}")
+
+    for erro in erros_http:
+        print(f"❌ Resposta de erro: {erro}")
+
+    print("-" * 60)
+    print(f"{len(vistas)} consultas auditadas, {falhas} com varredura completa, {len(erros_http)} respostas de erro")
+    return 1 if falhas or erros_http else 0
+
+
+if __name__ == "__main__":
+    sys.exit(auditar())
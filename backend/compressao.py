@@ -0,0 +1,160 @@
+"""
+Compressão das respostas (gzip / brotli), opcional
+
+COMPRESSION lista as codificações ativas, em ordem de preferência
+(ex.: "br,gzip"); vazio (padrão) desliga. Cada resposta usa a primeira que
+o cliente aceita (Accept-Encoding).
+
+- Respostas menores que COMPRESSION_MIN_SIZE bytes vão sem compressão
+- Respostas em streaming (exportações, /api/sync) são comprimidas pedaço a
+  pedaço, com flush a cada pedaço: o cliente recebe os dados à medida que
+  são gerados e a memória do servidor não cresce com o tamanho da resposta
+- Só tipos textuais (JSON, NDJSON, CSV, texto) são comprimidos
+
+brotli requer o pacote `brotli`.
+"""
+import os
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSION = [
+    c.strip().lower() for c in os.environ.get("COMPRESSION", "").split(",") if c.strip()
+]
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+
+# Nível: rápido o bastante para comprimir a cada requisição
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+CODIFICACOES = ("br", "gzip")
+
+_COMPRIMIVEIS = ("application/json", "application/x-ndjson", "text/")
+
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def pedaco(self, dados: bytes) -> bytes:
+        return self._z.compress(dados) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def fim(self, dados: bytes) -> bytes:
+        return self._z.compress(dados) + self._z.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        import brotli
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def pedaco(self, dados: bytes) -> bytes:
+        return self._c.process(dados) + self._c.flush()
+
+    def fim(self, dados: bytes) -> bytes:
+        return self._c.process(dados) + self._c.finish()
+
+
+_COMPRESSORES = {"gzip": _Gzip, "br": _Brotli}
+
+
+def aceitas(accept_encoding: str) -> List[str]:
+    """Codificações aceitas pelo cliente (ignora as com q=0)"""
+    resultado = []
+    for item in accept_encoding.split(","):
+        nome, _, parametro = item.partition(";")
+        chave, _, valor = parametro.strip().partition("=")
+        try:
+            if chave == "q" and float(valor) == 0:
+                continue
+        except ValueError:
+            continue
+        resultado.append(nome.strip().lower())
+    return resultado
+
+
+class CompressaoMiddleware:
+    def __init__(self, app: ASGIApp, codificacoes: List[str], minimum_size: int = COMPRESSION_MIN_SIZE):
+        invalidas = set(codificacoes) - set(CODIFICACOES)
+        if invalidas:
+            raise ValueError(f"COMPRESSION inválido: {', '.join(sorted(invalidas))} (use br e/ou gzip)")
+        if "br" in codificacoes:
+            try:
+                import brotli  # noqa: F401
+            except ImportError:
+                raise RuntimeError("COMPRESSION=br requer o pacote brotli (pip install brotli)")
+        self.app = app
+        self.codificacoes = codificacoes
+        self.minimum_size = minimum_size
+
+    def _escolher(self, scope: Scope) -> Optional[str]:
+        cliente = aceitas(Headers(scope=scope).get("accept-encoding", ""))
+        for codificacao in self.codificacoes:
+            if codificacao in cliente:
+                return codificacao
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        codificacao = self._escolher(scope) if scope["type"] == "http" else None
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+        await _Resposta(codificacao, self.minimum_size, send)(self.app, scope, receive)
+
+
+class _Resposta:
+    """Acompanha uma resposta: decide na primeira parte do corpo se comprime"""
+
+    def __init__(self, codificacao: str, minimum_size: int, send: Send):
+        self.codificacao = codificacao
+        self.minimum_size = minimum_size
+        self.send = send
+        self.inicio: Message = {}
+        self.compressor = None
+        self.decidido = False
+
+    async def __call__(self, app: ASGIApp, scope: Scope, receive: Receive):
+        await app(scope, receive, self.enviar)
+
+    def _comprimivel(self) -> bool:
+        headers = Headers(raw=self.inicio["headers"])
+        tipo = headers.get("content-type", "")
+        return "content-encoding" not in headers and tipo.startswith(_COMPRIMIVEIS)
+
+    async def enviar(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Só envia o início depois de saber se os headers mudam
+            self.inicio = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        corpo = message.get("body", b"")
+        continua = message.get("more_body", False)
+
+        if not self.decidido:
+            self.decidido = True
+            pequeno = not continua and len(corpo) < self.minimum_size
+            if self._comprimivel() and not pequeno:
+                self.compressor = _COMPRESSORES[self.codificacao]()
+                headers = MutableHeaders(raw=self.inicio["headers"])
+                headers["Content-Encoding"] = self.codificacao
+                headers.add_vary_header("Accept-Encoding")
+                if continua:
+                    del headers["Content-Length"]
+                else:
+                    corpo = self.compressor.fim(corpo)
+                    headers["Content-Length"] = str(len(corpo))
+                    message["body"] = corpo
+                    self.compressor = None
+                    await self.send(self.inicio)
+                    await self.send(message)
+                    return
+            await self.send(self.inicio)
+
+        if self.compressor is not None:
+            message["body"] = self.compressor.pedaco(corpo) if continua else self.compressor.fim(corpo)
+        await self.send(message)
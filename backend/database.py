@@ -1,19 +1,92 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# SQLite database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./nexus.db"
+def _env_bool(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() in ("1", "true", "yes")
+
+# URL do banco (SQLite local por padrão, PostgreSQL em produção)
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./nexus.db")
+if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
+    # Railway/Heroku ainda usam o esquema antigo, que o SQLAlchemy 2 não aceita
+    SQLALCHEMY_DATABASE_URL = "postgresql://" + SQLALCHEMY_DATABASE_URL[len("postgres://"):]
+
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# Pool de conexões
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", "true")
+
+# SQLite: WAL permite leituras durante escritas; busy_timeout espera o lock em vez de falhar
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+
+def _engine_options() -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if IS_SQLITE and ":memory:" in SQLALCHEMY_DATABASE_URL:
+        return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **_engine_options()
 )
 
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Modo assíncrono (aiosqlite / asyncpg) para os endpoints de CRUD
+ASYNC_DB = _env_bool("DB_ASYNC", "false")
+
+def async_database_url(url: str) -> str:
+    """Mesma URL com o driver assíncrono correspondente"""
+    scheme, rest = url.split("://", 1)
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_options = _engine_options()
+    if IS_SQLITE and "pool_size" in async_options:
+        # aiosqlite usa NullPool por padrão; reaproveitar conexões evita reabrir o arquivo
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+        async_options["poolclass"] = AsyncAdaptedQueuePool
+    async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL), **async_options)
+    if IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    # expire_on_commit=False: objetos continuam legíveis após o commit sem I/O implícito
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -21,3 +94,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,219 @@
+"""
+Operações de migração que não bloqueiam as vendas (usadas nas revisões do Alembic)
+
+Todas podem ser repetidas: se a migração for interrompida, rodar de novo
+continua de onde parou (colunas e índices existentes são pulados, o
+preenchimento só altera as linhas pendentes).
+
+- DDL curto (ADD COLUMN) roda fora da transação da revisão, com commit
+  imediato: o lock da tabela não fica preso até o fim da migração. No
+  PostgreSQL, com lock_timeout curto e novas tentativas, para não enfileirar
+  as escritas atrás de uma transação longa
+- Índices: CREATE INDEX CONCURRENTLY no PostgreSQL (não bloqueia escritas).
+  O SQLite não tem equivalente: a criação bloqueia escritas enquanto dura
+  (as requisições esperam até SQLITE_BUSY_TIMEOUT)
+- Preenchimento de colunas e de tabelas de totais em lotes pela chave
+  primária, cada lote na sua transação, com pausa entre lotes
+"""
+import logging
+import os
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Espera máxima por um lock de tabela no PostgreSQL antes de desistir e tentar de novo
+MIGRATION_LOCK_TIMEOUT = os.environ.get("MIGRATION_LOCK_TIMEOUT", "2s")
+MIGRATION_LOCK_RETRIES = int(os.environ.get("MIGRATION_LOCK_RETRIES", "10"))
+
+# Linhas por lote no preenchimento e pausa entre lotes (segundos)
+MIGRATION_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "5000"))
+MIGRATION_BATCH_PAUSE = float(os.environ.get("MIGRATION_BATCH_PAUSE", "0.05"))
+
+
+def _postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _colunas(tabela: str) -> set:
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns(tabela)}
+
+
+def _indices(tabela: str) -> set:
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(tabela)}
+
+
+def _lock_indisponivel(erro: OperationalError) -> bool:
+    # 55P03 = lock_not_available (lock_timeout)
+    return getattr(erro.orig, "pgcode", None) == "55P03"
+
+
+def _ddl_curto(executar):
+    """Executa DDL com commit imediato (e lock_timeout + novas tentativas no PostgreSQL)"""
+    with op.get_context().autocommit_block():
+        if not _postgresql():
+            executar()
+            return
+        bind = op.get_bind()
+        bind.exec_driver_sql(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'")
+        try:
+            for tentativa in range(1, MIGRATION_LOCK_RETRIES + 1):
+                try:
+                    executar()
+                    return
+                except OperationalError as e:
+                    if not _lock_indisponivel(e) or tentativa == MIGRATION_LOCK_RETRIES:
+                        raise
+                    logger.info("Tabela ocupada, nova tentativa (%d/%d)", tentativa, MIGRATION_LOCK_RETRIES)
+                    time.sleep(min(2 ** tentativa * 0.1, 5))
+        finally:
+            bind.exec_driver_sql("RESET lock_timeout")
+
+
+def criar_tabela(nome: str, *colunas, indices: Sequence[Tuple[str, Sequence[str]]] = ()):
+    """
+    Cria uma tabela nova se ainda não existir, com os índices (nome, colunas).
+    As colunas são escritas na revisão, não tiradas de models.py: a revisão
+    continua criando a mesma tabela quando o model mudar depois.
+    """
+    if not sa.inspect(op.get_bind()).has_table(nome):
+        op.create_table(nome, *colunas)
+    for indice, campos in indices:
+        criar_indice(indice, nome, campos)
+
+
+def adicionar_coluna(tabela: str, coluna: sa.Column):
+    """
+    ADD COLUMN se a coluna não existir. A coluna precisa ser anulável ou ter
+    server_default constante: assim a operação só altera o catálogo, sem
+    reescrever a tabela. Para exigir valor nas linhas antigas, preencha com
+    preencher() em seguida.
+    """
+    if not coluna.nullable and coluna.server_default is None:
+        raise ValueError(f"{tabela}.{coluna.name}: coluna nova deve ser anulável ou ter server_default")
+    if coluna.name in _colunas(tabela):
+        return
+    _ddl_curto(lambda: op.add_column(tabela, coluna))
+
+
+def criar_indice(nome: str, tabela: str, colunas: Sequence[str], unique: bool = False, **kw):
+    """Cria o índice se não existir (CONCURRENTLY no PostgreSQL)"""
+    if _postgresql():
+        bind = op.get_bind()
+        # Um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido: recria
+        invalido = bind.execute(sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :nome AND NOT i.indisvalid"
+        ), {"nome": nome}).first()
+        if invalido:
+            remover_indice(nome, tabela)
+    if nome in _indices(tabela):
+        return
+    with op.get_context().autocommit_block():
+        op.create_index(nome, tabela, list(colunas), unique=unique, postgresql_concurrently=True, **kw)
+
+
+def remover_indice(nome: str, tabela: str):
+    """Remove o índice se existir (CONCURRENTLY no PostgreSQL)"""
+    if _postgresql():
+        with op.get_context().autocommit_block():
+            op.get_bind().exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{nome}"')
+        return
+    if nome in _indices(tabela):
+        with op.get_context().autocommit_block():
+            op.drop_index(nome, table_name=tabela)
+
+
+def remover_fk(nome: str, tabela: str):
+    """
+    Remove a FK se existir. Só altera o catálogo, com commit imediato (no
+    PostgreSQL com lock_timeout curto e novas tentativas). O SQLite não
+    remove constraints sem recriar a tabela: não use nele.
+    """
+    _ddl_curto(lambda: op.get_bind().exec_driver_sql(f'ALTER TABLE {tabela} DROP CONSTRAINT IF EXISTS "{nome}"'))
+
+
+def _em_lotes(tabela: str, comando: sa.TextClause, lote: int, pausa: float, chave: str) -> int:
+    """
+    Executa `comando` (com :inicio e :fim) para cada faixa de `lote` valores
+    da chave primária de `tabela`, um commit por faixa. As linhas criadas
+    durante a execução também são alcançadas. Devolve o total de linhas.
+    """
+    maximo = sa.text(f"SELECT max({chave}) FROM {tabela}")
+    total = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        inicio = 0
+        fim_da_tabela: Optional[int] = bind.execute(maximo).scalar()
+        while fim_da_tabela is not None and inicio < fim_da_tabela:
+            fim = inicio + lote
+            total += bind.execute(comando, {"inicio": inicio, "fim": fim}).rowcount
+            inicio = fim
+            if inicio >= fim_da_tabela:
+                # Alcança as linhas inseridas enquanto o comando rodava
+                fim_da_tabela = bind.execute(maximo).scalar()
+            if pausa:
+                time.sleep(pausa)
+    return total
+
+
+def preencher(
+    tabela: str,
+    valores: Dict[str, str],
+    pendentes: str,
+    lote: int = MIGRATION_BATCH_SIZE,
+    pausa: float = MIGRATION_BATCH_PAUSE,
+    chave: str = "id",
+) -> int:
+    """
+    UPDATE em lotes de `lote` ids (faixas da chave primária), um commit por
+    lote. `valores` mapeia coluna -> expressão SQL; `pendentes` é a condição
+    das linhas que ainda faltam (ex.: "valor_total IS NULL"), o que torna o
+    preenchimento retomável. As linhas criadas durante o preenchimento
+    também são alcançadas, mas o código novo já deve gravar a coluna.
+    Devolve o número de linhas alteradas.
+    """
+    atribuicoes = ", ".join(f"{coluna} = {expressao}" for coluna, expressao in valores.items())
+    atualizar = sa.text(
+        f"UPDATE {tabela} SET {atribuicoes} WHERE {chave} > :inicio AND {chave} <= :fim AND ({pendentes})"
+    )
+    total = _em_lotes(tabela, atualizar, lote, pausa, chave)
+    logger.info("%s: %d linhas preenchidas", tabela, total)
+    return total
+
+
+def acumular(
+    destino: str,
+    chave_destino: Sequence[str],
+    valores: Dict[str, str],
+    origem: str,
+    filtro: str = "1 = 1",
+    lote: int = MIGRATION_BATCH_SIZE,
+    pausa: float = MIGRATION_BATCH_PAUSE,
+    chave: str = "id",
+) -> int:
+    """
+    Preenche uma tabela de totais a partir de `origem`, em lotes como
+    preencher(): cada faixa de ids de `origem` é agrupada por `chave_destino`
+    e somada às linhas de `destino` (INSERT ... ON CONFLICT DO UPDATE; SQLite
+    e PostgreSQL). `valores` mapeia coluna de destino -> expressão de
+    agregação sobre `origem` (as colunas da chave vêm de `origem` com o mesmo
+    nome). Não é retomável por si: para repetir, apague `destino` antes.
+    Devolve o número de linhas de destino gravadas.
+    """
+    colunas = list(chave_destino) + list(valores)
+    chaves = ", ".join(chave_destino)
+    somas = ", ".join(f"{coluna} = {destino}.{coluna} + excluded.{coluna}" for coluna in valores)
+    inserir = sa.text(
+        f"INSERT INTO {destino} ({', '.join(colunas)}) "
+        f"SELECT {chaves}, {', '.join(valores.values())} FROM {origem} "
+        f"WHERE {chave} > :inicio AND {chave} <= :fim AND ({filtro}) GROUP BY {chaves} "
+        f"ON CONFLICT ({chaves}) DO UPDATE SET {somas}"
+    )
+    total = _em_lotes(origem, inserir, lote, pausa, chave)
+    logger.info("%s: %d linhas acumuladas", destino, total)
+    return total
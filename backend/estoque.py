@@ -0,0 +1,304 @@
+"""
+Movimentação de estoque com UPDATE condicional (sem ler-modificar-gravar)
+
+Cada ajuste é um único UPDATE atômico:
+
+    UPDATE produtos SET quantidade = quantidade - :q
+    WHERE id = :id AND user_id = :user AND quantidade >= :q
+
+e o resultado é conferido pela linha devolvida (RETURNING). Vendas
+simultâneas do mesmo produto não perdem atualizações nem deixam o
+estoque negativo, sem precisar de lock explícito.
+
+Toda alteração de estoque também é registrada no livro de movimentos
+(movimentos_estoque, somente inserção). Snapshots periódicos do saldo por
+produto (snapshots_estoque) permitem consultar o estoque em qualquer data
+com uma busca de snapshot mais os movimentos posteriores a ele.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Update, and_, case, delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+import catalogo
+import eventos
+import models
+import schemas
+import serializacao
+import versoes
+
+ORIGENS = ("inicial", "ajuste", "entrada", "saida", "estorno")
+
+# Data usada como criação de produtos antigos sem created_at
+INICIO = datetime(1970, 1, 1)
+
+
+def ajuste(produto_id: int, user_id: int, delta: int, versao: int) -> Update:
+    """UPDATE que soma delta ao estoque; se delta < 0, só aplica se houver saldo"""
+    P = models.Produto
+    stmt = (
+        update(P)
+        .where(P.id == produto_id, P.user_id == user_id)
+        .values(quantidade=P.quantidade + delta, versao=versao)
+    )
+    if delta < 0:
+        stmt = stmt.where(P.quantidade >= -delta)
+    # O UPDATE é a fonte da verdade; não sincroniza objetos da sessão
+    return stmt.execution_options(synchronize_session=False)
+
+
+def consulta_produto(produto_id: int, user_id: int):
+    """SELECT do produto, usado só para explicar um ajuste que falhou"""
+    return select(models.Produto).filter(models.Produto.id == produto_id, models.Produto.user_id == user_id)
+
+
+def aplicar(db: Session, produto_id: int, user_id: int, delta: int) -> bool:
+    """Executa o ajuste; False se o produto não existe ou não há estoque suficiente"""
+    versao = versoes.versao_sessao(db, user_id, models.Produto.__table__)
+    # RETURNING: o produto atualizado vai para o feed de eventos sem outra consulta
+    colunas = serializacao.colunas(models.Produto, schemas.Produto)
+    row = db.execute(ajuste(produto_id, user_id, delta, versao).returning(*colunas)).first()
+    if row is None:
+        return False
+    eventos.registrar(db, "produtos", user_id, serializacao.linhas([row], schemas.Produto)[0])
+    catalogo.alterado(db, "produtos", user_id)
+    return True
+
+
+def erro(produto, detalhe: str = "Estoque insuficiente") -> HTTPException:
+    """Erro de um ajuste que não afetou linhas: produto inexistente ou sem saldo"""
+    if produto is None:
+        return HTTPException(status_code=404, detail="Produto não encontrado")
+    return HTTPException(status_code=400, detail=detalhe)
+
+
+# ==================== LIVRO DE MOVIMENTOS ====================
+
+def movimento(
+    user_id: int,
+    produto_id: int,
+    quantidade: int,
+    origem: str,
+    transacao_id: Optional[int] = None,
+    created_at: Optional[datetime] = None,
+) -> Dict:
+    """Linha do livro de movimentos (quantidade com sinal)"""
+    return {
+        "user_id": user_id,
+        "produto_id": produto_id,
+        "transacao_id": transacao_id,
+        "origem": origem,
+        "quantidade": quantidade,
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+def de_produto(produto) -> Dict:
+    """Movimento com o estoque inicial de um produto recém-criado"""
+    return movimento(produto.user_id, produto.id, produto.quantidade or 0, "inicial", created_at=produto.created_at)
+
+
+def de_transacao(transacao, estorno: bool = False) -> Dict:
+    """Movimento de uma transação, ou o estorno dela ao ser desfeita"""
+    entrada = transacao.tipo == "entrada"
+    quantidade = transacao.quantidade if entrada else -transacao.quantidade
+    if estorno:
+        return movimento(transacao.user_id, transacao.produto_id, -quantidade, "estorno", transacao.id)
+    return movimento(
+        transacao.user_id, transacao.produto_id, quantidade,
+        "entrada" if entrada else "saida", transacao.id, transacao.created_at,
+    )
+
+
+def registrar(db: Session, movimentos: Iterable[Dict]):
+    """
+    Acrescenta movimentos ao livro (os de quantidade zero são ignorados).
+
+    Não faz commit: deve rodar na mesma transação do banco que altera o estoque.
+    """
+    linhas = [m for m in movimentos if m["quantidade"]]
+    if linhas:
+        db.execute(insert(models.MovimentoEstoque), linhas)
+
+
+def _saldos(instante: datetime, inclusivo: bool = True):
+    """
+    Saldo de cada produto no instante: último snapshot com ate <= instante
+    mais os movimentos a partir dele (até o instante, inclusive ou não).
+
+    Subconsultas correlacionadas por produto: cada uma é uma busca no índice,
+    então o custo não cresce com o histórico inteiro.
+    """
+    P = models.Produto
+    S = models.SnapshotEstoque
+    M = models.MovimentoEstoque
+
+    def ultimo_snapshot(coluna):
+        return (
+            select(coluna)
+            .where(S.user_id == P.user_id, S.produto_id == P.id, S.ate <= instante)
+            .order_by(S.ate.desc())
+            .limit(1)
+            .correlate(P)
+            .scalar_subquery()
+        )
+
+    desde = func.coalesce(ultimo_snapshot(S.ate), INICIO)
+    fim = M.created_at <= instante if inclusivo else M.created_at < instante
+
+    def replay(coluna):
+        return (
+            select(coluna)
+            .where(M.user_id == P.user_id, M.produto_id == P.id, M.created_at >= desde, fim)
+            .correlate(P)
+            .scalar_subquery()
+        )
+
+    return select(
+        P.user_id,
+        P.id,
+        P.nome,
+        P.valor,
+        func.coalesce(ultimo_snapshot(S.quantidade), 0).label("base"),
+        replay(func.coalesce(func.sum(M.quantidade), 0)).label("variacao"),
+        replay(func.count()).label("movimentos"),
+    )
+
+
+def saldos_em(db: Session, user_id: int, instante: datetime, produto_id: Optional[int] = None) -> List[Dict]:
+    """Estoque e valor (pelo preço atual) de cada produto do usuário no instante"""
+    stmt = _saldos(instante).where(models.Produto.user_id == user_id).order_by(models.Produto.id)
+    if produto_id is not None:
+        stmt = stmt.where(models.Produto.id == produto_id)
+
+    itens = []
+    for _, pid, nome, valor, base, variacao, _ in db.execute(stmt):
+        quantidade = base + variacao
+        itens.append({
+            "produto_id": pid,
+            "nome": nome,
+            "quantidade": quantidade,
+            "valor_unitario": valor,
+            "valor_total": quantidade * valor,
+        })
+    return itens
+
+
+def snapshot(db: Session, ate: datetime, user_id: Optional[int] = None) -> int:
+    """
+    Grava o saldo dos produtos que tiveram movimentos desde o último snapshot,
+    considerando os movimentos anteriores a `ate`. Idempotente; não faz commit.
+    """
+    stmt = _saldos(ate, inclusivo=False)
+    if user_id is not None:
+        stmt = stmt.where(models.Produto.user_id == user_id)
+
+    linhas = [
+        {"user_id": uid, "produto_id": pid, "ate": ate, "quantidade": base + variacao}
+        for uid, pid, _, _, base, variacao, movimentos in db.execute(stmt)
+        if movimentos
+    ]
+    if linhas:
+        db.execute(insert(models.SnapshotEstoque), linhas)
+    return len(linhas)
+
+
+def snapshots_diarios(db: Session, ate: datetime, user_id: Optional[int] = None) -> int:
+    """
+    Snapshot no fim de cada dia (meia-noite UTC) que teve movimentos, até `ate`.
+
+    Cada dia só reprocessa os movimentos desde o snapshot anterior.
+    """
+    M = models.MovimentoEstoque
+    S = models.SnapshotEstoque
+
+    ultimo = select(func.max(S.ate))
+    dias = select(func.date(M.created_at)).distinct().order_by(func.date(M.created_at))
+    if user_id is not None:
+        ultimo = ultimo.where(S.user_id == user_id)
+        dias = dias.where(M.user_id == user_id)
+    ultimo = db.execute(ultimo).scalar()
+    if ultimo is not None:
+        dias = dias.where(M.created_at >= ultimo)
+
+    total = 0
+    for (dia,) in db.execute(dias).all():
+        if isinstance(dia, str):  # SQLite devolve date() como texto
+            dia = datetime.fromisoformat(dia)
+        limite = datetime(dia.year, dia.month, dia.day) + timedelta(days=1)
+        if limite > ate:
+            break
+        if ultimo is not None and limite <= ultimo:
+            continue
+        total += snapshot(db, limite, user_id)
+    return total
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recria o livro de movimentos a partir das transações e do estoque atual.
+
+    Cada transação vira um movimento de entrada/saída na sua data. A diferença
+    entre o estoque atual e a soma das transações (estoque inicial e ajustes
+    manuais sem histórico) vira um movimento "inicial" na criação do produto.
+    Os snapshots do usuário são apagados. Não faz commit.
+    """
+    P = models.Produto
+    T = models.Transacao
+    M = models.MovimentoEstoque
+    S = models.SnapshotEstoque
+
+    for tabela in (M, S):
+        apagar = delete(tabela)
+        if user_id is not None:
+            apagar = apagar.where(tabela.user_id == user_id)
+        db.execute(apagar)
+
+    entrada = T.tipo == "entrada"
+    transacoes = (
+        select(
+            T.user_id,
+            T.produto_id,
+            T.id,
+            case((entrada, "entrada"), else_="saida"),
+            case((entrada, T.quantidade), else_=-T.quantidade),
+            T.created_at,
+        )
+        .join(P, and_(P.id == T.produto_id, P.user_id == T.user_id))
+        .where(T.created_at.isnot(None))
+    )
+    if user_id is not None:
+        transacoes = transacoes.where(T.user_id == user_id)
+    colunas = ["user_id", "produto_id", "transacao_id", "origem", "quantidade", "created_at"]
+    db.execute(insert(M).from_select(colunas, transacoes))
+
+    soma = (
+        select(func.coalesce(func.sum(M.quantidade), 0))
+        .where(M.user_id == P.user_id, M.produto_id == P.id)
+        .correlate(P)
+        .scalar_subquery()
+    )
+    iniciais = select(
+        P.user_id,
+        P.id,
+        literal(None),
+        literal("inicial"),
+        func.coalesce(P.quantidade, 0) - soma,
+        func.coalesce(P.created_at, INICIO),
+    )
+    if user_id is not None:
+        iniciais = iniciais.where(P.user_id == user_id)
+    db.execute(insert(M).from_select(colunas, iniciais))
+
+    # Movimentos "inicial" sem efeito não precisam ficar no livro
+    apagar = delete(M).where(M.origem == "inicial", M.quantidade == 0)
+    if user_id is not None:
+        apagar = apagar.where(M.user_id == user_id)
+    db.execute(apagar)
+
+    total = select(func.count()).select_from(M)
+    if user_id is not None:
+        total = total.where(M.user_id == user_id)
+    return db.execute(total).scalar()
@@ -0,0 +1,333 @@
+"""
+Feed de alterações em tempo real: GET /api/eventos (Server-Sent Events)
+
+Cada commit que altera dados de um usuário publica um evento com as linhas
+alteradas, no mesmo formato de /api/sync:
+
+    data: {"versao": 42, "produtos": [{...}], "transacoes": [{...}], "excluidos": {"clientes": [7]}}
+
+As listas vazias são omitidas. Com "sincronizar": true, o evento não traz
+as linhas (importação em lote, cliente lento): o cliente chama
+/api/sync?since=<sua versão>. Se `versao` pular um número, o cliente perdeu
+um evento e também deve sincronizar.
+
+As linhas vêm do que a transação já tinha em mãos: objetos inseridos,
+RETURNING do ajuste de estoque (estoque.aplicar) e, só para linhas editadas,
+uma leitura pela chave primária dentro da transação (a linha está travada
+até o commit, então é o valor confirmado). Vendas não fazem consultas a mais.
+
+Entrega (EVENTOS_BROKER):
+- memoria (padrão): pub/sub dentro do processo; só alcança conexões do
+  mesmo worker. Sem ninguém conectado, nada é capturado
+- postgresql: LISTEN/NOTIFY no próprio banco, entre todos os workers
+"""
+import asyncio
+import logging
+import os
+import queue
+import select as select_io
+import threading
+from typing import Dict, Optional, Set
+
+import orjson
+from fastapi import Depends, Query, Request
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+import auth
+import database
+import schemas
+import serializacao
+import versoes
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+EVENTOS_BROKER = os.environ.get("EVENTOS_BROKER", "memoria").strip().lower()
+# Eventos pendentes por conexão; acima disso o cliente é mandado sincronizar
+EVENTOS_FILA = int(os.environ.get("EVENTOS_FILA", "256"))
+# Segundos entre comentários de keep-alive (proxies fecham conexões ociosas)
+EVENTOS_PING = float(os.environ.get("EVENTOS_PING", "15"))
+
+SINCRONIZAR = b'{"sincronizar":true}'
+
+# Sem buffer em proxies (nginx) e sem cache
+HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# ==================== ENTREGA ====================
+
+class _Assinatura:
+    """Fila de uma conexão, consumida no event loop que a criou"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.fila: asyncio.Queue = asyncio.Queue(EVENTOS_FILA)
+
+    def _colocar(self, dados: bytes):
+        try:
+            self.fila.put_nowait(dados)
+        except asyncio.QueueFull:
+            # Cliente lento: descarta o acumulado e manda sincronizar
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            self.fila.put_nowait(SINCRONIZAR)
+
+    def entregar(self, dados: bytes):
+        # Os commits dos endpoints síncronos acontecem no threadpool
+        self.loop.call_soon_threadsafe(self._colocar, dados)
+
+
+class BrokerMemoria:
+    """Pub/sub dentro do processo"""
+
+    def __init__(self):
+        self._assinaturas: Dict[int, Set[_Assinatura]] = {}
+        self._lock = threading.Lock()
+
+    def interessado(self, user_id: int) -> bool:
+        """Se vale a pena capturar as alterações do usuário"""
+        return user_id in self._assinaturas
+
+    def assinar(self, user_id: int) -> _Assinatura:
+        assinatura = _Assinatura(asyncio.get_running_loop())
+        with self._lock:
+            self._assinaturas.setdefault(user_id, set()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, user_id: int, assinatura: _Assinatura):
+        with self._lock:
+            conjunto = self._assinaturas.get(user_id)
+            if conjunto is not None:
+                conjunto.discard(assinatura)
+                if not conjunto:
+                    del self._assinaturas[user_id]
+
+    def _entregar(self, user_id: int, dados: bytes):
+        with self._lock:
+            destinos = list(self._assinaturas.get(user_id, ()))
+        for assinatura in destinos:
+            assinatura.entregar(dados)
+
+    def publicar(self, user_id: int, dados: bytes):
+        self._entregar(user_id, dados)
+
+
+class BrokerPostgres(BrokerMemoria):
+    """
+    NOTIFY/LISTEN no PostgreSQL do DATABASE_URL: cada worker escuta o canal
+    e entrega às suas conexões. O envio roda numa thread, fora da requisição.
+    """
+
+    CANAL = "nexus_eventos"
+    # O payload do NOTIFY tem limite de 8000 bytes
+    LIMITE = 7900
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._envios: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._iniciado = False
+        self._inicio_lock = threading.Lock()
+
+    def _iniciar(self):
+        with self._inicio_lock:
+            if not self._iniciado:
+                threading.Thread(target=self._escutar, name="eventos-listen", daemon=True).start()
+                threading.Thread(target=self._enviar, name="eventos-notify", daemon=True).start()
+                self._iniciado = True
+
+    def interessado(self, user_id: int) -> bool:
+        # Conexões de outros workers não são visíveis daqui
+        return True
+
+    def assinar(self, user_id: int) -> _Assinatura:
+        self._iniciar()
+        return super().assinar(user_id)
+
+    def publicar(self, user_id: int, dados: bytes):
+        self._iniciar()
+        payload = f"{user_id}:{dados.decode('utf-8')}"
+        if len(payload.encode("utf-8")) > self.LIMITE:
+            payload = f"{user_id}:{SINCRONIZAR.decode('ascii')}"
+        self._envios.put(payload)
+
+    def _conectar(self):
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def _enviar(self):
+        import psycopg2
+
+        conn = None
+        while True:
+            payload = self._envios.get()
+            try:
+                if conn is None or conn.closed:
+                    conn = self._conectar()
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_notify(%s, %s)", (self.CANAL, payload))
+            except psycopg2.Error:
+                # O evento se perde; os clientes recuperam pela versão no próximo
+                logger.exception("Falha ao publicar evento")
+                conn = None
+
+    def _escutar(self):
+        import psycopg2
+
+        while True:
+            try:
+                conn = self._conectar()
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.CANAL}")
+                while True:
+                    if select_io.select([conn], [], [], EVENTOS_PING) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        user_id, _, dados = conn.notifies.pop(0).payload.partition(":")
+                        self._entregar(int(user_id), dados.encode("utf-8"))
+            except psycopg2.Error:
+                logger.exception("Conexão de LISTEN perdida, reconectando")
+                threading.Event().wait(1)
+
+
+def _criar_broker():
+    if EVENTOS_BROKER == "memoria":
+        return BrokerMemoria()
+    if EVENTOS_BROKER == "postgresql":
+        if not database.SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
+            raise RuntimeError("EVENTOS_BROKER=postgresql requer DATABASE_URL do PostgreSQL")
+        return BrokerPostgres(database.SQLALCHEMY_DATABASE_URL)
+    raise ValueError(f"EVENTOS_BROKER inválido: {EVENTOS_BROKER} (use memoria ou postgresql)")
+
+
+broker = _criar_broker()
+
+# ==================== CAPTURA ====================
+
+class _Alteracoes:
+    """Alterações de um usuário numa transação do banco"""
+
+    def __init__(self):
+        # Versão definitiva, conhecida só no commit (versoes.confirmadas)
+        self.versao: Optional[int] = None
+        self.alterados: Dict[str, Dict[int, dict]] = {}
+        self.excluidos: Dict[str, Set[int]] = {}
+        self.sincronizar = False
+
+    def alterar(self, recurso: str, dados: dict):
+        self.alterados.setdefault(recurso, {})[dados["id"]] = dados
+        self.excluidos.get(recurso, set()).discard(dados["id"])
+
+    def excluir(self, recurso: str, registro_id: int):
+        self.alterados.get(recurso, {}).pop(registro_id, None)
+        self.excluidos.setdefault(recurso, set()).add(registro_id)
+
+    def dados(self) -> bytes:
+        if self.sincronizar:
+            return orjson.dumps({"versao": self.versao, "sincronizar": True})
+        conteudo = {"versao": self.versao}
+        for recurso, linhas in self.alterados.items():
+            if linhas:
+                conteudo[recurso] = list(linhas.values())
+        excluidos = {recurso: sorted(ids) for recurso, ids in self.excluidos.items() if ids}
+        if excluidos:
+            conteudo["excluidos"] = excluidos
+        return orjson.dumps(conteudo)
+
+
+def _alteracoes(db: Session, user_id: int) -> _Alteracoes:
+    pendentes = db.info.setdefault("eventos", {})
+    if user_id not in pendentes:
+        pendentes[user_id] = _Alteracoes()
+    return pendentes[user_id]
+
+
+def registrar(db: Session, recurso: str, user_id: int, dados: dict):
+    """Linha alterada por SQL direto (fora do ORM), publicada no commit"""
+    if broker.interessado(user_id):
+        _alteracoes(db, user_id).alterar(recurso, dados)
+
+
+def sincronizar(db: Session, user_id: int):
+    """Alterações em lote: o evento só avisa para o cliente sincronizar"""
+    if broker.interessado(user_id):
+        _alteracoes(db, user_id).sincronizar = True
+
+
+def _apos_flush(db: Session, flush_context):
+    editados: Dict[type, Dict[int, object]] = {}
+    for obj in db.new:
+        model = type(obj)
+        if versoes.versionado(model) and obj.user_id is not None and broker.interessado(obj.user_id):
+            recurso = versoes.recurso(model)
+            registrar(db, recurso, obj.user_id, serializacao.objeto(obj, versoes.SCHEMAS[recurso]))
+    for obj in db.dirty:
+        model = type(obj)
+        if (
+            versoes.versionado(model) and obj.user_id is not None and broker.interessado(obj.user_id)
+            and db.is_modified(obj, include_collections=False)
+        ):
+            editados.setdefault(model, {})[obj.id] = obj
+    for obj in db.deleted:
+        model = type(obj)
+        if versoes.versionado(model) and obj.user_id is not None and broker.interessado(obj.user_id):
+            _alteracoes(db, obj.user_id).excluir(versoes.recurso(model), obj.id)
+
+    # Linhas editadas: lidas de novo, pois o objeto pode ter colunas desatualizadas
+    # (ex.: estoque alterado por outra venda depois que ele foi carregado)
+    for model, objetos in editados.items():
+        recurso = versoes.recurso(model)
+        schema = versoes.SCHEMAS[recurso]
+        stmt = select(*serializacao.colunas(model, schema)).where(model.id.in_(list(objetos)))
+        for dados in serializacao.linhas(db.execute(stmt), schema):
+            obj = objetos[dados["id"]]
+            registrar(db, recurso, obj.user_id, dados)
+
+
+def _apos_commit(db: Session):
+    confirmadas = versoes.confirmadas(db)
+    for user_id, alteracoes in db.info.pop("eventos", {}).items():
+        alteracoes.versao = confirmadas.get(user_id)
+        broker.publicar(user_id, alteracoes.dados())
+
+
+def _apos_rollback(db: Session):
+    db.info.pop("eventos", None)
+
+
+event.listen(Session, "after_flush", _apos_flush)
+event.listen(Session, "after_commit", _apos_commit)
+event.listen(Session, "after_rollback", _apos_rollback)
+
+# ==================== ENDPOINT ====================
+
+async def usuario(
+    request: Request,
+    token: Optional[str] = Query(None, description="Token JWT (para EventSource, que não envia headers)"),
+    db: Session = Depends(get_db),
+) -> auth.CurrentUser:
+    if token is None:
+        token = await auth.oauth2_scheme(request)
+    return await auth.get_current_user(token, db)
+
+
+async def fluxo(user_id: int):
+    """Corpo da resposta SSE: eventos do usuário até o cliente desconectar"""
+    assinatura = broker.assinar(user_id)
+    try:
+        # Confirma a assinatura: a partir daqui o cliente pode sincronizar sem perder nada
+        yield b": conectado\n\n"
+        while True:
+            try:
+                dados = await asyncio.wait_for(assinatura.fila.get(), EVENTOS_PING)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            yield b"data: " + dados + b"\n\n"
+    finally:
+        broker.cancelar(user_id, assinatura)
@@ -0,0 +1,40 @@
+"""
+Script para exportar o histórico de transações de um usuário em Parquet,
+particionado por mês (pasta/mes=AAAA-MM/parte-0.parquet), direto numa pasta
+do servidor. Pela API, o mesmo conjunto é gerado pela tarefa "parquet".
+
+    python export_parquet.py --user 3 --saida /dados/nexus-3
+    python export_parquet.py --user 3 --saida /dados/nexus-3 --inicio 2024-01-01 --fim 2024-12-31
+
+Leitura: pyarrow.dataset.dataset(pasta, partitioning="hive"),
+pandas.read_parquet(pasta) ou DuckDB read_parquet('pasta/*/*.parquet', hive_partitioning=true).
+"""
+import argparse
+import os
+from datetime import date
+
+import analitico
+from database import SessionLocal
+
+def export_parquet(user_id, saida, inicio=None, fim=None, compressao="zstd"):
+    if os.path.isdir(saida) and os.listdir(saida):
+        print(f"❌ A pasta {saida} não está vazia")
+        return
+    db = SessionLocal()
+    try:
+        resultado = analitico.escrever_parquet(db, user_id, saida, inicio, fim, compressao)
+        print(f"✅ {resultado['linhas']} transações em {len(resultado['meses'])} partições mensais: {saida}")
+    except Exception as e:
+        print(f"❌ Erro ao exportar: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta as transações de um usuário em Parquet particionado por mês")
+    parser.add_argument("--user", type=int, required=True, help="ID do usuário")
+    parser.add_argument("--saida", required=True, help="Pasta de destino (nova ou vazia)")
+    parser.add_argument("--inicio", type=date.fromisoformat, default=None, help="Data inicial (AAAA-MM-DD, inclusiva)")
+    parser.add_argument("--fim", type=date.fromisoformat, default=None, help="Data final (AAAA-MM-DD, inclusiva)")
+    parser.add_argument("--compressao", choices=analitico.COMPRESSOES, default="zstd", help="Compressão (padrão: zstd)")
+    args = parser.parse_args()
+    export_parquet(args.user, args.saida, args.inicio, args.fim, args.compressao)
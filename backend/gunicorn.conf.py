@@ -0,0 +1,57 @@
+"""
+Configuração do gunicorn para produção (uvicorn workers)
+
+    python migrate.py && gunicorn main:app -c gunicorn.conf.py
+
+- Um worker por núcleo (WEB_CONCURRENCY sobrepõe)
+- preload_app: a aplicação é importada uma vez no processo mestre e os
+  workers são criados por fork, já com tudo carregado (início rápido)
+- A migração não roda nos workers (AUTO_MIGRATE=false): é o passo anterior
+- Os workers não executam tarefas em segundo plano (TAREFAS_NA_API=false):
+  rode python worker.py ao lado
+- Métricas do Prometheus somadas entre os workers (PROMETHEUS_MULTIPROC_DIR)
+"""
+import glob
+import os
+import tempfile
+
+# Lido antes de importar a aplicação (preload), por isso vale para main.py e prometheus_client
+os.environ.setdefault("AUTO_MIGRATE", "false")
+# Tarefas pesadas (Parquet, recálculo dos resumos) rodam no worker.py, não nos processos da API
+os.environ.setdefault("TAREFAS_NA_API", "false")
+
+workers = int(os.environ.get("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True
+
+# Requisições em andamento têm até graceful_timeout para terminar no deploy/restart
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Cada worker grava suas métricas nesta pasta; /metrics soma todas
+if workers > 1:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="nexus-metrics-"))
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    pasta = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(pasta, exist_ok=True)
+    # Arquivos de uma execução anterior somariam valores antigos
+    for arquivo in glob.glob(os.path.join(pasta, "*.db")):
+        os.remove(arquivo)
+
+
+def post_fork(server, worker):
+    # Conexões abertas no mestre não podem ser compartilhadas entre processos
+    import database
+
+    database.engine.dispose(close=False)
+    if database.async_engine is not None:
+        database.async_engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
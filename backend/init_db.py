@@ -1,11 +1,12 @@
 """Script para inicializar o banco de dados com usuário admin"""
 from sqlalchemy.orm import Session
 import models
+import migrate
 import auth
 from database import engine, SessionLocal
 
-# Criar tabelas
-models.Base.metadata.create_all(bind=engine)
+# Criar tabelas e índices
+migrate.migrate(engine)
 
 def init_db():
     db = SessionLocal()
@@ -1,20 +1,57 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.routing import APIRoute
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import timedelta
+from typing import List, Optional
+from datetime import date, datetime, timedelta
 
 import models
+import migrate
 import schemas
 import auth
+import bulk
+import stats
+import rollup
+import queries
+import estoque
+import versoes
+import busca
+import serializacao
+import compressao
+import eventos
+import catalogo
+import assistente
+import tarefas
+import analitico
+import metricas
+import saude
+import database
 from database import engine, get_db
-
-# Criar tabelas
-models.Base.metadata.create_all(bind=engine)
+from pagination import paginate, paginate_columns, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 
 app = FastAPI(title="NEXUS API", version="1.0.0")
 
+prontidao = saude.Prontidao(engine)
+worker_tarefas = tarefas.WorkerThread()
+
+@app.on_event("startup")
+def startup():
+    # Criar tabelas e índices (em produção, migrate.py roda uma vez antes dos workers)
+    if migrate.AUTO_MIGRATE:
+        migrate.migrate(engine)
+    # Tarefas em segundo plano sem worker.py separado
+    if tarefas.TAREFAS_NA_API:
+        worker_tarefas.iniciar()
+    prontidao.iniciado = True
+
+@app.on_event("shutdown")
+def shutdown():
+    # A tarefa em andamento volta para a fila no próximo registro de progresso
+    worker_tarefas.encerrar()
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,35 +59,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
 )
 
+# Compressão gzip/brotli (opcional, COMPRESSION=br,gzip)
+if compressao.COMPRESSION:
+    app.add_middleware(compressao.CompressaoMiddleware, codificacoes=compressao.COMPRESSION)
+
+# Métricas e Server-Timing (por último: é o mais externo e mede tudo)
+app.add_middleware(metricas.MetricasMiddleware)
+
 # ==================== AUTH ====================
 
+def client_ip(request: Request) -> str:
+    """IP do cliente (atrás de proxy, o uvicorn já aplica X-Forwarded-For com --proxy-headers)"""
+    return request.client.host if request.client else "desconhecido"
+
 @app.post("/api/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(request: Request, user: schemas.UserCreate, db: Session = Depends(get_db)):
     """Registrar novo usuário"""
-    # Verificar se usuário já existe
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Username já registrado")
+    with auth.login_limiter.slot(client_ip(request), user.username):
+        # Verificar se usuário já existe
+        db_user = await run_in_threadpool(
+            lambda: db.query(models.User).filter(models.User.username == user.username).first()
+        )
+        if db_user:
+            raise HTTPException(status_code=400, detail="Username já registrado")
+        
+        # Criar usuário (hash no pool dedicado do bcrypt)
+        hashed_password = await auth.get_password_hash_async(user.password)
     
-    # Criar usuário
-    hashed_password = auth.get_password_hash(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password,
         role=user.role
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    
+    def salvar():
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+        return db_user
+    
+    return await run_in_threadpool(salvar)
 
 @app.post("/api/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login e obter token"""
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    with auth.login_limiter.slot(client_ip(request), form_data.username):
+        user = await auth.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,6 +116,9 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Já deixa o usuário no cache para as próximas requisições
+    auth.user_cache.set(auth.CurrentUser.from_model(user))
+    
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -70,13 +131,13 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     }
 
 @app.get("/api/me", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+def read_users_me(current_user: auth.CurrentUser = Depends(auth.get_current_user)):
     """Obter usuário atual"""
     return current_user
 
 @app.get("/api/users", response_model=List[schemas.User])
 def get_users(
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Listar todos os usuários (apenas admin)"""
@@ -86,7 +147,7 @@ def get_users(
 @app.delete("/api/users/{user_id}")
 def delete_user(
     user_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Deletar usuário (apenas admin)"""
@@ -102,23 +163,45 @@ def delete_user(
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     db.delete(db_user)
+    auth.invalidate_user(db, db_user.username)
     db.commit()
     return {"message": "Usuário deletado com sucesso"}
 
+@app.get("/api/admin/auth-cache")
+def get_auth_cache_stats(current_user: auth.CurrentUser = Depends(auth.get_current_user)):
+    """Estatísticas do cache de usuários autenticados (apenas admin)"""
+    auth.check_permission(current_user, "admin")
+    return auth.user_cache.stats()
+
+@app.get("/api/admin/catalogo-cache")
+def get_catalogo_cache_stats(current_user: auth.CurrentUser = Depends(auth.get_current_user)):
+    """Estatísticas do cache de categorias e produtos neste processo (apenas admin)"""
+    auth.check_permission(current_user, "admin")
+    return catalogo.stats()
+
 # ==================== CATEGORIAS ====================
 
-@app.get("/api/categorias", response_model=List[schemas.Categoria])
+@app.get("/api/categorias", response_model=List[schemas.Categoria], dependencies=[Depends(versoes.condicional)])
 def get_categorias(
-    current_user: models.User = Depends(auth.get_current_user),
+    request: Request,
+    response: Response,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Listar todas as categorias do usuário"""
-    return db.query(models.Categoria).filter(models.Categoria.user_id == current_user.id).all()
+    guardada = catalogo.buscar(db, request, response, current_user.id, "categorias")
+    if guardada is not None:
+        return guardada
+    rows = db.query(*serializacao.colunas(models.Categoria, schemas.Categoria)).filter(
+        models.Categoria.user_id == current_user.id
+    ).all()
+    resposta = serializacao.resposta(serializacao.linhas(rows, schemas.Categoria), response)
+    return catalogo.guardar(request, current_user.id, "categorias", resposta)
 
 @app.post("/api/categorias", response_model=schemas.Categoria)
 def create_categoria(
     categoria: schemas.CategoriaCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Criar nova categoria"""
@@ -134,7 +217,7 @@ def create_categoria(
 def update_categoria(
     categoria_id: int,
     categoria: schemas.CategoriaCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Atualizar categoria"""
@@ -158,7 +241,7 @@ def update_categoria(
 @app.delete("/api/categorias/{categoria_id}")
 def delete_categoria(
     categoria_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Deletar categoria"""
@@ -178,18 +261,32 @@ def delete_categoria(
 
 # ==================== PRODUTOS ====================
 
-@app.get("/api/produtos", response_model=List[schemas.Produto])
+@app.get("/api/produtos", response_model=List[schemas.Produto], dependencies=[Depends(versoes.condicional)])
 def get_produtos(
-    current_user: models.User = Depends(auth.get_current_user),
+    request: Request,
+    response: Response,
+    categoria_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Listar todos os produtos do usuário"""
-    return db.query(models.Produto).filter(models.Produto.user_id == current_user.id).all()
+    """Listar produtos do usuário (paginado por cursor)"""
+    guardada = catalogo.buscar(db, request, response, current_user.id, "produtos")
+    if guardada is not None:
+        return guardada
+    query = db.query(models.Produto).filter(models.Produto.user_id == current_user.id)
+    if categoria_id is not None:
+        query = query.filter(models.Produto.categoria_id == categoria_id)
+    colunas = serializacao.colunas(models.Produto, schemas.Produto)
+    rows = paginate_columns(query, models.Produto, colunas, response, cursor, limit)
+    resposta = serializacao.resposta(serializacao.linhas(rows, schemas.Produto), response)
+    return catalogo.guardar(request, current_user.id, "produtos", resposta)
 
 @app.post("/api/produtos", response_model=schemas.Produto)
 def create_produto(
     produto: schemas.ProdutoCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Criar novo produto"""
@@ -197,15 +294,67 @@ def create_produto(
     
     db_produto = models.Produto(**produto.dict(), user_id=current_user.id)
     db.add(db_produto)
+    db.flush()
+    estoque.registrar(db, [estoque.de_produto(db_produto)])
     db.commit()
     db.refresh(db_produto)
     return db_produto
 
+@app.post("/api/produtos/import", response_model=schemas.ImportResult)
+def import_produtos(
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Importar produtos em lote (CSV ou NDJSON)"""
+    auth.check_permission(current_user, "gerente")
+    
+    formato = bulk.detect_format(arquivo, formato)
+    return bulk.import_rows(
+        db, arquivo.file, formato, schemas.ProdutoCreate, models.Produto, current_user.id,
+        ao_inserir=lambda db, produtos: estoque.registrar(db, [estoque.de_produto(p) for p in produtos]),
+    )
+
+@app.get("/api/produtos/busca", response_model=List[schemas.Produto])
+def search_produtos(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Buscar produtos por nome e descrição (por relevância, paginado por cursor)"""
+    return busca.buscar(db, "produtos", current_user.id, q, response, cursor, limit)
+
+@app.get("/api/produtos/export")
+def export_produtos(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """Exportar produtos (CSV ou NDJSON, enviado em streaming)"""
+    return StreamingResponse(
+        bulk.export_rows(models.Produto, bulk.PRODUTO_EXPORT_COLUMNS, current_user.id, formato),
+        media_type=bulk.MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f"attachment; filename=produtos.{formato}"}
+    )
+
+def ajustar_estoque(db: Session, db_produto: models.Produto, quantidade: int):
+    """Leva o estoque do produto à quantidade informada, registrando o ajuste no livro"""
+    if quantidade < 0:
+        raise HTTPException(status_code=400, detail="Quantidade inválida")
+    
+    delta = quantidade - db_produto.quantidade
+    if not estoque.aplicar(db, db_produto.id, db_produto.user_id, delta):
+        raise HTTPException(status_code=409, detail="Estoque alterado por outra operação, tente novamente")
+    estoque.registrar(db, [estoque.movimento(db_produto.user_id, db_produto.id, delta, "ajuste")])
+
 @app.put("/api/produtos/{produto_id}", response_model=schemas.Produto)
 def update_produto(
     produto_id: int,
     produto: schemas.ProdutoUpdate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Atualizar produto"""
@@ -219,9 +368,15 @@ def update_produto(
     if not db_produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     
-    for key, value in produto.dict(exclude_unset=True).items():
+    dados = produto.dict(exclude_unset=True)
+    quantidade = dados.pop("quantidade", None)
+    for key, value in dados.items():
         setattr(db_produto, key, value)
     
+    if quantidade is not None and quantidade != db_produto.quantidade:
+        # Ajuste pela diferença, sem sobrescrever vendas feitas enquanto isso
+        ajustar_estoque(db, db_produto, quantidade)
+    
     db.commit()
     db.refresh(db_produto)
     return db_produto
@@ -229,7 +384,7 @@ def update_produto(
 @app.delete("/api/produtos/{produto_id}")
 def delete_produto(
     produto_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Deletar produto"""
@@ -249,18 +404,24 @@ def delete_produto(
 
 # ==================== CLIENTES ====================
 
-@app.get("/api/clientes", response_model=List[schemas.Cliente])
+@app.get("/api/clientes", response_model=List[schemas.Cliente], dependencies=[Depends(versoes.condicional)])
 def get_clientes(
-    current_user: models.User = Depends(auth.get_current_user),
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Listar todos os clientes do usuário"""
-    return db.query(models.Cliente).filter(models.Cliente.user_id == current_user.id).all()
+    """Listar clientes do usuário (paginado por cursor)"""
+    query = db.query(models.Cliente).filter(models.Cliente.user_id == current_user.id)
+    colunas = serializacao.colunas(models.Cliente, schemas.Cliente)
+    rows = paginate_columns(query, models.Cliente, colunas, response, cursor, limit)
+    return serializacao.resposta(serializacao.linhas(rows, schemas.Cliente), response)
 
 @app.post("/api/clientes", response_model=schemas.Cliente)
 def create_cliente(
     cliente: schemas.ClienteCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Criar novo cliente"""
@@ -272,11 +433,48 @@ def create_cliente(
     db.refresh(db_cliente)
     return db_cliente
 
+@app.post("/api/clientes/import", response_model=schemas.ImportResult)
+def import_clientes(
+    arquivo: UploadFile = File(...),
+    formato: Optional[str] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Importar clientes em lote (CSV ou NDJSON)"""
+    auth.check_permission(current_user, "gerente")
+    
+    formato = bulk.detect_format(arquivo, formato)
+    return bulk.import_rows(db, arquivo.file, formato, schemas.ClienteCreate, models.Cliente, current_user.id)
+
+@app.get("/api/clientes/busca", response_model=List[schemas.Cliente])
+def search_clientes(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Buscar clientes por nome, email e telefone (por relevância, paginado por cursor)"""
+    return busca.buscar(db, "clientes", current_user.id, q, response, cursor, limit)
+
+@app.get("/api/clientes/export")
+def export_clientes(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """Exportar clientes (CSV ou NDJSON, enviado em streaming)"""
+    return StreamingResponse(
+        bulk.export_rows(models.Cliente, bulk.CLIENTE_EXPORT_COLUMNS, current_user.id, formato),
+        media_type=bulk.MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f"attachment; filename=clientes.{formato}"}
+    )
+
 @app.put("/api/clientes/{cliente_id}", response_model=schemas.Cliente)
 def update_cliente(
     cliente_id: int,
     cliente: schemas.ClienteUpdate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Atualizar cliente"""
@@ -300,7 +498,7 @@ def update_cliente(
 @app.delete("/api/clientes/{cliente_id}")
 def delete_cliente(
     cliente_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Deletar cliente"""
@@ -320,18 +518,69 @@ def delete_cliente(
 
 # ==================== TRANSAÇÕES ====================
 
-@app.get("/api/transacoes", response_model=List[schemas.Transacao])
+@app.get("/api/transacoes", response_model=List[schemas.Transacao], dependencies=[Depends(versoes.condicional)])
 def get_transacoes(
-    current_user: models.User = Depends(auth.get_current_user),
+    response: Response,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    tipo: Optional[str] = None,
+    produto_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    numero_pedido: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Listar transações do usuário (paginado por cursor, com filtros)"""
+    query = db.query(models.Transacao).filter(models.Transacao.user_id == current_user.id)
+    query = queries.filtrar_transacoes(query, data_inicio, data_fim, tipo, produto_id, cliente_id, numero_pedido)
+    colunas = serializacao.colunas(models.Transacao, schemas.Transacao)
+    rows = paginate_columns(query, models.Transacao, colunas, response, cursor, limit)
+    return serializacao.resposta(serializacao.linhas(rows, schemas.Transacao), response)
+
+@app.get("/api/transacoes/export")
+def export_transacoes(
+    formato: str = Query("csv", pattern="^(csv|ndjson|arrow)$"),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """Exportar transações em streaming (CSV, NDJSON ou Arrow IPC com nomes de produto/categoria/cliente)"""
+    if data_inicio and data_fim and data_fim < data_inicio:
+        raise HTTPException(status_code=400, detail="data_fim anterior a data_inicio")
+    if formato == "arrow":
+        analitico.exigir_pyarrow()
+        return StreamingResponse(
+            analitico.fluxo_arrow(current_user.id, data_inicio, data_fim),
+            media_type=analitico.MEDIA_TYPE_ARROW,
+            headers={"Content-Disposition": "attachment; filename=transacoes.arrow"}
+        )
+    return StreamingResponse(
+        bulk.export_rows(
+            models.Transacao, bulk.TRANSACAO_EXPORT_COLUMNS, current_user.id, formato,
+            filtros=analitico.periodo(data_inicio, data_fim),
+        ),
+        media_type=bulk.MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f"attachment; filename=transacoes.{formato}"}
+    )
+
+@app.get("/api/transacoes/busca", response_model=List[schemas.Transacao])
+def search_transacoes(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Listar todas as transações do usuário"""
-    return db.query(models.Transacao).filter(models.Transacao.user_id == current_user.id).all()
+    """Buscar transações por número do pedido e observações (por relevância, paginado por cursor)"""
+    return busca.buscar(db, "transacoes", current_user.id, q, response, cursor, limit)
 
 @app.post("/api/transacoes", response_model=schemas.Transacao)
 def create_transacao(
     transacao: schemas.TransacaoCreate,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Criar nova transação"""
@@ -339,32 +588,77 @@ def create_transacao(
     if transacao.tipo == "entrada":
         auth.check_permission(current_user, "gerente")
     
-    # Atualizar estoque do produto
-    produto = db.query(models.Produto).filter(
-        models.Produto.id == transacao.produto_id,
-        models.Produto.user_id == current_user.id
-    ).first()
-    
-    if not produto:
-        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    # Atualizar estoque do produto (UPDATE condicional, seguro sob concorrência)
+    delta = transacao.quantidade if transacao.tipo == "entrada" else -transacao.quantidade
+    if not estoque.aplicar(db, transacao.produto_id, current_user.id, delta):
+        produto = db.execute(estoque.consulta_produto(transacao.produto_id, current_user.id)).scalars().first()
+        raise estoque.erro(produto)
     
-    if transacao.tipo == "entrada":
-        produto.quantidade += transacao.quantidade
-    else:  # saida
-        if produto.quantidade < transacao.quantidade:
-            raise HTTPException(status_code=400, detail="Estoque insuficiente")
-        produto.quantidade -= transacao.quantidade
-    
-    db_transacao = models.Transacao(**transacao.dict(), user_id=current_user.id)
+    db_transacao = models.Transacao(**transacao.dict(), user_id=current_user.id, created_at=datetime.utcnow())
     db.add(db_transacao)
+    rollup.registrar(db, [db_transacao])
+    db.flush()
+    estoque.registrar(db, [estoque.de_transacao(db_transacao)])
     db.commit()
     db.refresh(db_transacao)
     return db_transacao
 
+@app.post("/api/vendas", response_model=List[schemas.Transacao])
+def create_venda(
+    venda: schemas.VendaCreate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Registrar venda com vários itens em uma única transação do banco"""
+    if not venda.itens:
+        raise HTTPException(status_code=400, detail="Venda sem itens")
+    
+    # Quantidade total por produto (o mesmo produto pode aparecer em mais de um item)
+    quantidades = {}
+    for item in venda.itens:
+        if item.quantidade <= 0:
+            raise HTTPException(status_code=400, detail="Quantidade inválida")
+        quantidades[item.produto_id] = quantidades.get(item.produto_id, 0) + item.quantidade
+    
+    # Baixar o estoque com UPDATE condicional, em ordem de id (evita deadlock entre vendas)
+    for produto_id in sorted(quantidades):
+        if not estoque.aplicar(db, produto_id, current_user.id, -quantidades[produto_id]):
+            produto = db.execute(estoque.consulta_produto(produto_id, current_user.id)).scalars().first()
+            db.rollback()
+            if not produto:
+                raise HTTPException(status_code=404, detail=f"Produto {produto_id} não encontrado")
+            raise HTTPException(status_code=400, detail=f"Estoque insuficiente para {produto.nome}")
+    
+    created_at = datetime.utcnow()
+    db_transacoes = [
+        models.Transacao(
+            tipo="saida",
+            produto_id=item.produto_id,
+            cliente_id=venda.cliente_id,
+            quantidade=item.quantidade,
+            valor_unitario=item.valor_unitario,
+            valor_total=item.valor_total,
+            numero_pedido=venda.numero_pedido,
+            observacoes=venda.observacoes,
+            user_id=current_user.id,
+            created_at=created_at,
+        )
+        for item in venda.itens
+    ]
+    db.add_all(db_transacoes)
+    rollup.registrar(db, db_transacoes)
+    db.flush()
+    estoque.registrar(db, [estoque.de_transacao(t) for t in db_transacoes])
+    
+    # Serializar antes do commit para não recarregar cada linha depois
+    resultado = [schemas.Transacao.model_validate(t) for t in db_transacoes]
+    db.commit()
+    return resultado
+
 @app.delete("/api/transacoes/{transacao_id}")
 def delete_transacao(
     transacao_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """Desfazer transação"""
@@ -378,18 +672,215 @@ def delete_transacao(
     if not db_transacao:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
     
-    # Reverter estoque
-    produto = db.query(models.Produto).filter(models.Produto.id == db_transacao.produto_id).first()
-    if produto:
-        if db_transacao.tipo == "entrada":
-            produto.quantidade -= db_transacao.quantidade
+    # Reverter estoque (o produto pode já ter sido excluído)
+    if db_transacao.produto_id is not None:
+        delta = -db_transacao.quantidade if db_transacao.tipo == "entrada" else db_transacao.quantidade
+        if not estoque.aplicar(db, db_transacao.produto_id, current_user.id, delta):
+            produto = db.execute(estoque.consulta_produto(db_transacao.produto_id, current_user.id)).scalars().first()
+            if produto:
+                raise estoque.erro(produto, "Estoque insuficiente para desfazer a entrada")
         else:
-            produto.quantidade += db_transacao.quantidade
+            estoque.registrar(db, [estoque.de_transacao(db_transacao, estorno=True)])
     
+    rollup.registrar(db, [db_transacao], sinal=-1)
     db.delete(db_transacao)
     db.commit()
     return {"message": "Transação desfeita com sucesso"}
 
+# ==================== ESTATÍSTICAS ====================
+
+@app.get("/api/stats", response_model=schemas.DashboardStats)
+def get_stats(
+    tz_offset: int = 0,
+    limit: int = Query(5, ge=1, le=50),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Resumo do painel (totais, vendas de hoje, estoque e rankings)"""
+    return stats.resumo(db, current_user.id, tz_offset=tz_offset, limit=limit)
+
+@app.get("/api/stats/totais", response_model=List[schemas.TotalTipo])
+def get_stats_totais(
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Totais de transações por tipo no período"""
+    return stats.totais_por_tipo(db, current_user.id, data_inicio, data_fim)
+
+@app.get("/api/stats/estoque", response_model=schemas.EstoqueStats)
+def get_stats_estoque(
+    limite_baixo: int = Query(stats.LIMITE_ESTOQUE_BAIXO, ge=0),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Valor do estoque e produtos sem estoque / com estoque baixo"""
+    return stats.estoque(db, current_user.id, limite_baixo)
+
+@app.get("/api/stats/produtos", response_model=List[schemas.ProdutoRanking])
+def get_stats_produtos(
+    limit: int = Query(5, ge=1, le=100),
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Produtos mais vendidos no período"""
+    return stats.top_produtos(db, current_user.id, limit, data_inicio, data_fim)
+
+@app.get("/api/stats/clientes", response_model=List[schemas.ClienteRanking])
+def get_stats_clientes(
+    limit: int = Query(5, ge=1, le=100),
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Clientes que mais compraram no período"""
+    return stats.top_clientes(db, current_user.id, limit, data_inicio, data_fim)
+
+# ==================== ASSISTENTE ====================
+
+@app.post("/api/assistant/query", response_model=schemas.AssistenteResposta, response_model_exclude_none=True)
+def assistant_query(
+    consulta: schemas.AssistenteConsulta,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Pergunta do chat: intenção e só os dados da resposta (consultas indexadas e resumos)"""
+    return assistente.responder(db, current_user.id, consulta.mensagem, consulta.tz_offset)
+
+# ==================== RELATÓRIOS ====================
+
+@app.get("/api/relatorios/vendas", response_model=List[schemas.RelatorioLinha])
+def get_relatorio_vendas(
+    data_inicio: date,
+    data_fim: date,
+    agrupar: str = Query("dia", pattern="^(dia|mes|produto)$"),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Relatório do período (datas inclusivas, UTC) a partir do resumo diário"""
+    if data_fim < data_inicio:
+        raise HTTPException(status_code=400, detail="data_fim anterior a data_inicio")
+    return rollup.relatorio(db, current_user.id, data_inicio, data_fim, agrupar)
+
+# ==================== TAREFAS ====================
+
+@app.post("/api/tarefas", response_model=schemas.Tarefa, status_code=202)
+def create_tarefa(
+    tarefa: schemas.TarefaCreate,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Enfileirar exportação, relatório ou recálculo dos resumos"""
+    if tarefa.tipo in tarefas.COM_ARQUIVO:
+        raise HTTPException(status_code=400, detail="Importação é enviada em POST /api/tarefas/importacao")
+    return tarefas.enfileirar(db, current_user, tarefa.tipo, tarefa.parametros)
+
+@app.post("/api/tarefas/importacao", response_model=schemas.Tarefa, status_code=202)
+def create_tarefa_importacao(
+    arquivo: UploadFile = File(...),
+    recurso: str = Query(..., pattern="^(produtos|clientes)$"),
+    formato: Optional[str] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Enfileirar importação em lote (CSV ou NDJSON); o resultado fica em `resultado`"""
+    return tarefas.enfileirar_importacao(db, current_user, arquivo, recurso, formato)
+
+@app.get("/api/tarefas", response_model=List[schemas.Tarefa])
+def list_tarefas(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Tarefas do usuário, mais recentes primeiro (paginado por cursor)"""
+    query = db.query(models.Tarefa).filter(models.Tarefa.user_id == current_user.id)
+    return paginate(query, models.Tarefa, response, cursor, limit)
+
+@app.get("/api/tarefas/{tarefa_id}", response_model=schemas.Tarefa)
+def get_tarefa(
+    tarefa_id: int,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Estado e progresso da tarefa"""
+    return tarefas.obter(db, current_user.id, tarefa_id)
+
+@app.post("/api/tarefas/{tarefa_id}/cancelar", response_model=schemas.Tarefa)
+def cancel_tarefa(
+    tarefa_id: int,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cancelar tarefa pendente ou em execução"""
+    return tarefas.cancelar(db, current_user.id, tarefa_id)
+
+@app.get("/api/tarefas/{tarefa_id}/resultado")
+def get_tarefa_resultado(
+    tarefa_id: int,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Baixar o arquivo gerado pela tarefa"""
+    caminho, nome, media_type = tarefas.resultado(db, current_user.id, tarefa_id)
+    return FileResponse(caminho, media_type=media_type, filename=nome)
+
+# ==================== SINCRONIZAÇÃO ====================
+
+@app.get("/api/sync", response_model=schemas.SyncResult)
+def sync(
+    since: int = Query(0, ge=0),
+    janela: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user)
+):
+    """Categorias, produtos, clientes e transações alterados desde a versão `since`, com ids excluídos (streaming)"""
+    return StreamingResponse(versoes.sincronizar(current_user.id, since, janela), media_type="application/json")
+
+@app.get("/api/eventos")
+async def eventos_stream(current_user: auth.CurrentUser = Depends(eventos.usuario)):
+    """Alterações do usuário em tempo real (Server-Sent Events), no formato de /api/sync"""
+    return StreamingResponse(eventos.fluxo(current_user.id), media_type="text/event-stream", headers=eventos.HEADERS)
+
+# ==================== HISTÓRICO DE ESTOQUE ====================
+
+@app.get("/api/estoque/historico", response_model=schemas.EstoqueHistorico)
+def get_estoque_historico(
+    data: datetime,
+    produto_id: Optional[int] = None,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Estoque de cada produto na data (UTC), valorizado pelo preço atual"""
+    itens = estoque.saldos_em(db, current_user.id, data, produto_id)
+    return {
+        "data": data,
+        "quantidade_total": sum(item["quantidade"] for item in itens),
+        "valor_total": sum(item["valor_total"] for item in itens),
+        "itens": itens,
+    }
+
+@app.get("/api/estoque/movimentos", response_model=List[schemas.MovimentoEstoque])
+def get_estoque_movimentos(
+    response: Response,
+    produto_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Livro de movimentos de estoque (paginado por cursor)"""
+    query = db.query(models.MovimentoEstoque).filter(models.MovimentoEstoque.user_id == current_user.id)
+    if produto_id is not None:
+        query = query.filter(models.MovimentoEstoque.produto_id == produto_id)
+    colunas = serializacao.colunas(models.MovimentoEstoque, schemas.MovimentoEstoque)
+    rows = paginate_columns(query, models.MovimentoEstoque, colunas, response, cursor, limit)
+    return serializacao.resposta(serializacao.linhas(rows, schemas.MovimentoEstoque), response)
+
 # ==================== ROOT ====================
 
 @app.get("/")
@@ -400,6 +891,42 @@ def root():
         "docs": "/docs"
     }
 
+@app.get("/health/live", include_in_schema=False)
+async def health_live():
+    """Liveness: o processo responde (não consulta o banco)"""
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready():
+    """Readiness: inicializado e com banco acessível (resultado reaproveitado por alguns segundos)"""
+    pronto, motivo = await prontidao.verificar()
+    if not pronto:
+        raise HTTPException(status_code=503, detail=motivo)
+    return {"status": motivo}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    """Métricas no formato do Prometheus (METRICS_TOKEN, se definido, é exigido)"""
+    return metricas.exportar(request)
+
+# ==================== MODO ASSÍNCRONO ====================
+
+if database.ASYNC_DB:
+    # Troca os endpoints síncronos de CRUD pelas versões com AsyncSession
+    import async_api
+    
+    async_routes = {(route.path, method) for route in async_api.router.routes for method in route.methods}
+    app.router.routes = [
+        route for route in app.router.routes
+        if not (isinstance(route, APIRoute) and any((route.path, m) in async_routes for m in route.methods))
+    ]
+    app.include_router(async_api.router)
+
+    @app.on_event("shutdown")
+    async def dispose_async_engine():
+        # As conexões do aiosqlite rodam em threads próprias e prenderiam o processo
+        await database.async_engine.dispose()
+
 if __name__ == "__main__":
     import uvicorn
     import os
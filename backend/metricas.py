@@ -0,0 +1,188 @@
+"""
+Métricas de desempenho: Prometheus (/metrics) e header Server-Timing
+
+Por requisição, registra latência, status e tamanho da resposta por rota
+(o caminho da rota, ex.: /api/produtos/{produto_id}, não a URL), as
+requisições em andamento, e quantas consultas SQL foram feitas e quanto
+tempo levaram (consultas demais numa rota = N+1). O tempo do bcrypt é
+medido à parte, porque domina o login e o cadastro.
+
+Cada resposta leva o header Server-Timing (app, db e bcrypt), que aparece
+na aba Network do navegador. Em respostas em streaming, o que é gerado
+depois do início do envio não entra no header, só nas métricas.
+
+Com vários processos (workers), defina PROMETHEUS_MULTIPROC_DIR (pasta
+vazia, gravável) para /metrics somar todos. METRICS_TOKEN, se definido,
+passa a ser exigido em /metrics (Authorization: Bearer <token>).
+"""
+import os
+import secrets
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Requisições que não casaram com nenhuma rota (404) ficam num rótulo só
+SEM_ROTA = "sem_rota"
+
+REQUISICOES = Counter(
+    "nexus_http_requests_total", "Requisições HTTP respondidas", ["method", "rota", "status"]
+)
+LATENCIA = Histogram(
+    "nexus_http_request_duration_seconds", "Tempo de resposta (até o fim do corpo)", ["method", "rota"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+EM_ANDAMENTO = Gauge(
+    "nexus_http_requests_in_progress", "Requisições sendo atendidas", ["method"], multiprocess_mode="livesum"
+)
+TAMANHO = Histogram(
+    "nexus_http_response_size_bytes", "Tamanho do corpo enviado (depois da compressão)", ["method", "rota"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+CONSULTAS = Histogram(
+    "nexus_db_queries_per_request", "Consultas SQL por requisição", ["method", "rota"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+TEMPO_BANCO = Histogram(
+    "nexus_db_time_per_request_seconds", "Tempo total das consultas SQL da requisição", ["method", "rota"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+BCRYPT = Histogram(
+    "nexus_bcrypt_duration_seconds", "Tempo de cada hash/verificação de senha", ["operacao"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CACHE_CATALOGO = Counter(
+    "nexus_catalogo_cache_total", "Leituras do cache de categorias/produtos", ["recurso", "resultado"]
+)
+
+# ==================== CONTADORES DA REQUISIÇÃO ====================
+
+@dataclass
+class _Requisicao:
+    consultas: int = 0
+    tempo_banco: float = 0.0
+    tempo_bcrypt: float = 0.0
+
+
+# Contadores da requisição atual; o objeto é compartilhado com o threadpool
+# (endpoints síncronos), que roda numa cópia do contexto
+_atual: ContextVar[Optional[_Requisicao]] = ContextVar("metricas_requisicao", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info["metricas_inicio"].pop()
+    requisicao = _atual.get()
+    if requisicao is not None:
+        requisicao.consultas += 1
+        requisicao.tempo_banco += time.perf_counter() - inicio
+
+
+@event.listens_for(Engine, "handle_error")
+def _erro_na_consulta(exception_context):
+    # after_cursor_execute não roda quando a consulta falha
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("metricas_inicio"):
+        conn.info["metricas_inicio"].pop()
+
+
+def registrar_bcrypt(operacao: str, segundos: float):
+    """Chamado por auth a cada hash/verificação (no pool do bcrypt, com o contexto da requisição)"""
+    BCRYPT.labels(operacao).observe(segundos)
+    requisicao = _atual.get()
+    if requisicao is not None:
+        requisicao.tempo_bcrypt += segundos
+
+
+def registrar_cache_catalogo(recurso: str, resultado: str):
+    """Chamado por catalogo a cada leitura: hit, revalidado ou miss"""
+    CACHE_CATALOGO.labels(recurso, resultado).inc()
+
+# ==================== MIDDLEWARE ====================
+
+def _server_timing(requisicao: _Requisicao, total: float) -> str:
+    partes = [
+        f"app;dur={total * 1000:.1f}",
+        f'db;desc="{requisicao.consultas} consultas";dur={requisicao.tempo_banco * 1000:.1f}',
+    ]
+    if requisicao.tempo_bcrypt:
+        partes.append(f"bcrypt;dur={requisicao.tempo_bcrypt * 1000:.1f}")
+    return ", ".join(partes)
+
+
+class MetricasMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        requisicao = _Requisicao()
+        token = _atual.set(requisicao)
+        inicio = time.perf_counter()
+        status = "500"
+        enviados = 0
+
+        async def enviar(message: Message) -> None:
+            nonlocal status, enviados
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _server_timing(requisicao, time.perf_counter() - inicio))
+                # O frontend roda em outra origem (como no CORS, qualquer uma)
+                headers["Timing-Allow-Origin"] = "*"
+            elif message["type"] == "http.response.body":
+                enviados += len(message.get("body", b""))
+            await send(message)
+
+        EM_ANDAMENTO.labels(method).inc()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            EM_ANDAMENTO.labels(method).dec()
+            _atual.reset(token)
+            # scope["route"] é preenchido pelo roteamento do FastAPI
+            route = scope.get("route")
+            rota = getattr(route, "path", SEM_ROTA)
+            REQUISICOES.labels(method, rota, status).inc()
+            LATENCIA.labels(method, rota).observe(time.perf_counter() - inicio)
+            TAMANHO.labels(method, rota).observe(enviados)
+            CONSULTAS.labels(method, rota).observe(requisicao.consultas)
+            TEMPO_BANCO.labels(method, rota).observe(requisicao.tempo_banco)
+
+# ==================== /metrics ====================
+
+def _registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    # Soma os arquivos de métricas de todos os workers
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def exportar(request: Request) -> Response:
+    """Conteúdo de /metrics no formato texto do Prometheus"""
+    if METRICS_TOKEN:
+        recebido = request.headers.get("authorization", "")
+        if not secrets.compare_digest(recebido, f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return Response(generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
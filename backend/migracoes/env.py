@@ -0,0 +1,69 @@
+"""Ambiente do Alembic: banco de DATABASE_URL e metadata de models.py"""
+import os
+import sys
+from logging.config import fileConfig
+
+from alembic import context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import models  # noqa: E402
+
+config = context.config
+
+# Chamado por migrate.migrate() dentro da API: não reconfigura o logging dela
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = models.Base.metadata
+
+
+def incluir(objeto, nome, tipo, refletido, comparado):
+    """Ignora no autogenerate o que busca.py cria fora dos models (FTS5 e índices GIN)"""
+    if tipo == "table" and refletido and comparado is None:
+        return False
+    if tipo == "index" and nome and nome.endswith("_busca"):
+        return False
+    return True
+
+
+def _configurar(**kw):
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=incluir,
+        # Uma transação por revisão: uma falha não desfaz as revisões já aplicadas
+        transaction_per_migration=True,
+        **kw,
+    )
+
+
+def run_migrations_offline():
+    _configurar(
+        url=database.SQLALCHEMY_DATABASE_URL,
+        literal_binds=True,
+        render_as_batch=database.IS_SQLITE,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _executar(conexao):
+    _configurar(connection=conexao, render_as_batch=conexao.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    conexao = config.attributes.get("connection")
+    if conexao is not None:
+        _executar(conexao)
+        return
+    with database.engine.connect() as conexao:
+        _executar(conexao)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,234 @@
+"""Esquema base: tabelas, colunas, índices e índices de busca
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Banco novo: cria tudo. Banco criado antes das migrações (pelo antigo
+create_all de migrate.py): cria só o que falta, como aquele script fazia.
+As revisões seguintes usam ddl_online, que pula o que esta já criou num
+banco novo.
+
+O esquema está escrito aqui como era quando as migrações foram criadas, e
+não lido de models.py: mudanças nos models vão em revisões novas.
+"""
+from typing import List, Sequence, Tuple, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _tabelas() -> List[Tuple[str, list, list]]:
+    """(tabela, colunas, índices), na ordem de criação; objetos novos a cada chamada"""
+    return [
+        ("users", [
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("username", sa.String, nullable=False),
+            sa.Column("email", sa.String),
+            sa.Column("hashed_password", sa.String, nullable=False),
+            sa.Column("role", sa.String),
+            sa.Column("created_at", sa.DateTime),
+        ], [
+            ("ix_users_id", ["id"], False),
+            ("ix_users_username", ["username"], True),
+            ("ix_users_email", ["email"], True),
+        ]),
+        ("categorias", [
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("nome", sa.String, nullable=False),
+            sa.Column("descricao", sa.Text),
+            sa.Column("cor", sa.String),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id")),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("versao", sa.Integer),
+        ], [
+            ("ix_categorias_id", ["id"], False),
+            ("ix_categorias_user_id", ["user_id"], False),
+            ("ix_categorias_user_versao", ["user_id", "versao"], False),
+        ]),
+        ("produtos", [
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("nome", sa.String, nullable=False),
+            sa.Column("valor", sa.Float, nullable=False),
+            sa.Column("quantidade", sa.Integer),
+            sa.Column("descricao", sa.Text),
+            sa.Column("categoria_id", sa.Integer, sa.ForeignKey("categorias.id")),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id")),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("versao", sa.Integer),
+        ], [
+            ("ix_produtos_id", ["id"], False),
+            ("ix_produtos_categoria_id", ["categoria_id"], False),
+            ("ix_produtos_user_created", ["user_id", "created_at"], False),
+            ("ix_produtos_user_versao", ["user_id", "versao"], False),
+        ]),
+        ("clientes", [
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("nome", sa.String, nullable=False),
+            sa.Column("email", sa.String),
+            sa.Column("telefone", sa.String),
+            sa.Column("endereco", sa.String),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id")),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("versao", sa.Integer),
+        ], [
+            ("ix_clientes_id", ["id"], False),
+            ("ix_clientes_user_created", ["user_id", "created_at"], False),
+            ("ix_clientes_user_versao", ["user_id", "versao"], False),
+        ]),
+        ("transacoes", [
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("tipo", sa.String, nullable=False),
+            sa.Column("produto_id", sa.Integer, sa.ForeignKey("produtos.id")),
+            sa.Column("cliente_id", sa.Integer, sa.ForeignKey("clientes.id"), nullable=True),
+            sa.Column("quantidade", sa.Integer, nullable=False),
+            sa.Column("valor_unitario", sa.Float, nullable=False),
+            sa.Column("valor_total", sa.Float, nullable=False),
+            sa.Column("numero_pedido", sa.String, nullable=True),
+            sa.Column("observacoes", sa.Text, nullable=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id")),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("versao", sa.Integer),
+        ], [
+            ("ix_transacoes_id", ["id"], False),
+            ("ix_transacoes_produto_id", ["produto_id"], False),
+            ("ix_transacoes_cliente_id", ["cliente_id"], False),
+            ("ix_transacoes_user_created", ["user_id", "created_at"], False),
+            ("ix_transacoes_user_produto", ["user_id", "produto_id"], False),
+            ("ix_transacoes_user_cliente", ["user_id", "cliente_id"], False),
+            ("ix_transacoes_user_versao", ["user_id", "versao"], False),
+        ]),
+        ("resumo_diario", [
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("dia", sa.Date, primary_key=True),
+            sa.Column("produto_id", sa.Integer, primary_key=True),
+            sa.Column("transacoes_entrada", sa.Integer, nullable=False),
+            sa.Column("quantidade_entrada", sa.Integer, nullable=False),
+            sa.Column("valor_entrada", sa.Float, nullable=False),
+            sa.Column("transacoes_saida", sa.Integer, nullable=False),
+            sa.Column("quantidade_saida", sa.Integer, nullable=False),
+            sa.Column("valor_saida", sa.Float, nullable=False),
+        ], []),
+        ("movimentos_estoque", [
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("produto_id", sa.Integer, nullable=False),
+            sa.Column("transacao_id", sa.Integer, nullable=True),
+            sa.Column("origem", sa.String, nullable=False),
+            sa.Column("quantidade", sa.Integer, nullable=False),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        ], [
+            ("ix_movimentos_estoque_user_created", ["user_id", "created_at"], False),
+            ("ix_movimentos_estoque_user_produto_created", ["user_id", "produto_id", "created_at"], False),
+        ]),
+        ("snapshots_estoque", [
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("produto_id", sa.Integer, primary_key=True),
+            sa.Column("ate", sa.DateTime, primary_key=True),
+            sa.Column("quantidade", sa.Integer, nullable=False),
+        ], []),
+        ("versoes", [
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("versao", sa.Integer, nullable=False),
+        ], []),
+        ("exclusoes", [
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("recurso", sa.String, nullable=False),
+            sa.Column("registro_id", sa.Integer, nullable=False),
+            sa.Column("versao", sa.Integer, nullable=False),
+        ], [
+            ("ix_exclusoes_user_versao", ["user_id", "versao"], False),
+        ]),
+    ]
+
+
+# Índices de busca textual (busca.py): tabela -> colunas (a primeira é a principal)
+BUSCA = {
+    "produtos": ("nome", "descricao"),
+    "clientes": ("nome", "email", "telefone"),
+    "transacoes": ("numero_pedido", "observacoes"),
+}
+
+
+def _fts_ddl(tabela: str, campos) -> List[str]:
+    """FTS5 de conteúdo externo mantido por triggers (SQLite)"""
+    fts = f"{tabela}_fts"
+    # user_id também é indexado para o MATCH já filtrar pelo dono
+    colunas = campos + ("user_id",)
+    lista = ", ".join(colunas)
+    novos = ", ".join(f"new.{c}" for c in colunas)
+    antigos = ", ".join(f"old.{c}" for c in colunas)
+    remover = f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos});"
+    inserir = f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos});"
+    return [
+        # prefix: índices de prefixo de 2 a 4 letras (buscas enquanto se digita)
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({lista}, content='{tabela}', content_rowid='id', "
+        f"prefix='2 3 4', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabela} BEGIN {inserir} END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabela} BEGIN {remover} END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {lista} ON {tabela} BEGIN {remover} {inserir} END",
+        # Indexa as linhas que já existiam
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _gin_ddl(tabela: str, campos) -> str:
+    """Índice GIN (PostgreSQL) com a mesma expressão de busca._vetor"""
+    texto = " || ' ' || ".join(f"coalesce({c}, '')" for c in campos)
+    vetor = f"to_tsvector('simple', translate({texto}, '@.-_/+', '      '))"
+    return f"CREATE INDEX IF NOT EXISTS ix_{tabela}_busca ON {tabela} USING gin (({vetor}))"
+
+
+def _criar_indices_busca(conn):
+    if conn.dialect.name == "postgresql":
+        for tabela, campos in BUSCA.items():
+            conn.exec_driver_sql(_gin_ddl(tabela, campos))
+        return
+    if conn.dialect.name != "sqlite":
+        return
+    inspector = sa.inspect(conn)
+    for tabela, campos in BUSCA.items():
+        if inspector.has_table(f"{tabela}_fts"):
+            continue
+        for ddl in _fts_ddl(tabela, campos):
+            conn.exec_driver_sql(ddl)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    for tabela, colunas, indices in _tabelas():
+        if not inspector.has_table(tabela):
+            op.create_table(tabela, *colunas)
+            existentes = set()
+        else:
+            # Tabela de antes das migrações: colunas novas (sempre anuláveis, sem FK)
+            nomes = {c["name"] for c in inspector.get_columns(tabela)}
+            for coluna in colunas:
+                if coluna.name not in nomes:
+                    op.add_column(tabela, sa.Column(coluna.name, coluna.type))
+            existentes = {i["name"] for i in inspector.get_indexes(tabela)}
+        for nome, campos, unico in indices:
+            if nome not in existentes:
+                op.create_index(nome, tabela, campos, unique=unico)
+
+    # Índice de busca textual (FTS5 no SQLite; no PostgreSQL são índices GIN)
+    _criar_indices_busca(conn)
+
+
+def downgrade() -> None:
+    # Volta ao banco vazio: apaga os índices de busca e todas as tabelas (e os dados)
+    conn = op.get_bind()
+    for tabela in BUSCA:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {tabela}_fts")
+        elif conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS ix_{tabela}_busca")
+    for tabela, _, _ in reversed(_tabelas()):
+        op.drop_table(tabela)
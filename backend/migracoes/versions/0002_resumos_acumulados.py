@@ -0,0 +1,66 @@
+"""Resumos acumulados de vendas por produto e por cliente
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Cria resumo_produtos e resumo_clientes e preenche a partir das saídas em
+transacoes, em lotes de ids (ddl_online.acumular): cada lote segura o lock
+de escrita do SQLite só enquanto dura. As tabelas novas não são usadas pelo
+código antigo; se a migração for interrompida, rodar de novo recomeça o
+preenchimento do zero. Vendas feitas por workers com o código antigo depois
+desta migração não entram nos resumos: nesse caso, rode rebuild_rollup.py
+depois do deploy.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+import ddl_online
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    ddl_online.criar_tabela(
+        "resumo_produtos",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("produto_id", sa.Integer, primary_key=True),
+        sa.Column("transacoes_saida", sa.Integer, nullable=False),
+        sa.Column("quantidade_saida", sa.Integer, nullable=False),
+        sa.Column("valor_saida", sa.Float, nullable=False),
+        indices=[("ix_resumo_produtos_user_valor", ["user_id", "valor_saida"])],
+    )
+    ddl_online.criar_tabela(
+        "resumo_clientes",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("cliente_id", sa.Integer, primary_key=True),
+        sa.Column("transacoes_saida", sa.Integer, nullable=False),
+        sa.Column("valor_saida", sa.Float, nullable=False),
+        indices=[("ix_resumo_clientes_user_valor", ["user_id", "valor_saida"])],
+    )
+
+    op.execute("DELETE FROM resumo_produtos")
+    op.execute("DELETE FROM resumo_clientes")
+    # Saídas são tudo que não é entrada (mesma regra de rollup._tipo)
+    ddl_online.acumular(
+        "resumo_produtos", ["user_id", "produto_id"],
+        {"transacoes_saida": "count(id)", "quantidade_saida": "sum(quantidade)", "valor_saida": "sum(valor_total)"},
+        origem="transacoes",
+        filtro="tipo <> 'entrada' AND user_id IS NOT NULL AND produto_id IS NOT NULL",
+    )
+    ddl_online.acumular(
+        "resumo_clientes", ["user_id", "cliente_id"],
+        {"transacoes_saida": "count(id)", "valor_saida": "sum(valor_total)"},
+        origem="transacoes",
+        filtro="tipo <> 'entrada' AND user_id IS NOT NULL AND cliente_id IS NOT NULL",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("resumo_clientes")
+    op.drop_table("resumo_produtos")
@@ -0,0 +1,53 @@
+"""Fila de tarefas em segundo plano
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Cria a tabela tarefas (tarefas.py, worker.py). Tabela nova, sem
+preenchimento.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+import ddl_online
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    ddl_online.criar_tabela(
+        "tarefas",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("tipo", sa.String, nullable=False),
+        sa.Column("parametros", sa.JSON, nullable=False),
+        sa.Column("estado", sa.String, nullable=False),
+        sa.Column("progresso", sa.Float, nullable=False),
+        sa.Column("mensagem", sa.String),
+        sa.Column("tentativas", sa.Integer, nullable=False),
+        sa.Column("max_tentativas", sa.Integer, nullable=False),
+        sa.Column("disponivel_em", sa.DateTime, nullable=False),
+        sa.Column("cancelar", sa.Boolean, nullable=False),
+        sa.Column("worker", sa.String),
+        sa.Column("heartbeat", sa.DateTime),
+        sa.Column("resultado", sa.JSON),
+        sa.Column("arquivo", sa.String),
+        sa.Column("erro", sa.Text),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("iniciada_em", sa.DateTime),
+        sa.Column("concluida_em", sa.DateTime),
+        indices=[
+            ("ix_tarefas_estado_disponivel", ["estado", "disponivel_em"]),
+            ("ix_tarefas_user_created", ["user_id", "created_at"]),
+        ],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("tarefas")
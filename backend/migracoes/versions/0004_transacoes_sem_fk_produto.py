@@ -0,0 +1,65 @@
+"""Transações mantêm o produto_id depois que o produto é excluído
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Remove a FK transacoes.produto_id -> produtos.id: excluir um produto não
+anula mais o produto_id do histórico, e os resumos (rollup.py) continuam
+subtraindo as vendas desfeitas depois da exclusão. No SQLite as FKs não são
+verificadas (PRAGMA foreign_keys desligado) e a declaração fica na tabela:
+removê-la exigiria recriar transacoes.
+
+Transações cujo produto_id já foi anulado recuperam o id pelo movimento de
+estoque da venda (mesmo usuário, mesma data), em lotes. As anteriores ao
+livro de estoque continuam sem produto: rode rebuild_rollup.py depois da
+migração para os resumos deixarem de contá-las.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+import ddl_online
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_MOVIMENTO = (
+    "FROM movimentos_estoque m WHERE m.user_id = transacoes.user_id "
+    "AND m.created_at = transacoes.created_at AND m.transacao_id = transacoes.id "
+    "AND m.origem IN ('entrada', 'saida')"
+)
+
+
+def _fks_produto() -> list:
+    return [
+        fk["name"] for fk in sa.inspect(op.get_bind()).get_foreign_keys("transacoes")
+        if fk["referred_table"] == "produtos" and fk["constrained_columns"] == ["produto_id"] and fk["name"]
+    ]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        for nome in _fks_produto():
+            ddl_online.remover_fk(nome, "transacoes")
+
+    ddl_online.preencher(
+        "transacoes",
+        {"produto_id": f"(SELECT min(m.produto_id) {_MOVIMENTO})"},
+        pendentes=f"produto_id IS NULL AND created_at IS NOT NULL AND EXISTS (SELECT 1 {_MOVIMENTO})",
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite" or _fks_produto():
+        return
+    # Volta a anular o produto das transações de produtos excluídos, como antes
+    ddl_online.preencher(
+        "transacoes",
+        {"produto_id": "NULL"},
+        pendentes="produto_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM produtos p WHERE p.id = transacoes.produto_id)",
+    )
+    op.create_foreign_key(None, "transacoes", "produtos", ["produto_id"], ["id"])
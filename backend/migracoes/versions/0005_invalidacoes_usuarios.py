@@ -0,0 +1,35 @@
+"""Invalidações do cache de usuários entre processos
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Cria a tabela invalidacoes_usuarios (auth.py): a exclusão de um usuário num
+worker da API remove o usuário do cache de todos os workers. Tabela nova,
+sem preenchimento.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+import ddl_online
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    ddl_online.criar_tabela(
+        "invalidacoes_usuarios",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("username", sa.String, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        indices=[("ix_invalidacoes_usuarios_created", ["created_at"])],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("invalidacoes_usuarios")
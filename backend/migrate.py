@@ -0,0 +1,29 @@
+"""
+Script para criar/atualizar o banco de dados: aplica as migrações do
+Alembic (migracoes/versions) que ainda não rodaram
+
+    python migrate.py               # alembic upgrade head
+    alembic revision -m "descrição" # nova revisão (na pasta backend)
+"""
+import os
+from alembic import command
+from alembic.config import Config
+from database import engine
+
+# A API também migra ao iniciar; o gunicorn.conf.py desliga (cada worker faria
+# as mesmas verificações de DDL disputando o lock do banco)
+AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+def migrate(bind=engine):
+    """Aplica as migrações pendentes (alembic upgrade head)"""
+    config = Config(ALEMBIC_INI)
+    with bind.connect() as conn:
+        config.attributes["connection"] = conn
+        command.upgrade(config, "head")
+        conn.commit()
+
+if __name__ == "__main__":
+    migrate()
+    print("✅ Banco de dados atualizado (migrações aplicadas)")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Text, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -21,6 +21,10 @@ class User(Base):
 
 class Categoria(Base):
     __tablename__ = "categorias"
+    __table_args__ = (
+        Index("ix_categorias_user_id", "user_id"),
+        Index("ix_categorias_user_versao", "user_id", "versao"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
@@ -28,28 +32,42 @@ class Categoria(Base):
     cor = Column(String, default="#3B82F6")
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    versao = Column(Integer)  # versão do usuário na última alteração (sincronização)
     
     owner = relationship("User", back_populates="categorias")
     produtos = relationship("Produto", back_populates="categoria")
 
 class Produto(Base):
     __tablename__ = "produtos"
+    __table_args__ = (
+        Index("ix_produtos_user_created", "user_id", "created_at"),
+        Index("ix_produtos_user_versao", "user_id", "versao"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
     valor = Column(Float, nullable=False)
     quantidade = Column(Integer, default=0)
     descricao = Column(Text)
-    categoria_id = Column(Integer, ForeignKey("categorias.id"))
+    categoria_id = Column(Integer, ForeignKey("categorias.id"), index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    versao = Column(Integer)  # versão do usuário na última alteração (sincronização)
     
     owner = relationship("User", back_populates="produtos")
     categoria = relationship("Categoria", back_populates="produtos")
-    transacoes = relationship("Transacao", back_populates="produto")
+    # passive_deletes="all": excluir o produto não anula o produto_id do histórico
+    transacoes = relationship(
+        "Transacao", back_populates="produto",
+        primaryjoin="Produto.id == foreign(Transacao.produto_id)", passive_deletes="all",
+    )
 
 class Cliente(Base):
     __tablename__ = "clientes"
+    __table_args__ = (
+        Index("ix_clientes_user_created", "user_id", "created_at"),
+        Index("ix_clientes_user_versao", "user_id", "versao"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
@@ -58,17 +76,25 @@ class Cliente(Base):
     endereco = Column(String)
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    versao = Column(Integer)  # versão do usuário na última alteração (sincronização)
     
     owner = relationship("User", back_populates="clientes")
     transacoes = relationship("Transacao", back_populates="cliente")
 
 class Transacao(Base):
     __tablename__ = "transacoes"
+    __table_args__ = (
+        Index("ix_transacoes_user_created", "user_id", "created_at"),
+        Index("ix_transacoes_user_produto", "user_id", "produto_id"),
+        Index("ix_transacoes_user_cliente", "user_id", "cliente_id"),
+        Index("ix_transacoes_user_versao", "user_id", "versao"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     tipo = Column(String, nullable=False)  # entrada ou saida
-    produto_id = Column(Integer, ForeignKey("produtos.id"))
-    cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=True)
+    # Sem FK: o histórico mantém o produto_id depois que o produto é excluído
+    produto_id = Column(Integer, index=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=True, index=True)
     quantidade = Column(Integer, nullable=False)
     valor_unitario = Column(Float, nullable=False)
     valor_total = Column(Float, nullable=False)
@@ -76,7 +102,135 @@ class Transacao(Base):
     observacoes = Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    versao = Column(Integer)  # versão do usuário na última alteração (sincronização)
     
     owner = relationship("User", back_populates="transacoes")
-    produto = relationship("Produto", back_populates="transacoes")
+    produto = relationship("Produto", back_populates="transacoes", primaryjoin="foreign(Transacao.produto_id) == Produto.id")
     cliente = relationship("Cliente", back_populates="transacoes")
+
+class ResumoDiario(Base):
+    """Totais diários por produto, mantidos junto com cada transação"""
+    __tablename__ = "resumo_diario"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    # Sem FK: o histórico do resumo continua válido após o produto ser excluído
+    produto_id = Column(Integer, primary_key=True)
+    transacoes_entrada = Column(Integer, nullable=False, default=0)
+    quantidade_entrada = Column(Integer, nullable=False, default=0)
+    valor_entrada = Column(Float, nullable=False, default=0.0)
+    transacoes_saida = Column(Integer, nullable=False, default=0)
+    quantidade_saida = Column(Integer, nullable=False, default=0)
+    valor_saida = Column(Float, nullable=False, default=0.0)
+
+class ResumoProduto(Base):
+    """Vendas (saídas) acumuladas por produto, mantidas junto com cada transação"""
+    __tablename__ = "resumo_produtos"
+    __table_args__ = (
+        Index("ix_resumo_produtos_user_valor", "user_id", "valor_saida"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Sem FK, como em resumo_diario
+    produto_id = Column(Integer, primary_key=True)
+    transacoes_saida = Column(Integer, nullable=False, default=0)
+    quantidade_saida = Column(Integer, nullable=False, default=0)
+    valor_saida = Column(Float, nullable=False, default=0.0)
+
+class ResumoCliente(Base):
+    """Compras (saídas) acumuladas por cliente, mantidas junto com cada transação"""
+    __tablename__ = "resumo_clientes"
+    __table_args__ = (
+        Index("ix_resumo_clientes_user_valor", "user_id", "valor_saida"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    cliente_id = Column(Integer, primary_key=True)
+    transacoes_saida = Column(Integer, nullable=False, default=0)
+    valor_saida = Column(Float, nullable=False, default=0.0)
+
+class MovimentoEstoque(Base):
+    """Livro de movimentações de estoque (somente inserção)"""
+    __tablename__ = "movimentos_estoque"
+    __table_args__ = (
+        Index("ix_movimentos_estoque_user_created", "user_id", "created_at"),
+        Index("ix_movimentos_estoque_user_produto_created", "user_id", "produto_id", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Sem FK: o histórico continua válido após o produto ou a transação serem excluídos
+    produto_id = Column(Integer, nullable=False)
+    transacao_id = Column(Integer, nullable=True)
+    origem = Column(String, nullable=False)  # inicial, ajuste, entrada, saida, estorno
+    quantidade = Column(Integer, nullable=False)  # variação do estoque (negativa nas saídas)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class SnapshotEstoque(Base):
+    """Saldo de cada produto considerando os movimentos anteriores a `ate`"""
+    __tablename__ = "snapshots_estoque"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    produto_id = Column(Integer, primary_key=True)
+    ate = Column(DateTime, primary_key=True)
+    quantidade = Column(Integer, nullable=False)
+
+class VersaoUsuario(Base):
+    """Contador de versão por usuário, incrementado a cada transação que altera seus dados"""
+    __tablename__ = "versoes"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+
+class Exclusao(Base):
+    """Registros excluídos (tombstones) para a sincronização incremental"""
+    __tablename__ = "exclusoes"
+    __table_args__ = (
+        Index("ix_exclusoes_user_versao", "user_id", "versao"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    recurso = Column(String, nullable=False)  # categorias, produtos, clientes, transacoes
+    registro_id = Column(Integer, nullable=False)
+    versao = Column(Integer, nullable=False)
+
+class InvalidacaoUsuario(Base):
+    """Usuários removidos do cache de autenticação, lidos por todos os processos da API (auth.py)"""
+    __tablename__ = "invalidacoes_usuarios"
+    __table_args__ = (
+        Index("ix_invalidacoes_usuarios_created", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    username = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class Tarefa(Base):
+    """Fila de tarefas em segundo plano (exportações, relatórios, importações), executadas por worker.py"""
+    __tablename__ = "tarefas"
+    __table_args__ = (
+        # Próxima tarefa da fila e tarefas presas/antigas (por estado)
+        Index("ix_tarefas_estado_disponivel", "estado", "disponivel_em"),
+        Index("ix_tarefas_user_created", "user_id", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tipo = Column(String, nullable=False)  # exportacao, relatorio, parquet, resumos, importacao
+    parametros = Column(JSON, nullable=False)
+    estado = Column(String, nullable=False, default="pendente")  # pendente, executando, concluida, falhou, cancelada
+    progresso = Column(Float, nullable=False, default=0.0)  # 0 a 1
+    mensagem = Column(String)  # etapa atual
+    tentativas = Column(Integer, nullable=False, default=0)
+    max_tentativas = Column(Integer, nullable=False, default=3)
+    disponivel_em = Column(DateTime, nullable=False, default=datetime.utcnow)  # próxima tentativa
+    cancelar = Column(Boolean, nullable=False, default=False)  # cancelamento pedido durante a execução
+    worker = Column(String)  # worker que reservou a tarefa
+    heartbeat = Column(DateTime)  # último sinal do worker
+    resultado = Column(JSON)
+    arquivo = Column(String)  # nome do arquivo gerado (download)
+    erro = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    iniciada_em = Column(DateTime)
+    concluida_em = Column(DateTime)
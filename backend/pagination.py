@@ -0,0 +1,92 @@
+"""Paginação por cursor (keyset) sobre (created_at, id)"""
+import base64
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.orm import Query
+
+# Tamanho de página quando o cliente não manda ?limit=. PAGINA_PADRAO=0
+# devolve tudo nesse caso (comportamento anterior à paginação, para clientes
+# antigos que não seguem o X-Next-Cursor)
+DEFAULT_PAGE_SIZE = int(os.environ.get("PAGINA_PADRAO", "100"))
+# Máximo aceito em ?limit=
+MAX_PAGE_SIZE = 1000
+
+# Header com o cursor da próxima página (ausente na última página)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Gera cursor opaco a partir da última linha da página"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Lê o cursor recebido do cliente"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _keyset(query, model, cursor: Optional[str]):
+    """Ordenação (created_at, id) decrescente e filtro do cursor (Query ou select())"""
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < row_id),
+            )
+        )
+    return query
+
+
+def _limitar(query, limit: int):
+    """Uma linha a mais que o limite, para saber se existe próxima página (limit=0: sem limite)"""
+    return query.limit(limit + 1) if limit else query
+
+
+def _page(rows: list, response: Response, limit: int) -> list:
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return rows
+
+
+def paginate(query: Query, model, response: Response, cursor: Optional[str], limit: int) -> list:
+    """
+    Aplica ordenação (created_at, id) decrescente e o filtro do cursor.
+
+    Busca uma linha a mais que o limite para saber se existe próxima página
+    e, se existir, devolve o cursor no header X-Next-Cursor.
+    """
+    rows = _limitar(_keyset(query, model, cursor), limit).all()
+    return _page(rows, response, limit)
+
+
+def paginate_columns(query: Query, model, columns, response: Response, cursor: Optional[str], limit: int) -> list:
+    """paginate() selecionando só `columns`: devolve Rows (tuplas), sem objetos ORM"""
+    rows = _limitar(_keyset(query.with_entities(*columns), model, cursor), limit).all()
+    return _page(rows, response, limit)
+
+
+async def paginate_async(db, stmt: Select, model, response: Response, cursor: Optional[str], limit: int) -> list:
+    """paginate() para AsyncSession, recebendo um select()"""
+    result = await db.execute(_limitar(_keyset(stmt, model, cursor), limit))
+    return _page(list(result.scalars()), response, limit)
+
+
+async def paginate_columns_async(db, stmt: Select, model, columns, response: Response, cursor: Optional[str], limit: int) -> list:
+    """paginate_columns() para AsyncSession, recebendo um select()"""
+    result = await db.execute(_limitar(_keyset(stmt.with_only_columns(*columns), model, cursor), limit))
+    return _page(result.all(), response, limit)
@@ -0,0 +1,31 @@
+"""Filtros de consulta compartilhados entre os endpoints síncronos e assíncronos"""
+from datetime import datetime
+from typing import Optional
+
+import models
+
+
+def filtrar_transacoes(
+    query,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+    tipo: Optional[str] = None,
+    produto_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    numero_pedido: Optional[str] = None,
+):
+    """Aplica os filtros de listagem de transações (Query ou select())"""
+    if data_inicio is not None:
+        query = query.filter(models.Transacao.created_at >= data_inicio)
+    if data_fim is not None:
+        query = query.filter(models.Transacao.created_at < data_fim)
+    if tipo is not None:
+        query = query.filter(models.Transacao.tipo == tipo)
+    if produto_id is not None:
+        query = query.filter(models.Transacao.produto_id == produto_id)
+    if cliente_id is not None:
+        query = query.filter(models.Transacao.cliente_id == cliente_id)
+    if numero_pedido:
+        # Busca por prefixo (LIKE 'xxx%'), escapando curingas
+        query = query.filter(models.Transacao.numero_pedido.startswith(numero_pedido, autoescape=True))
+    return query
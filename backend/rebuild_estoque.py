@@ -0,0 +1,29 @@
+"""Script para recriar o livro de movimentos e os snapshots de estoque"""
+import argparse
+from datetime import datetime
+import migrate
+import estoque
+from database import engine, SessionLocal
+
+# Criar tabelas e índices
+migrate.migrate(engine)
+
+def rebuild_estoque(user_id=None):
+    db = SessionLocal()
+    try:
+        movimentos = estoque.rebuild(db, user_id)
+        snapshots = estoque.snapshots_diarios(db, datetime.utcnow(), user_id)
+        db.commit()
+        alvo = f"usuário {user_id}" if user_id is not None else "todos os usuários"
+        print(f"✅ Livro de estoque recriado para {alvo}: {movimentos} movimentos, {snapshots} snapshots")
+    except Exception as e:
+        print(f"❌ Erro ao recriar livro de estoque: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recria movimentos_estoque e snapshots_estoque a partir das transações")
+    parser.add_argument("--user", type=int, default=None, help="ID do usuário (padrão: todos)")
+    args = parser.parse_args()
+    rebuild_estoque(args.user)
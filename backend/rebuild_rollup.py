@@ -0,0 +1,28 @@
+"""Script para recalcular os resumos de transações (resumo_diario, resumo_produtos e resumo_clientes)"""
+import argparse
+import models
+import migrate
+import rollup
+from database import engine, SessionLocal
+
+# Criar tabelas e índices
+migrate.migrate(engine)
+
+def rebuild_rollup(user_id=None):
+    db = SessionLocal()
+    try:
+        linhas = rollup.rebuild(db, user_id)
+        db.commit()
+        alvo = f"usuário {user_id}" if user_id is not None else "todos os usuários"
+        print(f"✅ Resumos recalculados para {alvo}: {linhas} linhas no resumo diário")
+    except Exception as e:
+        print(f"❌ Erro ao recalcular resumos: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula os resumos (resumo_diario, resumo_produtos, resumo_clientes) a partir das transações")
+    parser.add_argument("--user", type=int, default=None, help="ID do usuário (padrão: todos)")
+    args = parser.parse_args()
+    rebuild_rollup(args.user)
@@ -0,0 +1,222 @@
+"""
+Resumos (rollup) de transações, mantidos na mesma transação do banco:
+
+- resumo_diario: por usuário, dia e produto (relatórios por período)
+- resumo_produtos / resumo_clientes: vendas acumuladas por produto e por
+  cliente (rankings e totais do assistente sem percorrer o histórico)
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+
+CHAVE = ("user_id", "dia", "produto_id")
+
+MEDIDAS = (
+    "transacoes_entrada",
+    "quantidade_entrada",
+    "valor_entrada",
+    "transacoes_saida",
+    "quantidade_saida",
+    "valor_saida",
+)
+
+AGRUPAMENTOS = ("dia", "mes", "produto")
+
+# Totais acumulados (só saídas): model, chave e medidas
+TOTAIS = (
+    (models.ResumoProduto, ("user_id", "produto_id"), ("transacoes_saida", "quantidade_saida", "valor_saida")),
+    (models.ResumoCliente, ("user_id", "cliente_id"), ("transacoes_saida", "valor_saida")),
+)
+
+
+def _incluida(t) -> bool:
+    """
+    Regra de registrar() e rebuild(): transações antigas sem data ficam de
+    fora, assim como as sem produto_id (anulado pela exclusão do produto
+    antes da migração 0004; hoje o produto_id é mantido).
+    """
+    return t.created_at is not None and t.produto_id is not None
+
+
+def _tipo(tipo: str) -> str:
+    # Mesma regra de create_transacao: tudo que não é entrada é saída
+    return "entrada" if tipo == "entrada" else "saida"
+
+
+def _linhas(transacoes: Iterable, sinal: int) -> List[Dict]:
+    """Agrupa as transações pela chave do rollup, já com o sinal aplicado"""
+    linhas: Dict[tuple, Dict] = {}
+    for t in transacoes:
+        if not _incluida(t):
+            continue
+        chave = (t.user_id, t.created_at.date(), t.produto_id)
+        linha = linhas.get(chave)
+        if linha is None:
+            linha = dict(zip(CHAVE, chave), **{m: 0 for m in MEDIDAS})
+            linhas[chave] = linha
+
+        tipo = _tipo(t.tipo)
+        linha[f"transacoes_{tipo}"] += sinal
+        linha[f"quantidade_{tipo}"] += sinal * t.quantidade
+        linha[f"valor_{tipo}"] += sinal * t.valor_total
+    return list(linhas.values())
+
+
+def _linhas_totais(transacoes: Iterable, sinal: int, chave: tuple, medidas: tuple) -> List[Dict]:
+    """Saídas agrupadas pela chave de um resumo acumulado (produto ou cliente)"""
+    linhas: Dict[tuple, Dict] = {}
+    for t in transacoes:
+        valores = tuple(getattr(t, k) for k in chave)
+        if _tipo(t.tipo) != "saida" or None in valores:
+            continue
+        linha = linhas.get(valores)
+        if linha is None:
+            linha = dict(zip(chave, valores), **{m: 0 for m in medidas})
+            linhas[valores] = linha
+        linha["transacoes_saida"] += sinal
+        if "quantidade_saida" in linha:
+            linha["quantidade_saida"] += sinal * t.quantidade
+        linha["valor_saida"] += sinal * t.valor_total
+    return list(linhas.values())
+
+
+def _upsert(db: Session, linhas: List[Dict], model=models.ResumoDiario, chave=CHAVE, medidas=MEDIDAS):
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        ins = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table)
+        stmt = ins.on_conflict_do_update(
+            index_elements=[table.c[k] for k in chave],
+            set_={m: table.c[m] + ins.excluded[m] for m in medidas},
+        )
+        db.execute(stmt, linhas)
+        return
+
+    # Outros bancos: UPDATE incremental e INSERT se a linha ainda não existir
+    for linha in linhas:
+        result = db.execute(
+            update(table)
+            .where(*[table.c[k] == linha[k] for k in chave])
+            .values({m: table.c[m] + linha[m] for m in medidas})
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**linha))
+
+
+def registrar(db: Session, transacoes: Iterable, sinal: int = 1):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) transações dos resumos.
+
+    Não faz commit: deve rodar na mesma transação do banco que grava ou
+    remove as transações. created_at precisa estar preenchido.
+    """
+    transacoes = list(transacoes)
+    linhas = _linhas(transacoes, sinal)
+    if linhas:
+        _upsert(db, linhas)
+    for model, chave, medidas in TOTAIS:
+        linhas = _linhas_totais(transacoes, sinal, chave, medidas)
+        if linhas:
+            _upsert(db, linhas, model, chave, medidas)
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    """Recalcula o resumo a partir da tabela de transações"""
+    T = models.Transacao
+    R = models.ResumoDiario
+
+    apagar = delete(R)
+    if user_id is not None:
+        apagar = apagar.where(R.user_id == user_id)
+    db.execute(apagar)
+
+    entrada = T.tipo == "entrada"
+    origem = (
+        select(
+            T.user_id,
+            func.date(T.created_at),
+            T.produto_id,
+            func.sum(case((entrada, 1), else_=0)),
+            func.sum(case((entrada, T.quantidade), else_=0)),
+            func.sum(case((entrada, T.valor_total), else_=0.0)),
+            func.sum(case((entrada, 0), else_=1)),
+            func.sum(case((entrada, 0), else_=T.quantidade)),
+            func.sum(case((entrada, 0.0), else_=T.valor_total)),
+        )
+        # Mesma regra de _incluida
+        .where(T.created_at.isnot(None), T.produto_id.isnot(None))
+        .group_by(T.user_id, func.date(T.created_at), T.produto_id)
+    )
+    if user_id is not None:
+        origem = origem.where(T.user_id == user_id)
+
+    result = db.execute(insert(R).from_select(list(CHAVE + MEDIDAS), origem))
+    rebuild_totais(db, user_id)
+    return result.rowcount
+
+
+def rebuild_totais(db: Session, user_id: Optional[int] = None):
+    """Recalcula resumo_produtos e resumo_clientes a partir das transações"""
+    T = models.Transacao
+    for model, chave, medidas in TOTAIS:
+        apagar = delete(model)
+        if user_id is not None:
+            apagar = apagar.where(model.user_id == user_id)
+        db.execute(apagar)
+
+        somas = {
+            "transacoes_saida": func.count(T.id),
+            "quantidade_saida": func.sum(T.quantidade),
+            "valor_saida": func.sum(T.valor_total),
+        }
+        colunas = [getattr(T, k) for k in chave]
+        origem = (
+            select(*colunas, *[somas[m] for m in medidas])
+            .where(T.tipo != "entrada", *[c.isnot(None) for c in colunas])
+            .group_by(*colunas)
+        )
+        if user_id is not None:
+            origem = origem.where(T.user_id == user_id)
+        db.execute(insert(model).from_select(list(chave + medidas), origem))
+
+
+def relatorio(db: Session, user_id: int, inicio: date, fim: date, agrupar: str = "dia") -> List[Dict]:
+    """Totais do período (datas inclusivas) agrupados por dia, mês ou produto"""
+    R = models.ResumoDiario
+    somas = [func.sum(getattr(R, m)) for m in MEDIDAS]
+
+    if agrupar == "produto":
+        query = (
+            db.query(R.produto_id, models.Produto.nome, *somas)
+            .outerjoin(models.Produto, models.Produto.id == R.produto_id)
+            .group_by(R.produto_id, models.Produto.nome)
+            .order_by(func.sum(R.valor_saida).desc())
+        )
+    else:
+        query = db.query(R.dia, *somas).group_by(R.dia).order_by(R.dia)
+
+    # Linhas que se anularam (venda desfeita) ficam fora; as contagens são
+    # inteiras, sem o resíduo que a soma dos valores em float pode deixar
+    query = query.filter(R.user_id == user_id, R.dia >= inicio, R.dia <= fim).having(
+        or_(func.sum(R.transacoes_entrada) != 0, func.sum(R.transacoes_saida) != 0)
+    )
+
+    if agrupar == "produto":
+        return [
+            {"periodo": None, "produto_id": row[0], "nome": row[1], **dict(zip(MEDIDAS, row[2:]))}
+            for row in query
+        ]
+
+    linhas: Dict[str, Dict] = {}
+    for row in query:
+        periodo = row[0].strftime("%Y-%m") if agrupar == "mes" else row[0].isoformat()
+        linha = linhas.setdefault(periodo, {"periodo": periodo, **{m: 0 for m in MEDIDAS}})
+        for m, valor in zip(MEDIDAS, row[1:]):
+            linha[m] += valor
+    return list(linhas.values())
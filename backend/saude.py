@@ -0,0 +1,63 @@
+"""
+Sondas de saúde para o orquestrador (Railway, Kubernetes, load balancer)
+
+- /health/live: o processo responde (não consulta o banco). Falhar aqui
+  significa reiniciar o processo.
+- /health/ready: o processo pode receber tráfego: a inicialização terminou,
+  as tabelas existem (verificado uma vez) e o banco respondeu a um SELECT 1
+  nos últimos READINESS_CACHE_SECONDS. Sondas frequentes reaproveitam o
+  último resultado em vez de ir ao banco a cada chamada.
+"""
+import os
+import threading
+import time
+from typing import Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+import models
+
+READINESS_CACHE_SECONDS = float(os.environ.get("READINESS_CACHE_SECONDS", "10"))
+
+
+class Prontidao:
+    def __init__(self, bind: Engine, cache_seconds: float = READINESS_CACHE_SECONDS):
+        self.bind = bind
+        self.cache_seconds = cache_seconds
+        self.iniciado = False
+        self._schema_ok = False
+        self._resultado: Tuple[bool, str] = (False, "iniciando")
+        self._verificado_em = float("-inf")
+        self._lock = threading.Lock()
+
+    def _consultar(self) -> Tuple[bool, str]:
+        try:
+            with self.bind.connect() as conn:
+                if not self._schema_ok:
+                    existentes = set(inspect(conn).get_table_names())
+                    faltando = [t.name for t in models.Base.metadata.sorted_tables if t.name not in existentes]
+                    if faltando:
+                        return False, "banco sem as tabelas: rode python migrate.py"
+                    self._schema_ok = True
+                conn.execute(text("SELECT 1"))
+            return True, "ok"
+        except Exception as e:
+            return False, f"banco indisponível: {type(e).__name__}"
+
+    def _verificar(self) -> Tuple[bool, str]:
+        with self._lock:
+            # Outra thread pode ter verificado enquanto esta esperava o lock
+            if time.monotonic() - self._verificado_em >= self.cache_seconds:
+                self._resultado = self._consultar()
+                self._verificado_em = time.monotonic()
+            return self._resultado
+
+    async def verificar(self) -> Tuple[bool, str]:
+        """(pronto, motivo); só consulta o banco se o último resultado expirou"""
+        if not self.iniciado:
+            return False, "iniciando"
+        if time.monotonic() - self._verificado_em < self.cache_seconds:
+            return self._resultado
+        return await run_in_threadpool(self._verificar)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+from datetime import date, datetime
 
 # User Schemas
 class UserBase(BaseModel):
@@ -106,7 +106,9 @@ class TransacaoBase(BaseModel):
     observacoes: Optional[str] = None
 
 class TransacaoCreate(TransacaoBase):
-    pass
+    # O estoque só fica certo com tipo conhecido e quantidade positiva (como em /api/vendas)
+    tipo: Literal["entrada", "saida"]
+    quantidade: int = Field(gt=0)
 
 class Transacao(TransacaoBase):
     id: int
@@ -115,3 +117,215 @@ class Transacao(TransacaoBase):
     
     class Config:
         from_attributes = True
+
+# Venda Schemas (pedido com vários itens)
+class VendaItem(BaseModel):
+    produto_id: int
+    quantidade: int
+    valor_unitario: float
+    valor_total: float
+
+class VendaCreate(BaseModel):
+    cliente_id: Optional[int] = None
+    numero_pedido: Optional[str] = None
+    observacoes: Optional[str] = None
+    itens: List[VendaItem]
+
+# Importação em lote
+class ImportErro(BaseModel):
+    linha: int
+    erro: str
+
+class ImportResult(BaseModel):
+    inseridos: int
+    rejeitados: int
+    erros: List[ImportErro]
+
+# Estatísticas
+class TotalTipo(BaseModel):
+    tipo: str
+    transacoes: int
+    quantidade: int
+    valor_total: float
+    pedidos: int
+
+class EstoqueStats(BaseModel):
+    total_produtos: int
+    unidades: int
+    valor_estoque: float
+    sem_estoque: int
+    estoque_baixo: int
+
+class HojeStats(BaseModel):
+    vendas: int
+    faturamento: float
+
+class ProdutoRanking(BaseModel):
+    produto_id: int
+    nome: str
+    quantidade: int
+    valor_total: float
+
+class ClienteRanking(BaseModel):
+    cliente_id: int
+    nome: str
+    compras: int
+    valor_total: float
+
+class DashboardStats(BaseModel):
+    totais: List[TotalTipo]
+    hoje: HojeStats
+    estoque: EstoqueStats
+    total_clientes: int
+    top_produtos: List[ProdutoRanking]
+    top_clientes: List[ClienteRanking]
+
+# Assistente (perguntas do chat respondidas no servidor)
+class AssistenteConsulta(BaseModel):
+    mensagem: str
+    tz_offset: int = 0  # Date.getTimezoneOffset() do navegador, para "hoje"
+
+class VendasTotais(BaseModel):
+    transacoes: int
+    quantidade: int
+    valor_total: float
+
+class ProdutoEstoque(BaseModel):
+    id: int
+    nome: str
+    valor: float
+    quantidade: int
+
+class AssistenteProduto(ProdutoEstoque):
+    descricao: Optional[str] = None
+    vendas: int
+    quantidade_vendida: int
+    faturamento: float
+
+class AssistenteCliente(BaseModel):
+    id: int
+    nome: str
+    email: Optional[str] = None
+    telefone: Optional[str] = None
+    endereco: Optional[str] = None
+    compras: int
+    valor_total: float
+
+class AssistenteResposta(BaseModel):
+    intencao: str
+    # Só os campos da intenção vêm preenchidos
+    termo: Optional[str] = None
+    estoque: Optional[EstoqueStats] = None
+    vendas: Optional[VendasTotais] = None
+    hoje: Optional[VendasTotais] = None
+    total_clientes: Optional[int] = None
+    top_produtos: Optional[List[ProdutoRanking]] = None
+    top_clientes: Optional[List[ClienteRanking]] = None
+    produtos: Optional[List[ProdutoEstoque]] = None
+    total: Optional[int] = None
+    produto: Optional[AssistenteProduto] = None
+    comparado: Optional[AssistenteProduto] = None
+    cliente: Optional[AssistenteCliente] = None
+
+# Relatórios (resumo diário)
+class RelatorioLinha(BaseModel):
+    periodo: Optional[str] = None
+    produto_id: Optional[int] = None
+    nome: Optional[str] = None
+    transacoes_entrada: int
+    quantidade_entrada: int
+    valor_entrada: float
+    transacoes_saida: int
+    quantidade_saida: int
+    valor_saida: float
+
+# Histórico de estoque (livro de movimentos + snapshots)
+class EstoqueItem(BaseModel):
+    produto_id: int
+    nome: str
+    quantidade: int
+    valor_unitario: float
+    valor_total: float
+
+class EstoqueHistorico(BaseModel):
+    data: datetime
+    quantidade_total: int
+    valor_total: float
+    itens: List[EstoqueItem]
+
+class MovimentoEstoque(BaseModel):
+    id: int
+    produto_id: int
+    transacao_id: Optional[int] = None
+    origem: str
+    quantidade: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+# Sincronização incremental
+class SyncExcluidos(BaseModel):
+    categorias: List[int] = []
+    produtos: List[int] = []
+    clientes: List[int] = []
+    transacoes: List[int] = []
+
+class SyncResult(BaseModel):
+    versao: int
+    completo: bool
+    categorias: List[Categoria]
+    produtos: List[Produto]
+    clientes: List[Cliente]
+    transacoes: List[Transacao]
+    # Carga completa com ?janela=: continuação do histórico em GET /api/transacoes?cursor=
+    cursor_transacoes: Optional[str] = None
+    excluidos: SyncExcluidos
+
+# Tarefas em segundo plano (parâmetros de cada tipo e estado da tarefa)
+class ExportacaoParametros(BaseModel):
+    recurso: Literal["produtos", "clientes", "transacoes"]
+    formato: Literal["csv", "ndjson"] = "csv"
+
+class RelatorioParametros(BaseModel):
+    data_inicio: date
+    data_fim: date
+    agrupar: Literal["dia", "mes", "produto"] = "dia"
+    formato: Literal["csv", "ndjson"] = "csv"
+
+class ResumosParametros(BaseModel):
+    user_id: Optional[int] = None  # padrão: todos os usuários
+
+class ParquetParametros(BaseModel):
+    data_inicio: Optional[date] = None
+    data_fim: Optional[date] = None
+    compressao: Literal["zstd", "snappy", "gzip", "none"] = "zstd"
+
+class ImportacaoParametros(BaseModel):
+    recurso: Literal["produtos", "clientes"]
+    formato: Literal["csv", "ndjson"]
+    entrada: str  # arquivo enviado, salvo em TAREFAS_DIR
+
+class TarefaCreate(BaseModel):
+    tipo: str
+    parametros: Dict[str, Any] = {}
+
+class Tarefa(BaseModel):
+    id: int
+    tipo: str
+    parametros: Dict[str, Any]
+    estado: str
+    progresso: float
+    mensagem: Optional[str] = None
+    tentativas: int
+    max_tentativas: int
+    cancelar: bool
+    resultado: Optional[Dict[str, Any]] = None
+    arquivo: Optional[str] = None
+    erro: Optional[str] = None
+    created_at: datetime
+    iniciada_em: Optional[datetime] = None
+    concluida_em: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,73 @@
+"""
+Caminho rápido das listagens: colunas em vez de objetos ORM e JSON via orjson
+
+Com response_model=List[schemas.X], cada linha virava um objeto ORM (com
+identity map) e depois era validada pelo Pydantic (from_attributes) e
+convertida para JSON: isso domina o tempo de listagens grandes. Aqui a
+consulta seleciona só as colunas do schema e as linhas (tuplas) são
+codificadas direto em JSON.
+
+Os valores vêm de colunas tipadas do banco e já estão no formato do schema,
+por isso a validação por linha é dispensada. O response_model continua nas
+rotas para a documentação (/docs).
+"""
+from functools import lru_cache
+from typing import Iterable, Iterator, List
+
+import orjson
+from fastapi import Response
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+# Linhas lidas do banco por vez nas respostas em streaming
+LOTE_STREAMING = 1000
+
+
+@lru_cache(maxsize=None)
+def _campos(schema) -> tuple:
+    return tuple(schema.model_fields)
+
+
+@lru_cache(maxsize=None)
+def colunas(model, schema) -> tuple:
+    """Colunas do model com os campos do schema de resposta, na mesma ordem"""
+    return tuple(getattr(model, campo) for campo in _campos(schema))
+
+
+def linhas(rows: Iterable, schema) -> List[dict]:
+    """Linhas selecionadas com colunas(model, schema) -> dicts com os campos do schema"""
+    campos = _campos(schema)
+    return [dict(zip(campos, row)) for row in rows]
+
+
+def objeto(obj, schema) -> dict:
+    """Objeto ORM -> dict com os campos do schema"""
+    return {campo: getattr(obj, campo) for campo in _campos(schema)}
+
+
+def fluxo_json(db: Session, stmt: Select, schema) -> Iterator[bytes]:
+    """
+    Array JSON gerado em partes, lendo LOTE_STREAMING linhas por vez
+    (yield_per: cursor no servidor no PostgreSQL). A memória fica constante,
+    qualquer que seja o número de linhas.
+    """
+    yield b"["
+    separador = b""
+    for lote in db.execute(stmt.execution_options(yield_per=LOTE_STREAMING)).partitions():
+        # orjson.dumps da lista sem os colchetes
+        yield separador + orjson.dumps(linhas(lote, schema))[1:-1]
+        separador = b","
+    yield b"]"
+
+
+def resposta(conteudo, response: Response) -> Response:
+    """
+    Resposta JSON já codificada. Leva os headers definidos no `response` da
+    rota (X-Next-Cursor, ETag), que o FastAPI ignora quando a rota devolve
+    um Response próprio.
+    """
+    return Response(
+        content=orjson.dumps(conteudo),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
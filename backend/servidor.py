@@ -0,0 +1,94 @@
+"""
+Início do backend em produção: migra o banco uma vez e supervisiona a API
+(gunicorn, ver gunicorn.conf.py) e o worker.py das tarefas
+
+    python servidor.py
+
+- SKIP_MIGRATE=true pula a migração (quando ela roda num passo de release separado)
+- TAREFAS_PROCESSOS=0 não sobe o worker.py (quando ele roda num serviço separado)
+- Se o worker.py terminar, é iniciado de novo (espera crescente entre
+  tentativas seguidas); se o gunicorn terminar, o worker.py é encerrado e o
+  processo sai com o código do gunicorn, para a plataforma reiniciar tudo
+- SIGTERM/SIGINT são repassados aos dois
+"""
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Espera máxima antes de reiniciar um worker.py que caiu seguidamente (segundos)
+ESPERA_MAXIMA = 60
+# Um worker.py que ficou no ar por este tempo zera a contagem de quedas
+VIDA_ESTAVEL = 300
+
+logger = logging.getLogger("servidor")
+
+
+def _iniciar_worker() -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "worker.py"], cwd=BACKEND_DIR)
+
+
+def _encerrar(processo: subprocess.Popen, timeout: float = 30):
+    if processo.poll() is None:
+        processo.terminate()
+        try:
+            processo.wait(timeout)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+            processo.wait()
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s servidor %(levelname)s %(message)s")
+
+    if os.environ.get("SKIP_MIGRATE", "false").lower() not in ("1", "true", "yes"):
+        # Processo separado: as conexões da migração não passam para os workers
+        subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND_DIR, check=True)
+
+    api = subprocess.Popen(["gunicorn", "main:app", "-c", "gunicorn.conf.py"], cwd=BACKEND_DIR)
+    com_worker = int(os.environ.get("TAREFAS_PROCESSOS", "1")) > 0
+    # O gunicorn.conf.py desliga as tarefas nos processos da API (TAREFAS_NA_API=false)
+    filhos = {"api": api, "worker": _iniciar_worker() if com_worker else None}
+    encerrando = False
+
+    def repassar(sinal, _):
+        nonlocal encerrando
+        encerrando = True
+        for processo in filhos.values():
+            if processo is not None and processo.poll() is None:
+                processo.send_signal(sinal)
+
+    signal.signal(signal.SIGTERM, repassar)
+    signal.signal(signal.SIGINT, repassar)
+
+    quedas = 0
+    iniciado = time.monotonic()
+    reiniciar_em = None
+    while api.poll() is None:
+        worker = filhos["worker"]
+        if worker is not None and not encerrando:
+            if reiniciar_em is None and worker.poll() is not None:
+                quedas = 1 if time.monotonic() - iniciado > VIDA_ESTAVEL else quedas + 1
+                espera = min(2 ** quedas, ESPERA_MAXIMA)
+                logger.error("worker.py terminou com código %s; reiniciando em %ss", worker.returncode, espera)
+                reiniciar_em = time.monotonic() + espera
+            elif reiniciar_em is not None and time.monotonic() >= reiniciar_em:
+                filhos["worker"] = _iniciar_worker()
+                iniciado = time.monotonic()
+                reiniciar_em = None
+        time.sleep(1)
+
+    if filhos["worker"] is not None:
+        _encerrar(filhos["worker"])
+    if not encerrando:
+        logger.error("gunicorn terminou com código %s", api.returncode)
+    # Morto por sinal: código negativo vira 128 + sinal, como no shell
+    return api.returncode if api.returncode >= 0 else 128 - api.returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""Script para gravar os snapshots diários de estoque pendentes (rodar 1x por dia, ex.: cron)"""
+from datetime import datetime
+import migrate
+import estoque
+from database import engine, SessionLocal
+
+# Criar tabelas e índices
+migrate.migrate(engine)
+
+def snapshot_estoque():
+    db = SessionLocal()
+    try:
+        snapshots = estoque.snapshots_diarios(db, datetime.utcnow())
+        db.commit()
+        print(f"✅ {snapshots} snapshots de estoque gravados")
+    except Exception as e:
+        print(f"❌ Erro ao gravar snapshots de estoque: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    snapshot_estoque()
@@ -0,0 +1,155 @@
+"""Estatísticas agregadas no banco (SUM / COUNT / GROUP BY)"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+import models
+
+# Produtos com 0 < quantidade <= LIMITE_ESTOQUE_BAIXO contam como estoque baixo
+LIMITE_ESTOQUE_BAIXO = 5
+
+
+def inicio_do_dia(tz_offset: int = 0) -> datetime:
+    """
+    Meia-noite local convertida para UTC.
+
+    tz_offset segue Date.getTimezoneOffset() do JavaScript: minutos a somar
+    ao horário local para chegar em UTC (ex.: 180 para UTC-3).
+    """
+    offset = timedelta(minutes=tz_offset)
+    local = datetime.utcnow() - offset
+    return datetime(local.year, local.month, local.day) + offset
+
+
+def _filtrar_periodo(query, data_inicio: Optional[datetime], data_fim: Optional[datetime]):
+    if data_inicio is not None:
+        query = query.filter(models.Transacao.created_at >= data_inicio)
+    if data_fim is not None:
+        query = query.filter(models.Transacao.created_at < data_fim)
+    return query
+
+
+def totais_por_tipo(
+    db: Session,
+    user_id: int,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+) -> List[Dict]:
+    """Soma de valor_total e quantidade por tipo (entrada / saida)"""
+    query = db.query(
+        models.Transacao.tipo,
+        func.count(models.Transacao.id),
+        func.coalesce(func.sum(models.Transacao.quantidade), 0),
+        func.coalesce(func.sum(models.Transacao.valor_total), 0.0),
+        func.count(func.distinct(models.Transacao.numero_pedido)),
+    ).filter(models.Transacao.user_id == user_id)
+    query = _filtrar_periodo(query, data_inicio, data_fim)
+
+    return [
+        {
+            "tipo": tipo,
+            "transacoes": transacoes,
+            "quantidade": quantidade,
+            "valor_total": valor_total,
+            "pedidos": pedidos,
+        }
+        for tipo, transacoes, quantidade, valor_total, pedidos in query.group_by(models.Transacao.tipo)
+    ]
+
+
+def estoque(db: Session, user_id: int, limite_baixo: int = LIMITE_ESTOQUE_BAIXO) -> Dict:
+    """Valor do estoque e contagens de produtos sem estoque / estoque baixo"""
+    total, unidades, valor, sem_estoque, baixo = db.query(
+        func.count(models.Produto.id),
+        func.coalesce(func.sum(models.Produto.quantidade), 0),
+        func.coalesce(func.sum(models.Produto.valor * models.Produto.quantidade), 0.0),
+        func.coalesce(func.sum(case((models.Produto.quantidade <= 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(case(
+            ((models.Produto.quantidade > 0) & (models.Produto.quantidade <= limite_baixo), 1),
+            else_=0,
+        )), 0),
+    ).filter(models.Produto.user_id == user_id).one()
+
+    return {
+        "total_produtos": total,
+        "unidades": unidades,
+        "valor_estoque": valor,
+        "sem_estoque": sem_estoque,
+        "estoque_baixo": baixo,
+    }
+
+
+def top_produtos(
+    db: Session,
+    user_id: int,
+    limit: int = 5,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+) -> List[Dict]:
+    """Produtos mais vendidos (saídas) por valor"""
+    valor = func.sum(models.Transacao.valor_total)
+    query = db.query(
+        models.Transacao.produto_id,
+        models.Produto.nome,
+        func.sum(models.Transacao.quantidade),
+        valor,
+    ).join(models.Produto, models.Produto.id == models.Transacao.produto_id).filter(
+        models.Transacao.user_id == user_id,
+        models.Transacao.tipo == "saida",
+    )
+    query = _filtrar_periodo(query, data_inicio, data_fim)
+    query = query.group_by(models.Transacao.produto_id, models.Produto.nome).order_by(valor.desc()).limit(limit)
+
+    return [
+        {"produto_id": produto_id, "nome": nome, "quantidade": quantidade, "valor_total": valor_total}
+        for produto_id, nome, quantidade, valor_total in query
+    ]
+
+
+def top_clientes(
+    db: Session,
+    user_id: int,
+    limit: int = 5,
+    data_inicio: Optional[datetime] = None,
+    data_fim: Optional[datetime] = None,
+) -> List[Dict]:
+    """Clientes que mais compraram (saídas) por valor"""
+    valor = func.sum(models.Transacao.valor_total)
+    query = db.query(
+        models.Transacao.cliente_id,
+        models.Cliente.nome,
+        func.count(models.Transacao.id),
+        valor,
+    ).join(models.Cliente, models.Cliente.id == models.Transacao.cliente_id).filter(
+        models.Transacao.user_id == user_id,
+        models.Transacao.tipo == "saida",
+    )
+    query = _filtrar_periodo(query, data_inicio, data_fim)
+    query = query.group_by(models.Transacao.cliente_id, models.Cliente.nome).order_by(valor.desc()).limit(limit)
+
+    return [
+        {"cliente_id": cliente_id, "nome": nome, "compras": compras, "valor_total": valor_total}
+        for cliente_id, nome, compras, valor_total in query
+    ]
+
+
+def resumo(db: Session, user_id: int, tz_offset: int = 0, limit: int = 5) -> Dict:
+    """Tudo o que o painel inicial precisa em uma única resposta"""
+    hoje = totais_por_tipo(db, user_id, data_inicio=inicio_do_dia(tz_offset))
+    vendas_hoje = next((t for t in hoje if t["tipo"] == "saida"), None)
+
+    return {
+        "totais": totais_por_tipo(db, user_id),
+        "hoje": {
+            "vendas": vendas_hoje["transacoes"] if vendas_hoje else 0,
+            "faturamento": vendas_hoje["valor_total"] if vendas_hoje else 0.0,
+        },
+        "estoque": estoque(db, user_id),
+        "total_clientes": db.query(func.count(models.Cliente.id)).filter(
+            models.Cliente.user_id == user_id
+        ).scalar(),
+        "top_produtos": top_produtos(db, user_id, limit),
+        "top_clientes": top_clientes(db, user_id, limit),
+    }
@@ -0,0 +1,161 @@
+"""
+Teste de estresse: vendas simultâneas do mesmo produto
+
+Sobe a API (uvicorn, banco SQLite temporário) e dispara requisições em
+paralelo contra um único produto, conferindo no fim que o estoque está
+exato: nenhuma atualização perdida e nenhuma venda além do saldo.
+
+Cenários:
+  - sobrevenda: N saídas de 1 unidade com estoque menor que N; exatamente
+    "estoque" vendas passam e o saldo final é zero
+  - concorrência mista: entradas e saídas intercaladas; o saldo final é
+    o inicial + entradas - saídas
+  - vendas com vários itens (/api/vendas): tudo ou nada por venda
+
+Termina com código 1 se algum cenário falhar. Requer httpx e uvicorn.
+
+Uso:
+    python stress_estoque.py --vendas 500 --estoque 120 --concurrency 50 [--async]
+"""
+import argparse
+import asyncio
+import signal
+import sys
+import tempfile
+
+import httpx
+
+from bench_db_modes import _free_port, _start_server, _stop_server, _wait_ready
+
+
+async def _login(client: httpx.AsyncClient):
+    await client.post("/api/register", json={"username": "stress", "password": "stress", "role": "admin"})
+    token = (await client.post("/api/login", data={"username": "stress", "password": "stress"})).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+
+async def _produto(client: httpx.AsyncClient, nome: str, quantidade: int) -> int:
+    r = await client.post("/api/produtos", json={"nome": nome, "valor": 1, "quantidade": quantidade})
+    r.raise_for_status()
+    return r.json()["id"]
+
+
+async def _estoque(client: httpx.AsyncClient, produto_id: int) -> int:
+    for p in (await client.get("/api/produtos", params={"limit": 1000})).json():
+        if p["id"] == produto_id:
+            return p["quantidade"]
+    raise RuntimeError(f"Produto {produto_id} sumiu")
+
+
+async def _disparar(requisicoes: list, concurrency: int) -> list:
+    """Executa as corrotinas com no máximo `concurrency` em voo; devolve os status HTTP"""
+    semaforo = asyncio.Semaphore(concurrency)
+
+    async def uma(fabrica):
+        async with semaforo:
+            try:
+                return (await fabrica()).status_code
+            except httpx.TransportError as e:
+                # Conta como status inesperado: o cenário falha, os outros rodam
+                return type(e).__name__
+
+    return await asyncio.gather(*[uma(f) for f in requisicoes])
+
+
+def _transacao(client, tipo: str, produto_id: int):
+    return lambda: client.post("/api/transacoes", json={
+        "tipo": tipo, "produto_id": produto_id,
+        "quantidade": 1, "valor_unitario": 1, "valor_total": 1,
+    })
+
+
+def _conferir(nome: str, ok: bool, detalhe: str) -> bool:
+    print(f"[{'OK' if ok else 'FALHOU'}] {nome}: {detalhe}")
+    return ok
+
+
+async def sobrevenda(client, args) -> bool:
+    produto_id = await _produto(client, "Sobrevenda", args.estoque)
+    status = await _disparar([_transacao(client, "saida", produto_id) for _ in range(args.vendas)], args.concurrency)
+
+    vendidas = status.count(200)
+    recusadas = status.count(400)
+    final = await _estoque(client, produto_id)
+    ok = vendidas == args.estoque and recusadas == args.vendas - args.estoque and final == 0
+    return _conferir("sobrevenda", ok, f"{vendidas} vendidas, {recusadas} recusadas, "
+                     f"outros status {len(status) - vendidas - recusadas}, estoque final {final}")
+
+
+async def mista(client, args) -> bool:
+    inicial = args.vendas
+    produto_id = await _produto(client, "Mista", inicial)
+    requisicoes = [_transacao(client, "saida" if i % 2 else "entrada", produto_id) for i in range(args.vendas)]
+    status = await _disparar(requisicoes, args.concurrency)
+
+    entradas = sum(1 for i, s in enumerate(status) if s == 200 and not i % 2)
+    saidas = sum(1 for i, s in enumerate(status) if s == 200 and i % 2)
+    esperado = inicial + entradas - saidas
+    final = await _estoque(client, produto_id)
+    ok = final == esperado and status.count(200) == len(status)
+    return _conferir("concorrência mista", ok, f"{entradas} entradas, {saidas} saídas, "
+                     f"estoque final {final} (esperado {esperado})")
+
+
+async def vendas_multiplas(client, args) -> bool:
+    a = await _produto(client, "Venda A", args.estoque)
+    b = await _produto(client, "Venda B", args.estoque * 2)
+
+    def venda():
+        return client.post("/api/vendas", json={"itens": [
+            {"produto_id": a, "quantidade": 1, "valor_unitario": 1, "valor_total": 1},
+            {"produto_id": b, "quantidade": 2, "valor_unitario": 1, "valor_total": 2},
+        ]})
+
+    status = await _disparar([venda for _ in range(args.vendas)], args.concurrency)
+    vendidas = status.count(200)
+    final_a, final_b = await _estoque(client, a), await _estoque(client, b)
+    ok = vendidas == args.estoque and final_a == 0 and final_b == 0
+    return _conferir("vendas com vários itens", ok, f"{vendidas} vendas, estoques finais {final_a} e {final_b}")
+
+
+async def main_async(args, port: int) -> bool:
+    try:
+        # SIGTERM (ex.: timeout do CI) cancela o teste; o servidor é encerrado em main()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:  # Windows
+        pass
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        await _wait_ready(client)
+        await _login(client)
+        resultados = [await cenario(client, args) for cenario in (sobrevenda, mista, vendas_multiplas)]
+        return all(resultados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendas simultâneas do mesmo produto")
+    parser.add_argument("--vendas", type=int, default=300, help="Requisições por cenário")
+    parser.add_argument("--estoque", type=int, default=100, help="Estoque inicial (menor que --vendas)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requisições simultâneas")
+    parser.add_argument("--async", dest="modo_async", action="store_true", help="Testa o modo DB_ASYNC")
+    args = parser.parse_args()
+    if args.estoque >= args.vendas:
+        parser.error("--estoque precisa ser menor que --vendas")
+
+    # Até o event loop assumir, SIGTERM é tratado como Ctrl+C e também passa pelo finally
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    port = _free_port()
+    server = _start_server(args.modo_async, port, tempfile.mkdtemp(prefix="nexus-stress-"))
+    try:
+        ok = asyncio.run(main_async(args, port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("Interrompido")
+        ok = False
+    finally:
+        # Sempre encerra o uvicorn, mesmo com erro, timeout ou Ctrl+C
+        _stop_server(server)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
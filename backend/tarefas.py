@@ -0,0 +1,577 @@
+"""
+Tarefas em segundo plano: fila numa tabela do banco (tarefas) e workers
+
+Operações longas demais para uma requisição (exportação completa ou em
+Parquet, relatório de um ano, importação grande, recálculo dos resumos) são
+enfileiradas por POST /api/tarefas e executadas por `python worker.py`
+(ou por uma thread em cada processo da API, TAREFAS_NA_API=true). O
+cliente acompanha por GET /api/tarefas/{id} e baixa o arquivo gerado em
+GET /api/tarefas/{id}/resultado. Não depende de nada além do banco e de
+uma pasta local (TAREFAS_DIR, compartilhada entre API e workers).
+
+- Reserva: UPDATE ... WHERE id = (próxima pendente) AND estado = 'pendente'.
+  No PostgreSQL a subconsulta usa FOR UPDATE SKIP LOCKED (workers não
+  disputam a mesma linha); no SQLite as escritas já são serializadas
+- Progresso: o executor chama Execucao.progresso(); a gravação é limitada
+  a uma por TAREFAS_PROGRESSO segundos e é onde o cancelamento é percebido
+- Heartbeat: enquanto executa, o worker renova `heartbeat`. Tarefa sem
+  sinal há TAREFAS_TIMEOUT segundos (worker morto) volta para a fila
+- Falha: nova tentativa com espera exponencial até max_tentativas. A
+  importação tem uma tentativa só (os lotes já gravados não são desfeitos)
+- Arquivos: gravados como .parcial e renomeados ao concluir; apagados com
+  a tarefa depois de TAREFAS_RETENCAO horas
+"""
+import csv
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple, Optional, Type
+
+import orjson
+from fastapi import HTTPException, UploadFile
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.orm import Session
+
+import analitico
+import auth
+import bulk
+import estoque
+import models
+import rollup
+import schemas
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+TAREFAS_DIR = os.path.abspath(os.environ.get("TAREFAS_DIR", "./tarefas"))
+# Executar tarefas numa thread de cada processo da API (sem worker.py)
+TAREFAS_NA_API = os.environ.get("TAREFAS_NA_API", "true").lower() in ("1", "true", "yes")
+# Segundos entre consultas à fila quando não há tarefas
+TAREFAS_INTERVALO = float(os.environ.get("TAREFAS_INTERVALO", "1"))
+# Segundos sem heartbeat até a tarefa ser considerada abandonada
+TAREFAS_TIMEOUT = int(os.environ.get("TAREFAS_TIMEOUT", "60"))
+# Intervalo mínimo entre gravações de progresso (segundos)
+TAREFAS_PROGRESSO = float(os.environ.get("TAREFAS_PROGRESSO", "1"))
+# Espera antes da primeira nova tentativa (dobra a cada falha)
+TAREFAS_RETRY_DELAY = float(os.environ.get("TAREFAS_RETRY_DELAY", "10"))
+TAREFAS_MAX_TENTATIVAS = int(os.environ.get("TAREFAS_MAX_TENTATIVAS", "3"))
+# Horas que tarefas finalizadas e seus arquivos são mantidos
+TAREFAS_RETENCAO = float(os.environ.get("TAREFAS_RETENCAO", "24"))
+# Espera máxima do worker entre tentativas depois de erros seguidos (segundos)
+TAREFAS_ESPERA_MAXIMA = 60
+
+FINALIZADAS = ("concluida", "falhou", "cancelada")
+
+MEDIA_TYPES = {**bulk.MEDIA_TYPES, "zip": "application/zip"}
+
+# ==================== EXECUÇÃO ====================
+
+class Cancelada(Exception):
+    """Cancelamento pedido pelo usuário"""
+
+
+class Interrompida(Exception):
+    """Worker encerrando ou tarefa reassumida por outro worker: volta para a fila"""
+
+
+class Execucao:
+    """Tarefa reservada por um worker, passada ao executor do tipo"""
+
+    def __init__(self, tarefa_id: int, user_id: int, parametros: BaseModel, worker: str, parar: threading.Event):
+        self.id = tarefa_id
+        self.user_id = user_id
+        self.parametros = parametros
+        self.worker = worker
+        self.parar = parar
+        self.arquivo: Optional[str] = None
+        self._ultimo = 0.0
+
+    def progresso(self, fracao: float, mensagem: Optional[str] = None, forcar: bool = False):
+        """Registra o progresso (0 a 1); levanta Cancelada/Interrompida se a tarefa deve parar"""
+        if self.parar.is_set():
+            raise Interrompida()
+        agora = time.monotonic()
+        if not forcar and agora - self._ultimo < TAREFAS_PROGRESSO:
+            return
+        self._ultimo = agora
+        T = models.Tarefa
+        valores = {"progresso": min(max(fracao, 0.0), 1.0), "heartbeat": datetime.utcnow()}
+        if mensagem is not None:
+            valores["mensagem"] = mensagem
+        with SessionLocal() as db:
+            cancelar = db.execute(
+                update(T).where(T.id == self.id, T.worker == self.worker, T.estado == "executando")
+                .values(**valores).returning(T.cancelar)
+            ).scalar()
+            db.commit()
+        if cancelar is None:
+            raise Interrompida()
+        if cancelar:
+            raise Cancelada()
+
+    def saida(self, nome: str) -> str:
+        """Caminho (temporário) do arquivo de resultado; `nome` é o nome do download"""
+        self.arquivo = nome
+        os.makedirs(TAREFAS_DIR, exist_ok=True)
+        return _caminho(self.id, nome) + ".parcial"
+
+
+def _caminho(tarefa_id: int, nome: str) -> str:
+    return os.path.join(TAREFAS_DIR, f"{tarefa_id}-{nome}")
+
+
+def _entrada(nome: str) -> str:
+    # Só o nome: parâmetros vêm do banco, mas nunca apontam para fora da pasta
+    return os.path.join(TAREFAS_DIR, os.path.basename(nome))
+
+
+def _remover(caminho: str):
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+# ==================== TIPOS ====================
+
+EXPORTACOES = {
+    "produtos": (models.Produto, bulk.PRODUTO_EXPORT_COLUMNS),
+    "clientes": (models.Cliente, bulk.CLIENTE_EXPORT_COLUMNS),
+    "transacoes": (models.Transacao, bulk.TRANSACAO_EXPORT_COLUMNS),
+}
+
+IMPORTACOES = {
+    "produtos": (
+        schemas.ProdutoCreate, models.Produto,
+        lambda db, produtos: estoque.registrar(db, [estoque.de_produto(p) for p in produtos]),
+    ),
+    "clientes": (schemas.ClienteCreate, models.Cliente, None),
+}
+
+
+def _exportacao(execucao: Execucao) -> Dict:
+    p: schemas.ExportacaoParametros = execucao.parametros
+    model, colunas = EXPORTACOES[p.recurso]
+    with SessionLocal() as db:
+        total = db.query(model).filter(model.user_id == execucao.user_id).count()
+
+    linhas = 0
+
+    def progresso(exportadas: int):
+        nonlocal linhas
+        linhas = exportadas
+        execucao.progresso(exportadas / total if total else 1.0, f"{exportadas} de {total} linhas")
+
+    with open(execucao.saida(f"{p.recurso}.{p.formato}"), "w", encoding="utf-8", newline="") as arquivo:
+        for pedaco in bulk.export_rows(model, colunas, execucao.user_id, p.formato, progresso):
+            arquivo.write(pedaco)
+    return {"linhas": linhas}
+
+
+def _relatorio(execucao: Execucao) -> Dict:
+    p: schemas.RelatorioParametros = execucao.parametros
+    execucao.progresso(0.0, "Consultando o resumo diário", forcar=True)
+    with SessionLocal() as db:
+        linhas = rollup.relatorio(db, execucao.user_id, p.data_inicio, p.data_fim, p.agrupar)
+    execucao.progresso(0.5, f"Gravando {len(linhas)} linhas", forcar=True)
+
+    colunas = list(schemas.RelatorioLinha.model_fields)
+    nome = f"relatorio-{p.agrupar}-{p.data_inicio}-{p.data_fim}.{p.formato}"
+    with open(execucao.saida(nome), "w", encoding="utf-8", newline="") as arquivo:
+        if p.formato == "csv":
+            writer = csv.writer(arquivo)
+            writer.writerow(colunas)
+            writer.writerows([linha.get(c) for c in colunas] for linha in linhas)
+        else:
+            for linha in linhas:
+                arquivo.write(orjson.dumps({c: linha.get(c) for c in colunas}).decode("utf-8") + "\n")
+    return {"linhas": len(linhas)}
+
+
+def _resumos(execucao: Execucao) -> Dict:
+    p: schemas.ResumosParametros = execucao.parametros
+    with SessionLocal() as db:
+        if p.user_id is not None:
+            usuarios = [p.user_id]
+        else:
+            usuarios = db.execute(select(models.User.id).order_by(models.User.id)).scalars().all()
+
+    # Um usuário por transação do banco: o lock de escrita não fica preso até o fim
+    linhas = 0
+    for i, user_id in enumerate(usuarios):
+        execucao.progresso(i / len(usuarios), f"Recalculando resumos ({i} de {len(usuarios)} usuários)")
+        with SessionLocal() as db:
+            linhas += rollup.rebuild(db, user_id)
+            db.commit()
+    return {"usuarios": len(usuarios), "linhas": linhas}
+
+
+def _parquet(execucao: Execucao) -> Dict:
+    p: schemas.ParquetParametros = execucao.parametros
+    with SessionLocal() as db:
+        total = analitico.contar(db, execucao.user_id, p.data_inicio, p.data_fim)
+
+    def progresso(linhas: int):
+        # Até 90%: o restante é o zip
+        execucao.progresso(0.9 * linhas / total if total else 0.9, f"{linhas} de {total} linhas")
+
+    os.makedirs(TAREFAS_DIR, exist_ok=True)
+    pasta = tempfile.mkdtemp(prefix=f"{execucao.id}-parquet-", dir=TAREFAS_DIR)
+    try:
+        with SessionLocal() as db:
+            dados = analitico.escrever_parquet(
+                db, execucao.user_id, pasta, p.data_inicio, p.data_fim, p.compressao, progresso
+            )
+        execucao.progresso(0.9, "Compactando", forcar=True)
+        # Parquet já é comprimido: o zip só agrupa as partições
+        with zipfile.ZipFile(execucao.saida("transacoes-parquet.zip"), "w", zipfile.ZIP_STORED) as destino:
+            for raiz, _, arquivos in os.walk(pasta):
+                for nome in sorted(arquivos):
+                    caminho = os.path.join(raiz, nome)
+                    destino.write(caminho, os.path.relpath(caminho, pasta))
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return dados
+
+
+def _importacao(execucao: Execucao) -> Dict:
+    p: schemas.ImportacaoParametros = execucao.parametros
+    schema, model, ao_inserir = IMPORTACOES[p.recurso]
+    caminho = _entrada(p.entrada)
+    tamanho = os.path.getsize(caminho)
+    with open(caminho, "rb") as arquivo, SessionLocal() as db:
+
+        def progresso(inseridos: int, rejeitados: int):
+            # Posição no arquivo (aproximada: o leitor de texto lê à frente)
+            execucao.progresso(
+                arquivo.tell() / tamanho if tamanho else 1.0,
+                f"{inseridos} inseridos, {rejeitados} rejeitados",
+            )
+
+        return bulk.import_rows(db, arquivo, p.formato, schema, model, execucao.user_id, ao_inserir, progresso)
+
+
+class Tipo(NamedTuple):
+    parametros: Type[BaseModel]
+    executar: Callable[[Execucao], Optional[Dict]]
+    permissao: str
+    max_tentativas: int
+    # Verificação feita ao enfileirar (ex.: dependência opcional instalada)
+    requisito: Optional[Callable[[], None]] = None
+
+
+TIPOS: Dict[str, Tipo] = {
+    "exportacao": Tipo(schemas.ExportacaoParametros, _exportacao, "usuario", TAREFAS_MAX_TENTATIVAS),
+    "relatorio": Tipo(schemas.RelatorioParametros, _relatorio, "usuario", TAREFAS_MAX_TENTATIVAS),
+    "parquet": Tipo(
+        schemas.ParquetParametros, _parquet, "usuario", TAREFAS_MAX_TENTATIVAS, analitico.exigir_pyarrow
+    ),
+    "resumos": Tipo(schemas.ResumosParametros, _resumos, "admin", TAREFAS_MAX_TENTATIVAS),
+    # Lotes já gravados não são desfeitos: repetir duplicaria as linhas
+    "importacao": Tipo(schemas.ImportacaoParametros, _importacao, "gerente", 1),
+}
+
+# Tipos que recebem arquivo: enviados por POST /api/tarefas/importacao
+COM_ARQUIVO = ("importacao",)
+
+# ==================== FILA ====================
+
+def enfileirar(db: Session, user: auth.CurrentUser, tipo: str, parametros: Dict) -> models.Tarefa:
+    """Valida o tipo, a permissão e os parâmetros e cria a tarefa pendente"""
+    definicao = TIPOS.get(tipo)
+    if definicao is None:
+        raise HTTPException(status_code=400, detail=f"Tipo de tarefa inválido (use {', '.join(TIPOS)})")
+    auth.check_permission(user, definicao.permissao)
+    if definicao.requisito is not None:
+        definicao.requisito()
+    try:
+        validados = definicao.parametros.model_validate(parametros)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    inicio, fim = getattr(validados, "data_inicio", None), getattr(validados, "data_fim", None)
+    if inicio is not None and fim is not None and fim < inicio:
+        raise HTTPException(status_code=400, detail="data_fim anterior a data_inicio")
+
+    tarefa = models.Tarefa(
+        user_id=user.id,
+        tipo=tipo,
+        parametros=validados.model_dump(mode="json"),
+        max_tentativas=definicao.max_tentativas,
+        disponivel_em=datetime.utcnow(),
+    )
+    db.add(tarefa)
+    db.commit()
+    db.refresh(tarefa)
+    return tarefa
+
+
+def enfileirar_importacao(
+    db: Session, user: auth.CurrentUser, arquivo: UploadFile, recurso: str, formato: Optional[str]
+) -> models.Tarefa:
+    """Salva o arquivo enviado em TAREFAS_DIR e enfileira a importação"""
+    auth.check_permission(user, TIPOS["importacao"].permissao)
+    formato = bulk.detect_format(arquivo, formato)
+    os.makedirs(TAREFAS_DIR, exist_ok=True)
+    entrada = f"entrada-{uuid.uuid4().hex}.{formato}"
+    with open(_entrada(entrada), "wb") as destino:
+        shutil.copyfileobj(arquivo.file, destino, 1024 * 1024)
+    try:
+        return enfileirar(db, user, "importacao", {"recurso": recurso, "formato": formato, "entrada": entrada})
+    except Exception:
+        _remover(_entrada(entrada))
+        raise
+
+
+def obter(db: Session, user_id: int, tarefa_id: int) -> models.Tarefa:
+    tarefa = db.query(models.Tarefa).filter(
+        models.Tarefa.id == tarefa_id, models.Tarefa.user_id == user_id
+    ).first()
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return tarefa
+
+
+def cancelar(db: Session, user_id: int, tarefa_id: int) -> models.Tarefa:
+    """Pendente: cancelada na hora. Em execução: o worker para no próximo registro de progresso"""
+    T = models.Tarefa
+    estado = db.execute(
+        update(T)
+        .where(T.id == tarefa_id, T.user_id == user_id, T.estado.in_(("pendente", "executando")))
+        .values(
+            cancelar=True,
+            estado=case((T.estado == "pendente", "cancelada"), else_=T.estado),
+            concluida_em=case((T.estado == "pendente", datetime.utcnow()), else_=T.concluida_em),
+        )
+        .returning(T.estado)
+    ).scalar()
+    db.commit()
+    tarefa = obter(db, user_id, tarefa_id)
+    if estado is None:
+        raise HTTPException(status_code=409, detail=f"Tarefa já finalizada ({tarefa.estado})")
+    if estado == "cancelada":
+        _limpar_entrada(tarefa)
+    return tarefa
+
+
+def resultado(db: Session, user_id: int, tarefa_id: int):
+    """Caminho, nome e media type do arquivo gerado pela tarefa"""
+    tarefa = obter(db, user_id, tarefa_id)
+    if tarefa.estado != "concluida":
+        raise HTTPException(status_code=409, detail=f"Tarefa não concluída ({tarefa.estado})")
+    caminho = _caminho(tarefa.id, tarefa.arquivo) if tarefa.arquivo else None
+    if caminho is None or not os.path.exists(caminho):
+        raise HTTPException(status_code=404, detail="Tarefa sem arquivo de resultado (ou já expirado)")
+    extensao = tarefa.arquivo.rsplit(".", 1)[-1]
+    return caminho, tarefa.arquivo, MEDIA_TYPES.get(extensao, "application/octet-stream")
+
+
+def _limpar_entrada(tarefa: models.Tarefa):
+    entrada = (tarefa.parametros or {}).get("entrada") if tarefa.tipo in COM_ARQUIVO else None
+    if entrada:
+        _remover(_entrada(entrada))
+
+# ==================== WORKER ====================
+
+def reservar(db: Session, worker: str) -> Optional[tuple]:
+    """Reserva a próxima tarefa disponível: (id, user_id, tipo, parametros) ou None"""
+    T = models.Tarefa
+    agora = datetime.utcnow()
+    proxima = (
+        select(T.id)
+        .where(T.estado == "pendente", T.disponivel_em <= agora)
+        .order_by(T.disponivel_em, T.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    linha = db.execute(
+        update(T)
+        .where(T.id == proxima, T.estado == "pendente")
+        .values(
+            estado="executando", worker=worker, tentativas=T.tentativas + 1,
+            iniciada_em=agora, heartbeat=agora, progresso=0.0, mensagem=None,
+        )
+        .returning(T.id, T.user_id, T.tipo, T.parametros)
+    ).first()
+    db.commit()
+    return tuple(linha) if linha else None
+
+
+def _finalizar(tarefa_id: int, worker: str, **valores):
+    T = models.Tarefa
+    with SessionLocal() as db:
+        db.execute(
+            update(T).where(T.id == tarefa_id, T.worker == worker, T.estado == "executando").values(**valores)
+        )
+        db.commit()
+
+
+def _heartbeat(tarefa_id: int, worker: str, fim: threading.Event):
+    T = models.Tarefa
+    while not fim.wait(TAREFAS_TIMEOUT / 4):
+        try:
+            with SessionLocal() as db:
+                db.execute(update(T).where(T.id == tarefa_id, T.worker == worker).values(heartbeat=datetime.utcnow()))
+                db.commit()
+        except Exception:
+            # A thread continua: parar de renovar devolveria a tarefa à fila
+            logger.warning("Falha ao renovar heartbeat da tarefa %s", tarefa_id, exc_info=True)
+
+
+def executar(tarefa: tuple, worker: str, parar: threading.Event):
+    """Executa uma tarefa reservada e grava o estado final"""
+    tarefa_id, user_id, tipo, parametros = tarefa
+    definicao = TIPOS[tipo]
+    execucao = Execucao(tarefa_id, user_id, definicao.parametros.model_validate(parametros), worker, parar)
+    fim = threading.Event()
+    threading.Thread(target=_heartbeat, args=(tarefa_id, worker, fim), daemon=True).start()
+    inicio = time.monotonic()
+    try:
+        dados = definicao.executar(execucao)
+        if execucao.arquivo:
+            os.replace(_caminho(tarefa_id, execucao.arquivo) + ".parcial", _caminho(tarefa_id, execucao.arquivo))
+        _finalizar(
+            tarefa_id, worker, estado="concluida", progresso=1.0, mensagem=None, resultado=dados,
+            arquivo=execucao.arquivo, erro=None, concluida_em=datetime.utcnow(),
+        )
+        logger.info("Tarefa %s (%s) concluída em %.1fs", tarefa_id, tipo, time.monotonic() - inicio)
+    except Cancelada:
+        _descartar(execucao)
+        _finalizar(tarefa_id, worker, estado="cancelada", concluida_em=datetime.utcnow())
+    except Interrompida:
+        # Não conta como tentativa: volta para a fila para outro worker
+        _descartar(execucao)
+        T = models.Tarefa
+        _finalizar(
+            tarefa_id, worker, estado="pendente", worker=None, tentativas=T.tentativas - 1,
+            progresso=0.0, mensagem=None, disponivel_em=datetime.utcnow(),
+        )
+    except Exception as e:
+        logger.exception("Tarefa %s (%s) falhou", tarefa_id, tipo)
+        _descartar(execucao)
+        _falhar(tarefa_id, worker, str(e) or type(e).__name__)
+    finally:
+        fim.set()
+        if tipo in COM_ARQUIVO:
+            with SessionLocal() as db:
+                atual = db.get(models.Tarefa, tarefa_id)
+                if atual is not None and atual.estado in FINALIZADAS:
+                    _limpar_entrada(atual)
+
+
+def _descartar(execucao: Execucao):
+    if execucao.arquivo:
+        _remover(_caminho(execucao.id, execucao.arquivo) + ".parcial")
+
+
+def _falhar(tarefa_id: int, worker: str, erro: str):
+    """Nova tentativa com espera exponencial ou falha definitiva"""
+    T = models.Tarefa
+    with SessionLocal() as db:
+        tarefa = db.get(models.Tarefa, tarefa_id)
+        if tarefa is None or tarefa.worker != worker or tarefa.estado != "executando":
+            return
+        agora = datetime.utcnow()
+        if tarefa.tentativas < tarefa.max_tentativas and not tarefa.cancelar:
+            espera = TAREFAS_RETRY_DELAY * 2 ** (tarefa.tentativas - 1)
+            valores = {
+                "estado": "pendente", "worker": None, "progresso": 0.0, "mensagem": None,
+                "disponivel_em": agora + timedelta(seconds=espera),
+            }
+        else:
+            # Progresso e mensagem ficam como estavam (ex.: quantos lotes a importação gravou)
+            valores = {"estado": "cancelada" if tarefa.cancelar else "falhou", "concluida_em": agora}
+        db.execute(update(T).where(T.id == tarefa_id, T.worker == worker).values(erro=erro[:2000], **valores))
+        db.commit()
+
+
+def recuperar(db: Session) -> int:
+    """Tarefas em execução sem heartbeat (worker morto): de volta à fila, falha ou cancelamento"""
+    T = models.Tarefa
+    agora = datetime.utcnow()
+    esgotada = T.tentativas >= T.max_tentativas
+    resultado = db.execute(
+        update(T)
+        .where(T.estado == "executando", T.heartbeat < agora - timedelta(seconds=TAREFAS_TIMEOUT))
+        .values(
+            estado=case((T.cancelar, "cancelada"), (esgotada, "falhou"), else_="pendente"),
+            concluida_em=case((T.cancelar | esgotada, agora), else_=None),
+            worker=None,
+            disponivel_em=agora,
+            erro="Worker parou de responder",
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return resultado.rowcount
+
+
+def limpar(db: Session) -> int:
+    """Apaga tarefas finalizadas há mais de TAREFAS_RETENCAO horas, com seus arquivos"""
+    T = models.Tarefa
+    limite = datetime.utcnow() - timedelta(hours=TAREFAS_RETENCAO)
+    antigas = db.query(T).filter(T.estado.in_(FINALIZADAS), T.concluida_em < limite).all()
+    for tarefa in antigas:
+        if tarefa.arquivo:
+            _remover(_caminho(tarefa.id, tarefa.arquivo))
+        _limpar_entrada(tarefa)
+    if antigas:
+        db.execute(delete(T).where(T.id.in_([t.id for t in antigas])))
+        db.commit()
+    return len(antigas)
+
+
+def trabalhar(parar: threading.Event, nome: Optional[str] = None):
+    """Laço do worker: reserva e executa tarefas até `parar`"""
+    worker = nome or f"{socket.gethostname()}:{os.getpid()}"
+    manutencao = 0.0
+    falhas = 0
+    logger.info("Worker de tarefas %s iniciado", worker)
+    while not parar.is_set():
+        try:
+            with SessionLocal() as db:
+                if time.monotonic() - manutencao > TAREFAS_TIMEOUT / 2:
+                    manutencao = time.monotonic()
+                    recuperar(db)
+                    limpar(db)
+                tarefa = reservar(db, worker)
+            if tarefa is not None:
+                executar(tarefa, worker, parar)
+        except Exception:
+            # Banco indisponível, pool esgotado, erro ao gravar o estado final...:
+            # o worker não pode morrer. Espera cada vez mais e tenta de novo; uma
+            # tarefa que ficou em "executando" volta para a fila por recuperar()
+            falhas += 1
+            espera = min(TAREFAS_INTERVALO * 2 ** falhas, TAREFAS_ESPERA_MAXIMA)
+            logger.exception("Falha no worker de tarefas %s (nova tentativa em %.1fs)", worker, espera)
+            parar.wait(espera)
+            continue
+        falhas = 0
+        if tarefa is None:
+            parar.wait(TAREFAS_INTERVALO)
+    logger.info("Worker de tarefas %s encerrado", worker)
+
+
+class WorkerThread:
+    """Worker numa thread do processo da API (TAREFAS_NA_API)"""
+
+    def __init__(self):
+        self.parar = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        nome = f"{socket.gethostname()}:{os.getpid()}:api"
+        self.thread = threading.Thread(target=trabalhar, args=(self.parar, nome), name="tarefas", daemon=True)
+        self.thread.start()
+
+    def encerrar(self):
+        self.parar.set()
+        if self.thread is not None:
+            self.thread.join(TAREFAS_TIMEOUT)
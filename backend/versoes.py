@@ -0,0 +1,286 @@
+"""
+Versão por usuário: ETag nas listagens e sincronização incremental
+
+Cada transação do banco que altera dados de um usuário incrementa o contador
+em `versoes` (uma vez por transação) e grava o novo número na coluna `versao`
+das linhas inseridas/alteradas. Exclusões deixam um registro em `exclusoes`.
+
+- As listagens respondem com ETag (usuário + versão + URL) e 304 para
+  If-None-Match igual, sem executar a consulta.
+- GET /api/sync?since=<versao> devolve só o que mudou depois da versão.
+  Na carga completa, `janela` limita as transações às mais recentes.
+
+Durante a transação as linhas recebem uma versão provisória (negativa, só
+visível para a própria transação). O incremento acontece no commit, depois
+de todas as escritas (inclusive o UPDATE do estoque), e troca a provisória
+pela definitiva nas tabelas gravadas. A linha em `versoes` fica bloqueada só
+desse ponto até o commit: vendas simultâneas do mesmo usuário não esperam
+umas pelas outras durante a transação inteira, e as versões continuam
+confirmadas em ordem (o cliente não perde alterações).
+"""
+import hashlib
+import secrets
+from typing import Dict, Iterator, Optional
+
+import orjson
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import Table, event, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import auth
+import models
+import schemas
+import serializacao
+from database import SessionLocal, get_async_db, get_db
+from pagination import encode_cursor
+
+RECURSOS = {
+    "categorias": models.Categoria,
+    "produtos": models.Produto,
+    "clientes": models.Cliente,
+    "transacoes": models.Transacao,
+}
+
+# Schema de cada recurso na resposta de /api/sync
+SCHEMAS = {
+    "categorias": schemas.Categoria,
+    "produtos": schemas.Produto,
+    "clientes": schemas.Cliente,
+    "transacoes": schemas.Transacao,
+}
+
+_RECURSO_POR_MODELO = {model: recurso for recurso, model in RECURSOS.items()}
+
+# As listagens são revalidadas a cada uso (If-None-Match -> 304)
+CACHE_CONTROL = "private, no-cache"
+
+
+def versionado(model) -> bool:
+    return model in _RECURSO_POR_MODELO
+
+
+def recurso(model) -> str:
+    """Nome do recurso (categorias, produtos, ...) de um model versionado"""
+    return _RECURSO_POR_MODELO[model]
+
+
+def _incrementar(connection: Connection, user_id: int) -> int:
+    tabela = models.VersaoUsuario.__table__
+    dialect = connection.dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        ins = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(tabela)
+        stmt = ins.values(user_id=user_id, versao=1).on_conflict_do_update(
+            index_elements=[tabela.c.user_id],
+            set_={"versao": tabela.c.versao + 1},
+        ).returning(tabela.c.versao)
+        return connection.execute(stmt).scalar_one()
+
+    # Outros bancos: UPDATE incremental e INSERT se o usuário ainda não tem contador
+    result = connection.execute(
+        update(tabela).where(tabela.c.user_id == user_id).values(versao=tabela.c.versao + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(tabela).values(user_id=user_id, versao=1))
+    return connection.execute(select(tabela.c.versao).where(tabela.c.user_id == user_id)).scalar_one()
+
+
+def versao(connection: Connection, user_id: int, *tabelas: Table) -> int:
+    """
+    Versão provisória da transação atual do banco para o usuário
+
+    O mesmo número negativo em toda a transação; `tabelas` são as tabelas em
+    que ele é gravado, trocado pela versão definitiva no commit (_confirmar).
+    """
+    transacao = connection.get_transaction()
+    cache = connection.info.get("versoes")
+    if cache is None or cache[0] is not transacao:
+        cache = (transacao, {})
+        connection.info["versoes"] = cache
+
+    pendentes: Dict[int, tuple] = cache[1]
+    if user_id not in pendentes:
+        pendentes[user_id] = (-1 - secrets.randbits(62), set())
+    provisoria, gravadas = pendentes[user_id]
+    gravadas.update(tabelas)
+    return provisoria
+
+
+def versao_sessao(db: Session, user_id: int, *tabelas: Table) -> int:
+    return versao(db.connection(), user_id, *tabelas)
+
+
+def _confirmar(db: Session):
+    """Incrementa a versão de cada usuário alterado e a grava no lugar da provisória"""
+    db.info.pop("versoes_confirmadas", None)
+    if not db.in_transaction():
+        return
+    # O commit só faria o flush final depois deste evento: as versões das
+    # linhas ainda pendentes precisam entrar antes
+    db.flush()
+    connection = db.connection()
+    cache = connection.info.pop("versoes", None)
+    if cache is None or cache[0] is not connection.get_transaction():
+        return
+
+    confirmadas = {}
+    # Usuários sempre na mesma ordem: dois commits não esperam um pelo outro em ciclo
+    for user_id, (provisoria, tabelas) in sorted(cache[1].items()):
+        definitiva = _incrementar(connection, user_id)
+        for tabela in sorted(tabelas, key=lambda t: t.name):
+            connection.execute(
+                update(tabela)
+                .where(tabela.c.user_id == user_id, tabela.c.versao == provisoria)
+                .values(versao=definitiva)
+            )
+        confirmadas[user_id] = definitiva
+    db.info["versoes_confirmadas"] = confirmadas
+
+
+def confirmadas(db: Session) -> Dict[int, int]:
+    """Versão definitiva de cada usuário alterado no último commit da sessão"""
+    return db.info.get("versoes_confirmadas", {})
+
+
+event.listen(Session, "before_commit", _confirmar)
+event.listen(Session, "after_rollback", lambda db: db.info.pop("versoes_confirmadas", None))
+
+# ==================== ALTERAÇÕES VIA ORM ====================
+
+def _antes_de_gravar(mapper, connection, target):
+    if target.user_id is not None:
+        target.versao = versao(connection, target.user_id, mapper.local_table)
+
+
+def _apos_excluir(mapper, connection, target):
+    if target.user_id is None:
+        return
+    connection.execute(insert(models.Exclusao).values(
+        user_id=target.user_id,
+        recurso=_RECURSO_POR_MODELO[mapper.class_],
+        registro_id=target.id,
+        versao=versao(connection, target.user_id, models.Exclusao.__table__),
+    ))
+
+
+for _model in RECURSOS.values():
+    event.listen(_model, "before_insert", _antes_de_gravar)
+    event.listen(_model, "before_update", _antes_de_gravar)
+    event.listen(_model, "after_delete", _apos_excluir)
+
+# ==================== ETAG ====================
+
+def _consulta_versao(user_id: int):
+    return select(models.VersaoUsuario.versao).where(models.VersaoUsuario.user_id == user_id)
+
+
+def etag(request: Request, user_id: int, versao_atual: int) -> str:
+    """ETag fraco: muda com a versão do usuário e com a URL (filtros, cursor, limit)"""
+    url = f"{request.url.path}?{request.url.query}"
+    chave = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return f'W/"{user_id}.{versao_atual}.{chave}"'
+
+
+def _responder(request: Request, response: Response, versao_atual: int, tag: str):
+    # Versão lida antes da consulta: usada pelo cache do catálogo (catalogo.py)
+    request.state.versao = versao_atual
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    recebidas = request.headers.get("if-none-match", "")
+    if recebidas.strip() == "*" or tag in [t.strip() for t in recebidas.split(",")]:
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+def condicional(
+    request: Request,
+    response: Response,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Dependência das listagens: 304 se o cliente já tem esta versão"""
+    versao_atual = db.execute(_consulta_versao(current_user.id)).scalar() or 0
+    _responder(request, response, versao_atual, etag(request, current_user.id, versao_atual))
+
+
+async def condicional_async(
+    request: Request,
+    response: Response,
+    current_user: auth.CurrentUser = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Mesma dependência para os endpoints com AsyncSession"""
+    versao_atual = (await db.execute(_consulta_versao(current_user.id))).scalar() or 0
+    _responder(request, response, versao_atual, etag(request, current_user.id, versao_atual))
+
+# ==================== SINCRONIZAÇÃO ====================
+
+def _cursor_janela(db: Session, user_id: int, janela: int) -> Optional[str]:
+    """Cursor de GET /api/transacoes para depois das `janela` mais recentes (None se não houver mais)"""
+    T = models.Transacao
+    limites = db.execute(
+        select(T.created_at, T.id)
+        .where(T.user_id == user_id)
+        .order_by(T.created_at.desc(), T.id.desc())
+        .offset(janela - 1)
+        .limit(2)
+    ).all()
+    if len(limites) < 2:
+        return None
+    return encode_cursor(limites[0].created_at, limites[0].id)
+
+
+def sincronizar(user_id: int, since: int, janela: Optional[int] = None) -> Iterator[bytes]:
+    """
+    JSON de /api/sync (schemas.SyncResult) gerado em partes: linhas
+    criadas/alteradas e ids excluídos depois da versão `since`.
+
+    since=0 (ou maior que a versão atual, ex.: banco recriado) devolve tudo,
+    com completo=True: o cliente deve descartar o que tinha. No modo
+    incremental, aplicar primeiro as exclusões e depois as linhas.
+
+    Com `janela`, a carga completa traz só as `janela` transações mais
+    recentes (o catálogo vem inteiro) e `cursor_transacoes` continua o
+    histórico em GET /api/transacoes?cursor=. O modo incremental ignora a
+    janela: alterações antigas também precisam chegar ao cliente.
+
+    As linhas são lidas em lotes (memória constante mesmo na sincronização
+    completa), com sessão própria: a do request já foi fechada quando o
+    streaming começa.
+    """
+    db = SessionLocal()
+    try:
+        # Ler a versão antes das linhas: o que mudar no meio volta na próxima chamada
+        versao_atual = db.execute(_consulta_versao(user_id)).scalar() or 0
+        completo = since <= 0 or since > versao_atual
+        janela = janela if completo else None
+        # Objeto aberto: {"versao":...,"completo":...
+        yield orjson.dumps({"versao": versao_atual, "completo": completo})[:-1]
+
+        for recurso, model in RECURSOS.items():
+            schema = SCHEMAS[recurso]
+            # Só as colunas do schema (sem objetos ORM)
+            stmt = select(*serializacao.colunas(model, schema)).where(model.user_id == user_id)
+            if not completo:
+                stmt = stmt.where(model.versao > since)
+            # Mesma ordem das listagens (mais recentes primeiro)
+            stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+            if recurso == "transacoes" and janela:
+                yield b',"cursor_transacoes":' + orjson.dumps(_cursor_janela(db, user_id, janela))
+                stmt = stmt.limit(janela)
+            yield f',"{recurso}":'.encode("ascii")
+            yield from serializacao.fluxo_json(db, stmt, schema)
+
+        excluidos = {recurso: [] for recurso in RECURSOS}
+        if not completo:
+            stmt = select(models.Exclusao.recurso, models.Exclusao.registro_id).where(
+                models.Exclusao.user_id == user_id,
+                models.Exclusao.versao > since,
+            ).order_by(models.Exclusao.versao)
+            for recurso, registro_id in db.execute(stmt):
+                excluidos[recurso].append(registro_id)
+        yield b',"excluidos":' + orjson.dumps(excluidos) + b"}"
+    finally:
+        db.close()
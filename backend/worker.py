@@ -0,0 +1,70 @@
+"""
+Worker das tarefas em segundo plano (tarefas.py)
+
+    python worker.py                # um processo
+    python worker.py --processos 4  # quatro processos
+
+Em produção, rode ao lado da API (com TAREFAS_NA_API=false), depois de
+migrate.py e com a mesma TAREFAS_DIR, sob um supervisor que o reinicie se
+ele terminar: servidor.py, ou um serviço/contêiner próprio com política de
+reinício. Com --processos, os processos filhos que caem são substituídos.
+SIGTERM ou Ctrl+C encerram: a tarefa em andamento volta para a fila no
+próximo registro de progresso.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+
+import database
+import tarefas
+
+
+def processo():
+    # Conexões herdadas do processo pai (fork) não podem ser compartilhadas
+    database.engine.dispose(close=False)
+    parar = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    signal.signal(signal.SIGINT, lambda *_: parar.set())
+    tarefas.trabalhar(parar)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa as tarefas em segundo plano da fila (tabela tarefas)")
+    parser.add_argument(
+        "--processos", type=int, default=int(os.environ.get("TAREFAS_PROCESSOS", "1")),
+        help="Processos worker (padrão: TAREFAS_PROCESSOS ou 1)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+
+    if args.processos <= 1:
+        processo()
+    else:
+        def iniciar(i: int) -> multiprocessing.Process:
+            filho = multiprocessing.Process(target=processo, name=f"worker-{i}")
+            filho.start()
+            return filho
+
+        filhos = {i: iniciar(i) for i in range(1, args.processos + 1)}
+        parar = threading.Event()
+
+        def encerrar(*_):
+            parar.set()
+            for filho in filhos.values():
+                filho.terminate()
+
+        signal.signal(signal.SIGTERM, encerrar)
+        signal.signal(signal.SIGINT, encerrar)
+        # Um processo que caiu é substituído; as tarefas dele voltam para a fila
+        # pelo timeout do heartbeat
+        while not parar.wait(5):
+            for i, filho in list(filhos.items()):
+                if not filho.is_alive() and not parar.is_set():
+                    logging.error("worker-%s terminou com código %s; reiniciando", i, filho.exitcode)
+                    filhos[i] = iniciar(i)
+        for filho in filhos.values():
+            filho.terminate()
+            filho.join()
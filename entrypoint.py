@@ -1,6 +1,17 @@
 #!/usr/bin/env python3
+"""
+Início do backend em produção: executa backend/servidor.py, que migra o
+banco uma vez e supervisiona o gunicorn (um worker uvicorn por núcleo, ver
+backend/gunicorn.conf.py) e o worker.py das tarefas, reiniciando o
+worker.py se ele cair.
+
+SKIP_MIGRATE=true pula a migração (quando ela roda num passo de release separado).
+TAREFAS_PROCESSOS=0 não sobe o worker.py (quando ele roda num serviço separado).
+"""
 import os
 import sys
 
-port = os.environ.get('PORT', '8000')
-os.execvp('uvicorn', ['uvicorn', 'backend.main:app', '--host', '0.0.0.0', '--port', port])
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+
+os.chdir(BACKEND_DIR)
+os.execv(sys.executable, [sys.executable, "servidor.py"])
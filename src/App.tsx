@@ -9,7 +9,7 @@ import { ClientePanel } from './components/ClientePanel';
 import { ProdutoPanel } from './components/ProdutoPanel';
 import { useAPI } from './hooks/useAPI';
 import { Produto, Cliente, Transacao, Categoria, AnexoPDF } from './types';
-import { produtosAPI, clientesAPI, transacoesAPI, categoriasAPI } from './services/api';
+import { produtosAPI, clientesAPI, transacoesAPI, categoriasAPI, vendasAPI } from './services/api';
 import { ChatBot as ChatBotService } from './services/chatBot';
 import { CategoriaForm } from './components/CategoriaForm';
 import { VendaForm } from './components/VendaForm';
@@ -20,6 +20,8 @@ import { GerenciarUsuarios } from './components/GerenciarUsuarios';
 import { hasPermission } from './utils/permissions';
 import { Plus, Edit, Trash2, TrendingUp, TrendingDown, DollarSign, Package, Users, Eye, Undo2, BarChart3, ShoppingCart, ChevronDown, ChevronRight, FileText, Search } from 'lucide-react';
 
+const chatBot = new ChatBotService();
+
 function App() {
   console.log('App component loading...');
   
@@ -44,6 +46,7 @@ function App() {
     localStorage.removeItem('nexus_user');
     localStorage.removeItem('nexus_token');
     localStorage.removeItem('nexus_role');
+    localStorage.removeItem('nexus_sync');
     setIsAuthenticated(false);
   };
 
@@ -57,6 +60,8 @@ function App() {
     setTransacoes,
     categorias,
     setCategorias,
+    temMaisTransacoes,
+    carregarMaisTransacoes,
     loading,
     error,
     reloadData
@@ -79,8 +84,6 @@ function App() {
   const [buscaCategoria, setBuscaCategoria] = useState('');
   const [buscaVenda, setBuscaVenda] = useState('');
 
-  const chatBot = new ChatBotService(produtos, clientes, transacoes);
-
   const handleAddProduto = async (produtoData: Omit<Produto, 'id' | 'createdAt'>) => {
     try {
       if (editingProduto) {
@@ -256,26 +259,17 @@ function App() {
     anexos?: AnexoPDF[];
   }) => {
     try {
-      const novasTransacoes: Transacao[] = [];
+      // Registrar todos os itens da venda em uma única requisição
+      const novasTransacoes = await vendasAPI.create({
+        clienteId: vendaData.clienteId,
+        numeroPedido: vendaData.numeroPedido,
+        observacoes: vendaData.observacoes,
+        itens: vendaData.itens,
+      });
+
+      // Atualizar estoque localmente
       const novosProdutos = [...produtos];
-
-      // Criar uma transação para cada item da venda via API
       for (const item of vendaData.itens) {
-        const transacaoData = {
-          tipo: 'saida' as const,
-          produtoId: item.produtoId,
-          clienteId: vendaData.clienteId,
-          numeroPedido: vendaData.numeroPedido,
-          quantidade: item.quantidade,
-          valorUnitario: item.valorUnitario,
-          valorTotal: item.valorTotal,
-          observacoes: vendaData.observacoes,
-        };
-        
-        const novaTransacao = await transacoesAPI.create(transacaoData);
-        novasTransacoes.push(novaTransacao);
-
-        // Atualizar estoque localmente
         const produtoIndex = novosProdutos.findIndex(p => p.id === item.produtoId);
         if (produtoIndex !== -1) {
           novosProdutos[produtoIndex].quantidade -= item.quantidade;
@@ -314,7 +308,7 @@ function App() {
     setVendasExpandidas(novasVendasExpandidas);
   };
 
-  const handleChatMessage = (message: string): string => {
+  const handleChatMessage = (message: string): Promise<string> => {
     return chatBot.processMessage(message);
   };
 
@@ -1312,6 +1306,16 @@ renderProdutos = () => {
               })}
           </tbody>
         </table>
+        {temMaisTransacoes && (
+          <div className="text-center py-4">
+            <button
+              onClick={() => carregarMaisTransacoes().catch((err: any) => alert(`Erro ao carregar transações: ${err.response?.data?.detail || err.message}`))}
+              className="text-primary-600 hover:text-primary-800 text-sm font-medium"
+            >
+              Carregar transações anteriores
+            </button>
+          </div>
+        )}
         {transacoes.length === 0 && (
           <div className="text-center py-12">
             <Package className="mx-auto h-12 w-12 text-gray-400" />
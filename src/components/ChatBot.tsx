@@ -3,7 +3,7 @@ import { Send, Bot, User } from 'lucide-react';
 import { ChatMessage } from '../types';
 
 interface ChatBotProps {
-  onSendMessage: (message: string) => string;
+  onSendMessage: (message: string) => Promise<string>;
 }
 
 export const ChatBot: React.FC<ChatBotProps> = ({ onSendMessage }) => {
@@ -26,7 +26,7 @@ export const ChatBot: React.FC<ChatBotProps> = ({ onSendMessage }) => {
     scrollToBottom();
   }, [messages]);
 
-  const handleSendMessage = (e: React.FormEvent) => {
+  const handleSendMessage = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!inputMessage.trim()) return;
 
@@ -38,20 +38,23 @@ export const ChatBot: React.FC<ChatBotProps> = ({ onSendMessage }) => {
     };
 
     setMessages(prev => [...prev, userMessage]);
+    setInputMessage('');
 
-    // Simular delay do bot
-    setTimeout(() => {
-      const botResponse = onSendMessage(inputMessage);
-      const botMessage: ChatMessage = {
-        id: (Date.now() + 1).toString(),
-        message: botResponse,
-        isBot: true,
-        timestamp: new Date()
-      };
-      setMessages(prev => [...prev, botMessage]);
-    }, 500);
+    let botResponse: string;
+    try {
+      botResponse = await onSendMessage(userMessage.message);
+    } catch (err) {
+      console.error('Erro no chat:', err);
+      botResponse = '⚠️ Não consegui responder agora. Tente novamente em instantes.';
+    }
 
-    setInputMessage('');
+    const botMessage: ChatMessage = {
+      id: (Date.now() + 1).toString(),
+      message: botResponse,
+      isBot: true,
+      timestamp: new Date()
+    };
+    setMessages(prev => [...prev, botMessage]);
   };
 
   return (
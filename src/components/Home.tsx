@@ -18,7 +18,7 @@ interface HomeProps {
   clientes: Cliente[];
   transacoes: Transacao[];
   categorias: Categoria[];
-  onChatMessage: (message: string) => string;
+  onChatMessage: (message: string) => Promise<string>;
   onNavigate: (tab: string) => void;
 }
 
@@ -1,31 +1,122 @@
-import { useState, useEffect } from 'react';
-import { produtosAPI, clientesAPI, transacoesAPI, categoriasAPI } from '../services/api';
+import { useState, useEffect, useRef } from 'react';
+import { syncAPI, eventosAPI, transacoesAPI, EventoAlteracoes, SyncResult, PAGE_SIZE } from '../services/api';
 import { Produto, Cliente, Transacao, Categoria } from '../types';
 
+// Dados sincronizados guardados no navegador: ao recarregar a página, só o que
+// mudou desde `versao` é baixado
+const CHAVE_LOCAL = 'nexus_sync';
+// Acima disso as transações não são guardadas; a próxima carga volta a ser a janela
+const LIMITE_LOCAL = 5000;
+
+interface DadosLocais {
+  token: string;
+  versao: number;
+  cursorTransacoes: string | null;
+  produtos: Produto[];
+  clientes: Cliente[];
+  transacoes: Transacao[];
+  categorias: Categoria[];
+}
+
+// createdAt volta do JSON como string
+const comDatas = <T extends { createdAt: Date }>(itens: T[]): T[] =>
+  itens.map((item) => ({ ...item, createdAt: new Date(item.createdAt) }));
+
+const lerLocal = (token: string | null): DadosLocais | null => {
+  try {
+    const dados: DadosLocais | null = JSON.parse(localStorage.getItem(CHAVE_LOCAL) || 'null');
+    return dados && dados.token === token ? dados : null;
+  } catch {
+    return null;
+  }
+};
+
+const gravarLocal = (dados: DadosLocais) => {
+  try {
+    if (dados.transacoes.length > LIMITE_LOCAL) {
+      localStorage.removeItem(CHAVE_LOCAL);
+    } else {
+      localStorage.setItem(CHAVE_LOCAL, JSON.stringify(dados));
+    }
+  } catch {
+    // Cota do localStorage esgotada: a próxima carga começa do zero
+    localStorage.removeItem(CHAVE_LOCAL);
+  }
+};
+
+// Remove os excluídos, substitui os alterados no lugar e põe os novos no início
+const mergeById = <T extends { id: string | number }>(atual: T[], alterados: T[], excluidos: number[]): T[] => {
+  const removidos = new Set(excluidos.map(String));
+  const novos = new Map(alterados.map((item) => [String(item.id), item] as [string, T]));
+
+  const mantidos = atual
+    .filter((item) => !removidos.has(String(item.id)))
+    .map((item) => {
+      const alterado = novos.get(String(item.id));
+      if (!alterado) return item;
+      novos.delete(String(item.id));
+      return alterado;
+    });
+
+  return [...novos.values(), ...mantidos];
+};
+
 export function useAPI() {
   const [produtos, setProdutos] = useState<Produto[]>([]);
   const [clientes, setClientes] = useState<Cliente[]>([]);
   const [transacoes, setTransacoes] = useState<Transacao[]>([]);
   const [categorias, setCategorias] = useState<Categoria[]>([]);
+  // Próxima página do histórico de transações (null: tudo carregado)
+  const [cursorTransacoes, setCursorTransacoes] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Última versão sincronizada, por token (outro login começa do zero)
+  const syncRef = useRef<{ token: string | null; versao: number }>({ token: null, versao: 0 });
+
+  const aplicar = (sync: SyncResult, token: string | null) => {
+    if (sync.completo) {
+      setProdutos(sync.produtos);
+      setClientes(sync.clientes);
+      setTransacoes(sync.transacoes);
+      setCategorias(sync.categorias);
+      setCursorTransacoes(sync.cursorTransacoes ?? null);
+    } else {
+      setProdutos((atual) => mergeById(atual, sync.produtos, sync.excluidos.produtos));
+      setClientes((atual) => mergeById(atual, sync.clientes, sync.excluidos.clientes));
+      setTransacoes((atual) => mergeById(atual, sync.transacoes, sync.excluidos.transacoes));
+      setCategorias((atual) => mergeById(atual, sync.categorias, sync.excluidos.categorias));
+    }
+    syncRef.current = { token, versao: sync.versao };
+  };
+
+  // Só o que mudou desde a última carga (na primeira, o catálogo e a janela
+  // de transações mais recentes)
+  const sincronizar = async () => {
+    const token = localStorage.getItem('nexus_token');
+    const since = syncRef.current.token === token ? syncRef.current.versao : 0;
+    aplicar(await syncAPI.changes(since, PAGE_SIZE), token);
+  };
+
+  // Dados guardados na última sessão com este token
+  const restaurar = (token: string | null): boolean => {
+    const dados = lerLocal(token);
+    if (!dados) return false;
+    setProdutos(comDatas(dados.produtos));
+    setClientes(comDatas(dados.clientes));
+    setTransacoes(comDatas(dados.transacoes));
+    setCategorias(comDatas(dados.categorias));
+    setCursorTransacoes(dados.cursorTransacoes);
+    syncRef.current = { token, versao: dados.versao };
+    return true;
+  };
 
   const loadData = async () => {
     try {
-      setLoading(true);
+      const token = localStorage.getItem('nexus_token');
+      const restaurado = syncRef.current.token !== token && restaurar(token);
+      setLoading(!restaurado);
       setError(null);
-      
-      const [produtosData, clientesData, transacoesData, categoriasData] = await Promise.all([
-        produtosAPI.getAll(),
-        clientesAPI.getAll(),
-        transacoesAPI.getAll(),
-        categoriasAPI.getAll(),
-      ]);
-
-      setProdutos(produtosData);
-      setClientes(clientesData);
-      setTransacoes(transacoesData);
-      setCategorias(categoriasData);
+      await sincronizar();
     } catch (err: any) {
       console.error('Erro ao carregar dados:', err);
       setError(err.message || 'Erro ao carregar dados');
@@ -34,6 +125,30 @@ export function useAPI() {
     }
   };
 
+  // Próxima página do histórico, sob demanda
+  const carregarMaisTransacoes = async () => {
+    if (!cursorTransacoes) return;
+    const pagina = await transacoesAPI.getPage(cursorTransacoes);
+    setTransacoes((atual) => {
+      // A página pode repetir linhas já recebidas por sincronização
+      const ids = new Set(atual.map((t) => t.id));
+      return [...atual, ...pagina.itens.filter((t) => !ids.has(t.id))];
+    });
+    setCursorTransacoes(pagina.cursor);
+  };
+
+  // Alterações feitas em outros terminais, enviadas pelo servidor
+  const aplicarEvento = (evento: EventoAlteracoes) => {
+    const token = localStorage.getItem('nexus_token');
+    const { versao } = syncRef.current;
+    if (syncRef.current.token !== token || evento.sincronizar || evento.versao > versao + 1) {
+      // Evento sem as linhas ou perdido no caminho
+      sincronizar().catch((err) => console.error('Erro ao sincronizar:', err));
+    } else if (evento.versao === versao + 1) {
+      aplicar(evento, token);
+    }
+  };
+
   useEffect(() => {
     const token = localStorage.getItem('nexus_token');
     if (token) {
@@ -43,6 +158,19 @@ export function useAPI() {
     }
   }, []);
 
+  useEffect(() => {
+    const { token, versao } = syncRef.current;
+    if (!token || token !== localStorage.getItem('nexus_token')) return;
+    gravarLocal({ token, versao, cursorTransacoes, produtos, clientes, transacoes, categorias });
+  }, [produtos, clientes, transacoes, categorias, cursorTransacoes]);
+
+  useEffect(() => {
+    if (!localStorage.getItem('nexus_token')) return;
+    return eventosAPI.assinar(aplicarEvento, () => {
+      sincronizar().catch((err) => console.error('Erro ao sincronizar:', err));
+    });
+  }, []);
+
   return {
     produtos,
     setProdutos,
@@ -52,6 +180,8 @@ export function useAPI() {
     setTransacoes,
     categorias,
     setCategorias,
+    temMaisTransacoes: cursorTransacoes !== null,
+    carregarMaisTransacoes,
     loading,
     error,
     reloadData: loadData,
@@ -1,6 +1,25 @@
 import apiClient from './apiClient';
 import { Produto, Cliente, Transacao, Categoria } from '../types';
 
+// ==================== PAGINAÇÃO ====================
+
+export const PAGE_SIZE = 500;
+
+// Uma página e o cursor da seguinte (null na última)
+export interface Pagina<T> {
+  itens: T[];
+  cursor: string | null;
+}
+
+// Uma página de um endpoint paginado por cursor (header X-Next-Cursor).
+// As demais são buscadas sob demanda: recarregar não baixa o histórico inteiro
+const fetchPage = async (path: string, cursor?: string | null, params: Record<string, any> = {}): Promise<Pagina<any>> => {
+  const response = await apiClient.get(path, {
+    params: { ...params, limit: PAGE_SIZE, cursor: cursor || undefined },
+  });
+  return { itens: response.data, cursor: response.headers['x-next-cursor'] ?? null };
+};
+
 // ==================== AUTH ====================
 
 export interface LoginResponse {
@@ -57,14 +76,16 @@ export const authAPI = {
 
 // ==================== CATEGORIAS ====================
 
+const mapCategoria = (cat: any): Categoria => ({
+  ...cat,
+  createdAt: new Date(cat.created_at),
+  categoriaId: cat.id.toString(),
+});
+
 export const categoriasAPI = {
   getAll: async (): Promise<Categoria[]> => {
     const response = await apiClient.get('/categorias');
-    return response.data.map((cat: any) => ({
-      ...cat,
-      createdAt: new Date(cat.created_at),
-      categoriaId: cat.id.toString(),
-    }));
+    return response.data.map(mapCategoria);
   },
 
   create: async (categoria: Omit<Categoria, 'id' | 'createdAt'>): Promise<Categoria> => {
@@ -100,15 +121,18 @@ export const categoriasAPI = {
 
 // ==================== PRODUTOS ====================
 
+const mapProduto = (prod: any): Produto => ({
+  ...prod,
+  id: prod.id.toString(),
+  categoriaId: prod.categoria_id?.toString(),
+  createdAt: new Date(prod.created_at),
+});
+
 export const produtosAPI = {
-  getAll: async (): Promise<Produto[]> => {
-    const response = await apiClient.get('/produtos');
-    return response.data.map((prod: any) => ({
-      ...prod,
-      id: prod.id.toString(),
-      categoriaId: prod.categoria_id?.toString(),
-      createdAt: new Date(prod.created_at),
-    }));
+  // Página a partir do cursor (sem cursor: a primeira, mais recentes)
+  getPage: async (cursor?: string | null): Promise<Pagina<Produto>> => {
+    const pagina = await fetchPage('/produtos', cursor);
+    return { itens: pagina.itens.map(mapProduto), cursor: pagina.cursor };
   },
 
   create: async (produto: Omit<Produto, 'id' | 'createdAt'>): Promise<Produto> => {
@@ -150,14 +174,17 @@ export const produtosAPI = {
 
 // ==================== CLIENTES ====================
 
+const mapCliente = (cli: any): Cliente => ({
+  ...cli,
+  id: cli.id.toString(),
+  createdAt: new Date(cli.created_at),
+});
+
 export const clientesAPI = {
-  getAll: async (): Promise<Cliente[]> => {
-    const response = await apiClient.get('/clientes');
-    return response.data.map((cli: any) => ({
-      ...cli,
-      id: cli.id.toString(),
-      createdAt: new Date(cli.created_at),
-    }));
+  // Página a partir do cursor (sem cursor: a primeira, mais recentes)
+  getPage: async (cursor?: string | null): Promise<Pagina<Cliente>> => {
+    const pagina = await fetchPage('/clientes', cursor);
+    return { itens: pagina.itens.map(mapCliente), cursor: pagina.cursor };
   },
 
   create: async (cliente: Omit<Cliente, 'id' | 'createdAt'>): Promise<Cliente> => {
@@ -185,19 +212,22 @@ export const clientesAPI = {
 
 // ==================== TRANSAÇÕES ====================
 
+const mapTransacao = (trans: any): Transacao => ({
+  ...trans,
+  id: trans.id.toString(),
+  produtoId: trans.produto_id.toString(),
+  clienteId: trans.cliente_id?.toString(),
+  valorUnitario: trans.valor_unitario,
+  valorTotal: trans.valor_total,
+  numeroPedido: trans.numero_pedido,
+  createdAt: new Date(trans.created_at),
+});
+
 export const transacoesAPI = {
-  getAll: async (): Promise<Transacao[]> => {
-    const response = await apiClient.get('/transacoes');
-    return response.data.map((trans: any) => ({
-      ...trans,
-      id: trans.id.toString(),
-      produtoId: trans.produto_id.toString(),
-      clienteId: trans.cliente_id?.toString(),
-      valorUnitario: trans.valor_unitario,
-      valorTotal: trans.valor_total,
-      numeroPedido: trans.numero_pedido,
-      createdAt: new Date(trans.created_at),
-    }));
+  // Página a partir do cursor (sem cursor: a primeira, mais recentes)
+  getPage: async (cursor?: string | null): Promise<Pagina<Transacao>> => {
+    const pagina = await fetchPage('/transacoes', cursor);
+    return { itens: pagina.itens.map(mapTransacao), cursor: pagina.cursor };
   },
 
   create: async (transacao: Omit<Transacao, 'id' | 'createdAt'>): Promise<Transacao> => {
@@ -211,19 +241,282 @@ export const transacoesAPI = {
       numero_pedido: transacao.numeroPedido,
       observacoes: transacao.observacoes,
     });
-    return {
-      ...response.data,
-      id: response.data.id.toString(),
-      produtoId: response.data.produto_id.toString(),
-      clienteId: response.data.cliente_id?.toString(),
-      valorUnitario: response.data.valor_unitario,
-      valorTotal: response.data.valor_total,
-      numeroPedido: response.data.numero_pedido,
-      createdAt: new Date(response.data.created_at),
-    };
+    return mapTransacao(response.data);
   },
 
   delete: async (id: string): Promise<void> => {
     await apiClient.delete(`/transacoes/${id}`);
   },
 };
+
+// ==================== VENDAS ====================
+
+export interface VendaItemInput {
+  produtoId: string;
+  quantidade: number;
+  valorUnitario: number;
+  valorTotal: number;
+}
+
+export const vendasAPI = {
+  // Registra todos os itens do pedido em uma única requisição
+  create: async (venda: {
+    clienteId?: string;
+    numeroPedido?: string;
+    observacoes?: string;
+    itens: VendaItemInput[];
+  }): Promise<Transacao[]> => {
+    const response = await apiClient.post('/vendas', {
+      cliente_id: venda.clienteId ? parseInt(venda.clienteId) : null,
+      numero_pedido: venda.numeroPedido,
+      observacoes: venda.observacoes,
+      itens: venda.itens.map((item) => ({
+        produto_id: parseInt(item.produtoId),
+        quantidade: item.quantidade,
+        valor_unitario: item.valorUnitario,
+        valor_total: item.valorTotal,
+      })),
+    });
+    return response.data.map(mapTransacao);
+  },
+};
+
+// ==================== SINCRONIZAÇÃO ====================
+
+export interface SyncResult {
+  versao: number;
+  // true: lista completa (descartar o que havia); false: só as alterações
+  completo: boolean;
+  categorias: Categoria[];
+  produtos: Produto[];
+  clientes: Cliente[];
+  transacoes: Transacao[];
+  // Carga completa com janela: próxima página do histórico em transacoesAPI.getPage
+  cursorTransacoes?: string | null;
+  excluidos: {
+    categorias: number[];
+    produtos: number[];
+    clientes: number[];
+    transacoes: number[];
+  };
+}
+
+export const syncAPI = {
+  // Alterações desde a versão informada (0 = tudo). Com `janela`, a carga
+  // completa traz só as transações mais recentes
+  changes: async (since: number = 0, janela?: number): Promise<SyncResult> => {
+    const response = await apiClient.get('/sync', { params: { since, janela } });
+    const data = response.data;
+    return {
+      versao: data.versao,
+      completo: data.completo,
+      categorias: data.categorias.map(mapCategoria),
+      produtos: data.produtos.map(mapProduto),
+      clientes: data.clientes.map(mapCliente),
+      transacoes: data.transacoes.map(mapTransacao),
+      cursorTransacoes: data.cursor_transacoes ?? null,
+      excluidos: data.excluidos,
+    };
+  },
+};
+
+// ==================== EVENTOS ====================
+
+// Alterações publicadas pelo servidor a cada commit (GET /eventos, Server-Sent Events)
+export interface EventoAlteracoes extends SyncResult {
+  // true: o evento não traz as linhas; sincronizar com syncAPI.changes
+  sincronizar: boolean;
+}
+
+const mapEvento = (data: any): EventoAlteracoes => ({
+  versao: data.versao,
+  completo: false,
+  sincronizar: Boolean(data.sincronizar),
+  categorias: (data.categorias ?? []).map(mapCategoria),
+  produtos: (data.produtos ?? []).map(mapProduto),
+  clientes: (data.clientes ?? []).map(mapCliente),
+  transacoes: (data.transacoes ?? []).map(mapTransacao),
+  excluidos: {
+    categorias: data.excluidos?.categorias ?? [],
+    produtos: data.excluidos?.produtos ?? [],
+    clientes: data.excluidos?.clientes ?? [],
+    transacoes: data.excluidos?.transacoes ?? [],
+  },
+});
+
+export const eventosAPI = {
+  // Recebe os eventos até a função devolvida ser chamada, reconectando sozinho.
+  // `onConectado` roda a cada (re)conexão: sincronize nesse momento para não
+  // perder o que mudou enquanto estava desconectado
+  assinar: (onEvento: (evento: EventoAlteracoes) => void, onConectado: () => void): (() => void) => {
+    const controle = new AbortController();
+    let espera = 1000;
+
+    const conectar = async () => {
+      while (!controle.signal.aborted) {
+        try {
+          // fetch em vez de EventSource, que não envia o header Authorization
+          const response = await fetch(`${apiClient.defaults.baseURL}/eventos`, {
+            headers: { Authorization: `Bearer ${localStorage.getItem('nexus_token')}` },
+            signal: controle.signal,
+          });
+          if (response.status === 401) return;
+          if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+          const leitor = response.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer = '';
+          for (;;) {
+            const { value, done } = await leitor.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let fim = buffer.indexOf('\n\n');
+            while (fim >= 0) {
+              const bloco = buffer.slice(0, fim);
+              buffer = buffer.slice(fim + 2);
+              fim = buffer.indexOf('\n\n');
+              if (bloco.startsWith(': conectado')) {
+                espera = 1000;
+                onConectado();
+              } else if (bloco.startsWith('data: ')) {
+                onEvento(mapEvento(JSON.parse(bloco.slice(6))));
+              }
+            }
+          }
+        } catch (err) {
+          if (controle.signal.aborted) return;
+          console.warn('Feed de eventos desconectado:', err);
+        }
+        await new Promise((resolve) => setTimeout(resolve, espera));
+        espera = Math.min(espera * 2, 30000);
+      }
+    };
+
+    conectar();
+    return () => controle.abort();
+  },
+};
+
+// ==================== BUSCA ====================
+
+export interface BuscaPagina<T> {
+  itens: T[];
+  // Enviar como `cursor` para a próxima página (ausente na última)
+  cursor?: string;
+}
+
+// Busca no servidor, ordenada por relevância (a última palavra vale como prefixo)
+const buscar = async <T>(
+  path: string,
+  map: (row: any) => T,
+  q: string,
+  cursor?: string,
+  limit: number = 50
+): Promise<BuscaPagina<T>> => {
+  const response = await apiClient.get(path, { params: { q, cursor, limit } });
+  return {
+    itens: response.data.map(map),
+    cursor: response.headers['x-next-cursor'],
+  };
+};
+
+export const buscaAPI = {
+  produtos: (q: string, cursor?: string) => buscar('/produtos/busca', mapProduto, q, cursor),
+  clientes: (q: string, cursor?: string) => buscar('/clientes/busca', mapCliente, q, cursor),
+  transacoes: (q: string, cursor?: string) => buscar('/transacoes/busca', mapTransacao, q, cursor),
+};
+
+// ==================== ESTATÍSTICAS ====================
+
+export const statsAPI = {
+  // Resumo do painel calculado no servidor
+  dashboard: async (limit: number = 5) => {
+    const response = await apiClient.get('/stats', {
+      params: { limit, tz_offset: new Date().getTimezoneOffset() },
+    });
+    return response.data;
+  },
+
+  estoque: async (limiteBaixo: number = 5) => {
+    const response = await apiClient.get('/stats/estoque', {
+      params: { limite_baixo: limiteBaixo },
+    });
+    return response.data;
+  },
+
+  topProdutos: async (limit: number = 5) => {
+    const response = await apiClient.get('/stats/produtos', { params: { limit } });
+    return response.data;
+  },
+
+  topClientes: async (limit: number = 5) => {
+    const response = await apiClient.get('/stats/clientes', { params: { limit } });
+    return response.data;
+  },
+};
+
+// ==================== ASSISTENTE ====================
+
+export interface VendasTotais {
+  transacoes: number;
+  quantidade: number;
+  valor_total: number;
+}
+
+export interface ProdutoEstoque {
+  id: number;
+  nome: string;
+  valor: number;
+  quantidade: number;
+}
+
+export interface AssistenteProduto extends ProdutoEstoque {
+  descricao?: string;
+  vendas: number;
+  quantidade_vendida: number;
+  faturamento: number;
+}
+
+export interface AssistenteCliente {
+  id: number;
+  nome: string;
+  email?: string;
+  telefone?: string;
+  endereco?: string;
+  compras: number;
+  valor_total: number;
+}
+
+// Só os campos da intenção vêm preenchidos
+export interface AssistenteResposta {
+  intencao: string;
+  termo?: string;
+  estoque?: {
+    total_produtos: number;
+    unidades: number;
+    valor_estoque: number;
+    sem_estoque: number;
+    estoque_baixo: number;
+  };
+  vendas?: VendasTotais;
+  hoje?: VendasTotais;
+  total_clientes?: number;
+  top_produtos?: { produto_id: number; nome: string; quantidade: number; valor_total: number }[];
+  top_clientes?: { cliente_id: number; nome: string; compras: number; valor_total: number }[];
+  produtos?: ProdutoEstoque[];
+  total?: number;
+  produto?: AssistenteProduto;
+  comparado?: AssistenteProduto;
+  cliente?: AssistenteCliente;
+}
+
+export const assistenteAPI = {
+  // Pergunta do chat respondida no servidor: intenção e só os dados da resposta
+  query: async (mensagem: string): Promise<AssistenteResposta> => {
+    const response = await apiClient.post('/assistant/query', {
+      mensagem,
+      tz_offset: new Date().getTimezoneOffset(),
+    });
+    return response.data;
+  },
+};
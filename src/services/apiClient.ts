@@ -33,6 +33,7 @@ apiClient.interceptors.response.use(
       localStorage.removeItem('nexus_auth');
       localStorage.removeItem('nexus_user');
       localStorage.removeItem('nexus_role');
+      localStorage.removeItem('nexus_sync');
       window.location.href = '/';
     }
     return Promise.reject(error);
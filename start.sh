@@ -1,2 +1,2 @@
 #!/bin/bash
-python3 -m uvicorn backend.main:app --host 0.0.0.0 --port ${PORT:-8000}
+exec python3 entrypoint.py